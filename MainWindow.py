@@ -1,11 +1,38 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QMessageBox
-from view_1_HousingUnit import HousingUnit
-from view_2_CommonPropertyHouse import CommonPropertyHouse
-from view_3_CPHouseBelongseting import CPHouseBelongseting
-from view_4_ApportionmentModel import ApportionmentModelView
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QMessageBox, QLabel,
+                             QProgressBar, QPushButton, QWidget)
 
 
+# 各标签页视图的创建函数，视图模块在标签页首次显示时才导入
+def create_housing_unit(controller):
+    from view_1_HousingUnit import HousingUnit
+    return HousingUnit()
+
+
+def create_common_property_house(controller):
+    from view_2_CommonPropertyHouse import CommonPropertyHouse
+    return CommonPropertyHouse()
+
+
+def create_allocation_settings(controller):
+    from view_3_CPHouseBelongseting import CPHouseBelongseting
+    return CPHouseBelongseting(controller)
+
+
+def create_apportionment_model(controller):
+    from view_4_ApportionmentModel import ApportionmentModelView
+    return ApportionmentModelView(controller)
+
+
+# 标签页：(视图属性名, 标题, 创建函数)
+TABS = (
+    ("housing_unit_1", "户单元套内面积", create_housing_unit),
+    ("common_property_house_2", "共有建筑面积", create_common_property_house),
+    ("common_allocation_settings_3", "共有建筑分摊所属设置", create_allocation_settings),
+    ("apportionment_model_4", "共有建筑面积分配模型设置", create_apportionment_model),
+)
+
 
 class MainWindow(QMainWindow):
     """
@@ -16,7 +43,14 @@ class MainWindow(QMainWindow):
     2. 共有建筑面积
     3. 共有建筑分摊所属设置
     4. 共有建筑面积分配模型设置
+
+    启动时只创建第一个标签页，其余标签页在首次切换到时创建，
+    也可以通过同名属性（如 housing_unit_1）访问，访问时若尚未创建则立即创建。
+
+    信号:
+        view_created (str): 标签页视图已创建，参数为视图属性名
     """
+    view_created = pyqtSignal(str)
 
     def __init__(self, controller):
         """
@@ -31,21 +65,113 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("房屋面积计算系统")
         self.setGeometry(100, 100, 1000, 600)
 
-        # 创建标签页控件
+        # 创建标签页控件，各标签页先以空白页占位
         self.tab_widget = QTabWidget()
         self.setCentralWidget(self.tab_widget)
+        self.views = {}  # 已创建的视图 {视图属性名: 视图}
+        for _, title, _ in TABS:
+            self.tab_widget.addTab(QWidget(), title)
+        self.tab_widget.currentChanged.connect(self.build_tab)
+        self.build_tab(self.tab_widget.currentIndex())
+
+        # 状态栏中的后台任务进度，任务执行期间界面保持响应
+        self.tasks = None
+        self.task_name = ""
+        self.task_label = QLabel()
+        self.task_progress = QProgressBar()
+        self.task_progress.setMaximumWidth(200)
+        self.task_cancel_button = QPushButton("取消")
+        self.statusBar().addPermanentWidget(self.task_label)
+        self.statusBar().addPermanentWidget(self.task_progress)
+        self.statusBar().addPermanentWidget(self.task_cancel_button)
+        self.set_task_widgets_visible(False)
+
+    def build_tab(self, index):
+        """
+        创建标签页的视图并替换占位页，已创建时直接返回
+
+        :param index: 标签页序号
+        :return: 视图
+        """
+        name, title, create = TABS[index]
+        view = self.views.get(name)
+        if view is not None:
+            return view
+
+        view = create(self.controller)
+        self.views[name] = view
+        placeholder = self.tab_widget.widget(index)
+        current = self.tab_widget.currentIndex()
+        blocked = self.tab_widget.blockSignals(True)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, view, title)
+        self.tab_widget.setCurrentIndex(current)
+        self.tab_widget.blockSignals(blocked)
+        placeholder.deleteLater()
+        self.view_created.emit(name)
+        return view
+
+    def get_view(self, name):
+        """按属性名获取标签页视图，尚未创建时立即创建"""
+        return self.build_tab([tab[0] for tab in TABS].index(name))
+
+    housing_unit_1 = property(lambda self: self.get_view("housing_unit_1"))
+    common_property_house_2 = property(lambda self: self.get_view("common_property_house_2"))
+    common_allocation_settings_3 = property(lambda self: self.get_view("common_allocation_settings_3"))
+    apportionment_model_4 = property(lambda self: self.get_view("apportionment_model_4"))
+
+    def connect_tasks(self, tasks):
+        """
+        显示后台任务的进度
+
+        任务执行期间各标签页不可操作，避免编辑正在保存的数据；可以随时取消任务。
+
+        :param tasks: TaskRunner 实例
+        """
+        self.tasks = tasks
+        tasks.started.connect(self.task_started)
+        tasks.progress.connect(self.task_progressed)
+        tasks.stopped.connect(self.task_stopped)
+        self.task_cancel_button.clicked.connect(self.cancel_task)
+
+    def set_task_widgets_visible(self, visible):
+        self.task_label.setVisible(visible)
+        self.task_progress.setVisible(visible)
+        self.task_cancel_button.setVisible(visible)
+
+    def task_started(self, name):
+        self.task_name = name
+        self.task_label.setText(f"{name}...")
+        self.task_progress.setRange(0, 0)  # 进度未知时显示忙碌状态
+        self.task_cancel_button.setEnabled(True)
+        self.set_task_widgets_visible(True)
+        self.tab_widget.setEnabled(False)
+
+    def task_progressed(self, done, total, text):
+        self.task_label.setText(f"{self.task_name}：{text}" if text else f"{self.task_name}...")
+        if total > 0:
+            self.task_progress.setRange(0, total)
+            self.task_progress.setValue(done)
+        else:
+            self.task_progress.setRange(0, 0)
+
+    def task_stopped(self, name):
+        self.set_task_widgets_visible(False)
+        self.tab_widget.setEnabled(True)
+        self.statusBar().showMessage(f"{name}已结束", 3000)
 
-        # 创建四个不同的视图实例
-        self.housing_unit_1 = HousingUnit()
-        self.common_property_house_2 = CommonPropertyHouse()
-        self.common_allocation_settings_3 = CPHouseBelongseting(self.controller)
-        self.apportionment_model_4 = ApportionmentModelView(self.controller)
+    def cancel_task(self):
+        """请求取消当前后台任务，任务在当前步骤结束后停止"""
+        if self.tasks is not None:
+            self.tasks.cancel()
+            self.task_cancel_button.setEnabled(False)
+            self.task_label.setText(f"{self.task_name}：正在取消...")
 
-        # 将视图添加到标签页中
-        self.tab_widget.addTab(self.housing_unit_1, "户单元套内面积")
-        self.tab_widget.addTab(self.common_property_house_2, "共有建筑面积")
-        self.tab_widget.addTab(self.common_allocation_settings_3, "共有建筑分摊所属设置")
-        self.tab_widget.addTab(self.apportionment_model_4, "共有建筑面积分配模型设置")
+    def closeEvent(self, event):
+        """关闭窗口前取消并等待后台任务结束"""
+        if self.tasks is not None and self.tasks.busy:
+            self.tasks.wait()
+        super().closeEvent(event)
 
     def show_message(self, title, message):
         """
@@ -73,9 +199,12 @@ if __name__ == '__main__':
         def fetch_data_from_table(self, table_name):
             return [("1", "单元A", "类型1"), ("2", "单元B", "类型2")]
         
-        def save_allocation_data(self, allocation_name, data, available_units):
+        def save_allocation_data(self, allocation_name, data, available_units, parent_table=None,
+                                 group_names=None, on_done=None):
             print(f"保存数据：{allocation_name}")
             print(f"数据：{data}")
+            if on_done:
+                on_done((True, "数据保存成功"))
             return True, "数据保存成功"
         
         def delete_allocation_area(self, allocation_name):
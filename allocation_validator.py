@@ -0,0 +1,158 @@
+"""
+分摊所属数据验证
+
+保存分摊所属前，检查各分组（含分摊公共建筑部位）的单元是否恰好划分了所加载的数据表:
+    - 分组不能为空
+    - 同一分组内单元不能重复
+    - 同一单元不能同时属于多个分组
+    - 分组中的单元必须来自所加载的数据表，且面积与数据表一致
+    - 数据表中的每个单元都必须属于某个分组
+    - 各分组面积之和等于数据表的总面积
+
+所有检查基于字典和集合索引，总耗时与单元数成线性关系。
+问题以生成器逐条产生，AllocationReport 按页取出，界面可以分页显示，无需一次生成全部问题。
+"""
+
+from collections import Counter
+
+# 面积比较的容差（平方米）
+AREA_TOLERANCE = 0.005
+
+# 每页的问题数
+PAGE_SIZE = 50
+
+# 问题类型
+EMPTY_GROUP = "空分组"
+DUPLICATE_UNIT = "分组内重复"
+SHARED_UNIT = "多个分组共用"
+UNKNOWN_UNIT = "不在数据表中"
+AREA_MISMATCH = "面积不一致"
+MISSING_UNIT = "未分组"
+TOTAL_MISMATCH = "总面积不一致"
+
+
+class AllocationIssue:
+    """
+    一条验证问题
+
+    属性:
+        kind (str): 问题类型，取自本模块的常量
+        message (str): 问题说明
+        group (str): 相关的分组，与分组无关时为None
+        unit_id (str): 相关的单元ID，与单元无关时为None
+    """
+
+    def __init__(self, kind, message, group=None, unit_id=None):
+        self.kind = kind
+        self.message = message
+        self.group = group
+        self.unit_id = unit_id
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"AllocationIssue({self.kind!r}, {self.message!r})"
+
+
+def iter_allocation_issues(data_to_save, loaded_data, group_names=None, tolerance=AREA_TOLERANCE):
+    """
+    逐条产生验证问题
+
+    参数:
+        data_to_save (list): [(分组名, ID, 房号, 套内面积), ...]
+        loaded_data (list): 所加载数据表的 [(ID, 房号, 套内面积), ...]
+        group_names (list): 全部分组名，用于检查空分组；为None时不检查
+        tolerance (float): 面积比较的容差
+
+    返回:
+        generator: AllocationIssue
+    """
+    loaded = {unit_id: (room, area or 0) for unit_id, room, area in loaded_data}
+
+    # 单元ID → 首个所属分组；出现多次的单元另记其全部所属分组（按出现顺序）
+    first_groups = {}
+    repeated = {}
+    group_sizes = {}
+    for group_name, unit_id, _, _ in data_to_save:
+        group_sizes[group_name] = group_sizes.get(group_name, 0) + 1
+        if unit_id in first_groups:
+            repeated.setdefault(unit_id, [first_groups[unit_id]]).append(group_name)
+        else:
+            first_groups[unit_id] = group_name
+
+    for group_name in group_names or ():
+        if not group_sizes.get(group_name):
+            yield AllocationIssue(EMPTY_GROUP, f"分组 {group_name} 中没有单元", group=group_name)
+
+    structural = bool(repeated)
+    for group_name, unit_id, room, area in data_to_save:
+        groups = repeated.pop(unit_id, None)
+        if groups:
+            counts = Counter(groups)
+            for name, count in counts.items():
+                if count > 1:
+                    yield AllocationIssue(DUPLICATE_UNIT, f"ID {unit_id} 在分组 {name} 中重复 {count} 次，对应房号: {room}",
+                                          group=name, unit_id=unit_id)
+            if len(counts) > 1:
+                yield AllocationIssue(SHARED_UNIT, f"ID {unit_id} 重复，同时属于分组: {', '.join(counts)}，对应房号: {room}",
+                                      group=groups[0], unit_id=unit_id)
+
+        unit = loaded.get(unit_id)
+        if unit is None:
+            structural = True
+            yield AllocationIssue(UNKNOWN_UNIT, f"ID {unit_id} 不在所加载的数据表中，对应房号: {room}",
+                                  group=group_name, unit_id=unit_id)
+        elif abs((area or 0) - unit[1]) > tolerance:
+            structural = True
+            yield AllocationIssue(AREA_MISMATCH, f"ID {unit_id} 的面积 {area} 与数据表中的 {unit[1]} 不一致，"
+                                                 f"请重新加载数据", group=group_name, unit_id=unit_id)
+
+    for unit_id, (room, _) in loaded.items():
+        if unit_id not in first_groups:
+            structural = True
+            yield AllocationIssue(MISSING_UNIT, f"缺少 ID {unit_id}，对应房号: {room}", unit_id=unit_id)
+
+    # 单元的划分有误时，总面积必然不一致，不再重复报告
+    if not structural:
+        group_total = sum(area or 0 for _, _, _, area in data_to_save)
+        loaded_total = sum(area for _, area in loaded.values())
+        if abs(group_total - loaded_total) > tolerance:
+            yield AllocationIssue(TOTAL_MISMATCH, f"各分组面积之和 {group_total:.2f} 与数据表总面积 {loaded_total:.2f} 不一致")
+
+
+class AllocationReport:
+    """
+    分页取出的验证结果
+
+    用法:
+        report = AllocationReport(data_to_save, loaded_data, group_names)
+        issues = report.next_page()
+        while report.has_more:
+            issues = report.next_page()
+    """
+
+    def __init__(self, data_to_save, loaded_data, group_names=None, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.count = 0  # 已取出的问题数
+        self._issues = iter_allocation_issues(data_to_save, loaded_data, group_names)
+        self._pending = next(self._issues, None)
+
+    @property
+    def has_more(self):
+        """是否还有未取出的问题"""
+        return self._pending is not None
+
+    def next_page(self):
+        """
+        取出下一页问题
+
+        返回:
+            list: AllocationIssue，没有更多问题时为空列表
+        """
+        page = []
+        while self._pending is not None and len(page) < self.page_size:
+            page.append(self._pending)
+            self._pending = next(self._issues, None)
+        self.count += len(page)
+        return page
@@ -0,0 +1,78 @@
+"""
+分摊公共面积计算内核
+
+以NumPy数组一次计算所有单元的分摊公共面积（套内面积 × 分摊系数），
+并按最大余数法取整：先将每个单元的面积向下取整到指定小数位，
+再把与应分摊总面积之间的差额按舍去部分从大到小逐个补足，
+使取整后的分摊公共面积之和恰好等于应分摊总面积。
+
+apportion_batch 可一次处理多个分组（如多幢楼、多个分摊模型）。
+"""
+
+import numpy as np
+
+
+def apportion_batch(areas, groups, coefficients, totals, decimals=2):
+    """
+    批量计算多个分组的分摊公共面积
+
+    参数:
+        areas (array-like): 各单元的套内面积
+        groups (array-like): 各单元所属分组的序号，取值 0 到 len(coefficients)-1
+        coefficients (array-like): 各分组的分摊系数
+        totals (array-like): 各分组的应分摊总面积，取整后的分摊公共面积之和等于该值
+        decimals (int): 保留的小数位数
+
+    返回:
+        numpy.ndarray: 各单元的分摊公共面积，顺序与 areas 相同
+    """
+    areas = np.nan_to_num(np.asarray(areas, dtype=np.float64))
+    groups = np.asarray(groups, dtype=np.intp)
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.float64)
+    group_count = len(coefficients)
+    scale = 10 ** decimals
+
+    # 以最小单位（如0.01平方米）计的面积，向下取整后的整数部分和舍去部分
+    raw = areas * coefficients[groups] * scale
+    floors = np.floor(raw)
+    remainders = raw - floors
+
+    # 每个分组需要补足的最小单位数，可能为负（应分摊总面积小于取整后之和）
+    counts = np.bincount(groups, minlength=group_count)
+    deficits = np.rint(totals * scale) - np.bincount(groups, weights=floors, minlength=group_count)
+
+    # 差额平均分到组内每个单元，余下的按舍去部分从大到小各补一个最小单位
+    base = np.floor_divide(deficits, np.maximum(counts, 1))
+    extra = deficits - base * counts
+
+    # 按分组、舍去部分降序排序。舍去部分在[0, 1)内，
+    # 排序键 分组序号 + 1 - 舍去部分 落在(分组序号, 分组序号 + 1]内，一次排序即可完成两级排序。
+    # 舍去部分相同的单元先后不影响各组之和，不使用较慢的稳定排序
+    order = np.argsort(groups + (1 - remainders))
+    sorted_groups = groups[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ranks = np.arange(len(order)) - starts[sorted_groups]
+
+    adjust = np.empty(len(raw))
+    adjust[order] = base[sorted_groups] + (ranks < extra[sorted_groups])
+    return (floors + adjust) / scale
+
+
+def apportion_areas(areas, coefficient, total=None, decimals=2):
+    """
+    计算单个分组的分摊公共面积
+
+    参数:
+        areas (array-like): 各单元的套内面积
+        coefficient (float): 分摊系数
+        total (float): 应分摊总面积，为None时取未取整的分摊公共面积之和
+        decimals (int): 保留的小数位数
+
+    返回:
+        numpy.ndarray: 各单元的分摊公共面积
+    """
+    areas = np.nan_to_num(np.asarray(areas, dtype=np.float64))
+    if total is None:
+        total = float(np.sum(areas) * coefficient)
+    return apportion_batch(areas, np.zeros(len(areas), dtype=np.intp), [coefficient], [total], decimals)
@@ -0,0 +1,347 @@
+"""
+分摊计算引擎
+
+一次性将单元面积、分摊所属分组成员和分摊模型层级载入内存，
+自上而下遍历模型树：上级模型的分摊系数作为下级模型的上级分摊系数，
+依次计算各模型的应分摊公共面积、分摊系数和分摊公共面积，
+最后在一个事务中批量写回分摊计算结果表。
+
+每个模型的输入（应分摊共有建筑部位和参与分摊单元）来自分摊模型输入表，
+在界面上计算模型时保存。未保存输入的模型不参与计算，沿用已有结果。
+
+依赖关系为 单元 → 分摊所属分组 → 分摊模型 → 下级模型。单元面积变化后，
+recalculate 只重新计算输入中包含这些单元的模型及其下级模型，只载入这些模型用到的分组。
+"""
+
+from model import ID_PREFIXES, UNIT_SOURCE_TABLES
+
+# 包含全部单元表单元的分组：幢总建筑面积和整幢
+UNIT_TABLE_GROUPS = tuple(name for name in UNIT_SOURCE_TABLES if name not in ID_PREFIXES)
+
+# 按单元ID查询分组时每批的ID数量
+QUERY_BATCH_SIZE = 500
+
+
+class ModelResult:
+    """
+    单个分摊模型的计算结果
+
+    属性:
+        model_id (int): 模型ID
+        model_name (str): 模型名称
+        coefficient (float): 分摊系数，计算失败时为None
+        apportionable_areas (dict): {单元ID: 应分摊公共面积}，即应分摊共有建筑部位
+        apportioned_areas (dict): {单元ID: 分摊公共面积}，即参与分摊单元
+        error (str): 错误信息，成功时为None
+    """
+
+    def __init__(self, model_id, model_name):
+        self.model_id = model_id
+        self.model_name = model_name
+        self.coefficient = None
+        self.apportionable_areas = {}
+        self.apportioned_areas = {}
+        self.error = None
+
+
+class ApportionmentEngine:
+    """
+    分摊模型整体计算引擎
+
+    用法:
+        engine = ApportionmentEngine(model)
+        results = engine.run()
+    """
+
+    def __init__(self, model, arithmetic=None):
+        """
+        :param model: BuildingAreaModel 实例，通过其写连接读取和写回数据；
+                      为None时只能由 from_setup 载入数据并调用 evaluate
+        :param arithmetic: 算术方式（见area_arithmetic），默认与模型相同，无模型时为浮点数计算
+        """
+        if arithmetic is None and model is None:
+            # area_arithmetic依赖NumPy，推迟到计算时导入
+            from area_arithmetic import FloatArithmetic
+            arithmetic = FloatArithmetic()
+        self.model = model
+        self.arithmetic = arithmetic or model.arithmetic
+        self.units = {}
+        self.groups = {}
+        self.models = {}
+        self.children = {}
+        self.inputs = {}
+        self.stored_coefficients = {}
+
+    @classmethod
+    def from_setup(cls, units, groups, models, arithmetic=None):
+        """
+        由内存中的数据创建引擎，不访问数据库
+
+        参数:
+            units (dict): {单元ID: 套内面积}
+            groups (dict): {分组名: [单元ID, ...]}
+            models (list): [(模型名称, 上级模型名称, 应分摊共有建筑部位分组列表, 参与分摊单元分组列表), ...]，
+                           上级模型为None表示顶级模型
+            arithmetic: 算术方式，默认为浮点数计算
+
+        返回:
+            ApportionmentEngine: 可直接调用 evaluate 的引擎
+        """
+        engine = cls(None, arithmetic)
+        engine.units = dict(units)
+        engine.groups = {name: [unit_id for unit_id in unit_ids if unit_id in engine.units]
+                         for name, unit_ids in groups.items()}
+        model_ids = {name: index + 1 for index, (name, _, _, _) in enumerate(models)}
+        engine.children = {None: []}
+        for name, parent_name, c_tables, h_tables in models:
+            model_id = model_ids[name]
+            parent_id = model_ids.get(parent_name)
+            engine.models[model_id] = (name, parent_id)
+            engine.children.setdefault(parent_id, []).append(model_id)
+            engine.inputs[model_id] = (list(c_tables), list(h_tables))
+        return engine
+
+    def load(self):
+        """载入模型结构和全部模型输入用到的分组"""
+        self.load_structure()
+        self.load_groups({name for model_inputs in self.inputs.values() for tables in model_inputs for name in tables})
+
+    def load_structure(self):
+        """载入模型层级和模型输入"""
+        cursor = self.model.cursor
+
+        # 模型层级
+        self.models = {}
+        self.children = {None: []}
+        cursor.execute('SELECT model_id, model_name, parent_id FROM "分摊模型关系" ORDER BY order_index, model_id')
+        rows = cursor.fetchall()
+        for model_id, model_name, parent_id in rows:
+            self.models[model_id] = (model_name, parent_id)
+        for model_id, _, parent_id in rows:
+            # 上级模型不存在时视为顶级模型
+            parent_id = parent_id if parent_id in self.models else None
+            self.children.setdefault(parent_id, []).append(model_id)
+
+        # 模型输入
+        self.inputs = {}
+        cursor.execute('SELECT model_id, role, belong_name FROM "分摊模型输入" ORDER BY model_id, role, order_index')
+        for model_id, role, belong_name in cursor.fetchall():
+            c_tables, h_tables = self.inputs.setdefault(model_id, ([], []))
+            (c_tables if role == "C" else h_tables).append(belong_name)
+        self.stored_coefficients = {}
+
+    def stored_coefficient(self, model_id):
+        """获取模型已保存的分摊系数，供不重新计算的模型的下级模型使用，未计算过时为0"""
+        if model_id not in self.stored_coefficients and self.model is None:
+            return 0
+        if model_id not in self.stored_coefficients:
+            self.model.cursor.execute('''SELECT coefficient FROM "分摊计算结果"
+                                         WHERE model_id = ? AND coefficient IS NOT NULL LIMIT 1''',
+                                      (model_id,))
+            result = self.model.cursor.fetchone()
+            self.stored_coefficients[model_id] = result[0] if result else 0
+        return self.stored_coefficients[model_id]
+
+    def load_groups(self, group_names):
+        """
+        载入分组的单元及其套内面积
+
+        参数:
+            group_names (iterable): 表名或分摊所属分组名
+        """
+        cursor = self.model.cursor
+        for group_name in group_names:
+            if group_name in self.groups:
+                continue
+            if group_name not in UNIT_SOURCE_TABLES:
+                # 已删除的分组不载入，使用该分组的模型计算时报错
+                cursor.execute('SELECT 1 FROM "分摊所属关系" WHERE belong_name = ?', (group_name,))
+                if cursor.fetchone() is None:
+                    continue
+            cursor.execute(*self.model.unit_source_query(group_name, "ID, 套内面积"))
+            rows = cursor.fetchall()
+            self.units.update((unit_id, area or 0) for unit_id, area in rows)
+            self.groups[group_name] = [unit_id for unit_id, _ in rows]
+
+    def affected_groups(self, unit_changes):
+        """
+        查找包含变化单元的分组
+
+        参数:
+            unit_changes (dict): {单元表名: 变化的单元ID集合}
+
+        返回:
+            set: 分组名
+        """
+        groups = set()
+        unit_ids = []
+        for table_name, ids in unit_changes.items():
+            if ids:
+                groups.add(table_name)
+                groups.update(UNIT_TABLE_GROUPS)
+                unit_ids.extend(ids)
+
+        # 分批查询，每批参数个数不超过SQLite的限制
+        cursor = self.model.cursor
+        for start in range(0, len(unit_ids), QUERY_BATCH_SIZE):
+            batch = unit_ids[start:start + QUERY_BATCH_SIZE]
+            cursor.execute(f'''SELECT DISTINCT r.belong_name
+                               FROM "分摊所属成员" m JOIN "分摊所属关系" r ON r.belong_id = m.belong_id
+                               WHERE m.unit_id IN ({', '.join(['?'] * len(batch))})''', batch)
+            groups.update(row[0] for row in cursor.fetchall())
+        return groups
+
+    def affected_models(self, group_names):
+        """
+        查找输入中包含指定分组的模型及其全部下级模型
+
+        参数:
+            group_names (iterable): 分组名
+
+        返回:
+            set: 模型ID
+        """
+        group_names = set(group_names)
+        affected = set()
+        stack = [model_id for model_id, (c_tables, h_tables) in self.inputs.items()
+                 if group_names.intersection(c_tables) or group_names.intersection(h_tables)]
+        while stack:
+            model_id = stack.pop()
+            if model_id in affected:
+                continue
+            affected.add(model_id)
+            stack.extend(self.children.get(model_id, []))
+        return affected
+
+    def total_area(self, tables):
+        """计算多个分组的套内面积之和，与BuildingAreaModel.get_total_area一致"""
+        return sum(self.units[unit_id] for table in tables for unit_id in self.groups[table])
+
+    def evaluate_model(self, model_id, upper_coefficient):
+        """
+        计算单个模型
+
+        参数:
+            model_id (int): 模型ID
+            upper_coefficient (float): 上级分摊系数
+
+        返回:
+            ModelResult: 计算结果
+        """
+        model_name, _ = self.models[model_id]
+        result = ModelResult(model_id, model_name)
+        c_tables, h_tables = self.inputs[model_id]
+
+        missing = [table for table in dict.fromkeys(c_tables + h_tables) if table not in self.groups]
+        if missing:
+            result.error = f"分摊所属分组不存在：{'、'.join(missing)}"
+            return result
+
+        c_total_area = self.total_area(c_tables)
+        h_total_area = self.total_area(h_tables)
+        if h_total_area == 0:
+            result.error = "参与分摊单元的总面积为0，无法计算分摊系数"
+            return result
+
+        # 应分摊公共面积，保留2位小数
+        c_units = [unit_id for table in c_tables for unit_id in self.groups[table]]
+        areas = self.arithmetic.apportionable_areas([self.units[unit_id] for unit_id in c_units], upper_coefficient)
+        result.apportionable_areas = dict(zip(c_units, areas))
+
+        # 分摊系数保留6位小数，分摊公共面积按最大余数法保留2位小数，总和等于应分摊总面积
+        coefficient = self.arithmetic.coefficient(c_total_area, h_total_area, upper_coefficient)
+        result.coefficient = coefficient
+        h_units = list(dict.fromkeys(unit_id for table in h_tables for unit_id in self.groups[table]))
+        areas = self.arithmetic.apportioned_areas([self.units[unit_id] for unit_id in h_units], coefficient,
+                                                  c_total_area, upper_coefficient)
+        result.apportioned_areas = dict(zip(h_units, areas))
+        return result
+
+    def evaluate(self, model_ids=None):
+        """
+        自上而下计算已保存输入的模型
+
+        参数:
+            model_ids (set): 只计算这些模型，其他模型沿用已有分摊系数；为None时计算全部模型
+
+        返回:
+            list: 按计算顺序排列的ModelResult，未计算的模型不在其中
+        """
+        results = []
+        # (模型ID, 上级分摊系数, 上级错误)
+        stack = [(model_id, 0, None) for model_id in reversed(self.children[None])]
+        while stack:
+            model_id, upper_coefficient, upper_error = stack.pop()
+            coefficient, error = None, upper_error
+
+            if model_id in self.inputs and (model_ids is None or model_id in model_ids):
+                if upper_error:
+                    result = ModelResult(model_id, self.models[model_id][0])
+                    result.error = f"上级分摊模型计算失败：{upper_error}"
+                else:
+                    result = self.evaluate_model(model_id, upper_coefficient)
+                results.append(result)
+                coefficient, error = result.coefficient, result.error
+            elif not upper_error:
+                coefficient = self.stored_coefficient(model_id)
+
+            for child_id in reversed(self.children.get(model_id, [])):
+                stack.append((child_id, coefficient or 0, error))
+        return results
+
+    def write(self, results):
+        """
+        在一个事务中批量写回计算成功的模型结果，替换这些模型原有的结果
+
+        参数:
+            results (list): evaluate() 返回的ModelResult列表
+        """
+        succeeded = [result for result in results if result.error is None]
+        rows = []
+        for result in succeeded:
+            for unit_id in {**result.apportionable_areas, **result.apportioned_areas}:
+                in_h = unit_id in result.apportioned_areas
+                rows.append((unit_id, result.model_id,
+                             result.coefficient if in_h else None,
+                             result.apportioned_areas.get(unit_id),
+                             result.apportionable_areas.get(unit_id)))
+
+        cursor = self.model.cursor
+        with self.model.transaction():
+            cursor.executemany('DELETE FROM "分摊计算结果" WHERE model_id = ?',
+                               [(result.model_id,) for result in succeeded])
+            cursor.executemany('''INSERT INTO "分摊计算结果"
+                                  (unit_id, model_id, coefficient, apportioned_area, apportionable_area)
+                                  VALUES (?, ?, ?, ?, ?)''', rows)
+
+    def run(self):
+        """
+        载入数据、计算全部模型并写回
+
+        返回:
+            list: ModelResult列表
+        """
+        self.load()
+        results = self.evaluate()
+        self.write(results)
+        return results
+
+    def recalculate(self, unit_changes):
+        """
+        重新计算受单元变化影响的模型及其下级模型并写回
+
+        参数:
+            unit_changes (dict): {单元表名: 变化的单元ID集合}
+
+        返回:
+            list: ModelResult列表，没有受影响的模型时为空列表
+        """
+        self.load_structure()
+        model_ids = self.affected_models(self.affected_groups(unit_changes))
+        if not model_ids:
+            return []
+        self.load_groups({name for model_id in model_ids if model_id in self.inputs
+                          for tables in self.inputs[model_id] for name in tables})
+        results = self.evaluate(model_ids)
+        self.write(results)
+        return results
@@ -0,0 +1,150 @@
+"""
+分摊计算的算术方式
+
+FloatArithmetic 以二进制浮点数计算，与原有计算方式相同。
+FixedPointArithmetic 以整数定点数计算：面积以万分之一平方米、分摊系数以百万分之一为单位，
+全部中间结果以整数（NumPy int64 数组）精确表示，只在以下几处按配置的舍入方式取整:
+    - 分摊系数保留6位小数
+    - 各单元应分摊公共面积保留2位小数
+    - 应分摊总面积保留2位小数
+各单元分摊公共面积按最大余数法分配，之和等于应分摊总面积。
+
+两者接口相同，由 BuildingAreaModel(arithmetic=...) 指定，分摊计算引擎和控制器均通过模型使用。
+"""
+
+from decimal import ROUND_DOWN, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP
+
+import numpy as np
+
+from apportion_kernel import apportion_areas
+
+# 输入面积的单位：万分之一平方米
+AREA_SCALE = 10 ** 4
+
+# 分摊系数的单位：百万分之一
+COEFFICIENT_SCALE = 10 ** 6
+
+# 结果面积的单位：百分之一平方米
+RESULT_SCALE = 10 ** 2
+
+# 面积与分摊系数相乘后的单位换算为结果面积单位的除数
+PRODUCT_DIVISOR = AREA_SCALE * COEFFICIENT_SCALE // RESULT_SCALE
+
+# 支持的舍入方式，与decimal模块的同名常量含义相同
+ROUNDING_MODES = (ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_HALF_DOWN, ROUND_DOWN, ROUND_UP)
+
+
+def round_div(numerator, divisor, rounding=ROUND_HALF_UP):
+    """
+    整数除法并按指定方式舍入
+
+    参数:
+        numerator (int 或 numpy.ndarray): 被除数
+        divisor (int): 除数，必须为正数
+        rounding (str): 舍入方式，取自ROUNDING_MODES
+
+    返回:
+        int 或 numpy.ndarray: 商，类型与被除数相同
+    """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"不支持的舍入方式：{rounding}")
+    scalar = not isinstance(numerator, np.ndarray)
+    numerator = np.asarray(numerator, dtype=np.int64)
+    quotient, remainder = np.divmod(np.abs(numerator), divisor)
+
+    if rounding == ROUND_DOWN:
+        increment = np.zeros_like(quotient)
+    elif rounding == ROUND_UP:
+        increment = remainder > 0
+    elif rounding == ROUND_HALF_UP:
+        increment = 2 * remainder >= divisor
+    elif rounding == ROUND_HALF_DOWN:
+        increment = 2 * remainder > divisor
+    else:
+        increment = (2 * remainder > divisor) | ((2 * remainder == divisor) & (quotient % 2 == 1))
+
+    result = np.sign(numerator) * (quotient + increment)
+    return int(result) if scalar else result
+
+
+def to_fixed(values, scale):
+    """将浮点数（或浮点数数组）换算为以1/scale为单位的整数"""
+    if isinstance(values, (int, float)):
+        return int(round(values * scale))
+    return np.rint(np.nan_to_num(np.asarray(values, dtype=np.float64)) * scale).astype(np.int64)
+
+
+class FloatArithmetic:
+    """以二进制浮点数计算，各结果用round取整"""
+
+    name = "float"
+
+    def coefficient(self, common_area, unit_area, upper_coefficient):
+        """分摊系数 = 应分摊共有建筑面积 × (1 + 上级分摊系数) / 参与分摊单元总面积，保留6位小数"""
+        return round((common_area + common_area * upper_coefficient) / unit_area, 6)
+
+    def apportionable_areas(self, areas, upper_coefficient):
+        """各单元的应分摊公共面积 = 套内面积 × (1 + 上级分摊系数)，保留2位小数"""
+        return [round((area or 0) + (area or 0) * upper_coefficient, 2) for area in areas]
+
+    def apportioned_areas(self, areas, coefficient, common_area=None, upper_coefficient=0):
+        """
+        各单元的分摊公共面积 = 套内面积 × 分摊系数，按最大余数法保留2位小数
+
+        common_area 不为None时，分摊公共面积之和等于 common_area × (1 + upper_coefficient)
+        """
+        total = None if common_area is None else common_area + common_area * upper_coefficient
+        return apportion_areas(areas, coefficient, total).tolist()
+
+
+class FixedPointArithmetic:
+    """以整数定点数计算，舍入方式可配置"""
+
+    name = "fixed"
+
+    def __init__(self, rounding=ROUND_HALF_UP):
+        """
+        :param rounding: 舍入方式，取自ROUNDING_MODES，默认四舍五入
+        """
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"不支持的舍入方式：{rounding}")
+        self.rounding = rounding
+
+    def coefficient(self, common_area, unit_area, upper_coefficient):
+        """分摊系数 = 应分摊共有建筑面积 × (1 + 上级分摊系数) / 参与分摊单元总面积，保留6位小数"""
+        common = to_fixed(common_area, AREA_SCALE)
+        upper = to_fixed(upper_coefficient, COEFFICIENT_SCALE)
+        # 面积单位相同，相除后直接得到以百万分之一为单位的分摊系数
+        return round_div(common * (COEFFICIENT_SCALE + upper), to_fixed(unit_area, AREA_SCALE),
+                         self.rounding) / COEFFICIENT_SCALE
+
+    def apportionable_areas(self, areas, upper_coefficient):
+        """各单元的应分摊公共面积 = 套内面积 × (1 + 上级分摊系数)，保留2位小数"""
+        upper = to_fixed(upper_coefficient, COEFFICIENT_SCALE)
+        products = to_fixed(areas, AREA_SCALE) * (COEFFICIENT_SCALE + upper)
+        return (round_div(products, PRODUCT_DIVISOR, self.rounding) / RESULT_SCALE).tolist()
+
+    def apportioned_areas(self, areas, coefficient, common_area=None, upper_coefficient=0):
+        """
+        各单元的分摊公共面积 = 套内面积 × 分摊系数，按最大余数法保留2位小数
+
+        common_area 不为None时，分摊公共面积之和等于按舍入方式保留2位小数的
+        common_area × (1 + upper_coefficient)；否则等于按舍入方式保留2位小数的未取整之和。
+        """
+        products = to_fixed(areas, AREA_SCALE) * to_fixed(coefficient, COEFFICIENT_SCALE)
+        if common_area is None:
+            target = round_div(int(products.sum()), PRODUCT_DIVISOR, self.rounding)
+        else:
+            upper = to_fixed(upper_coefficient, COEFFICIENT_SCALE)
+            target = round_div(to_fixed(common_area, AREA_SCALE) * (COEFFICIENT_SCALE + upper),
+                               PRODUCT_DIVISOR, self.rounding)
+
+        # 向下取整后，差额按舍去部分从大到小逐个补足（差额可能为负，见apportion_kernel）
+        floors, remainders = np.divmod(products, PRODUCT_DIVISOR)
+        count = len(products)
+        deficit = target - int(floors.sum())
+        base, extra = divmod(deficit, count) if count else (0, 0)
+        order = np.argsort(-remainders, kind="stable")
+        adjust = np.full(count, base, dtype=np.int64)
+        adjust[order[:extra]] += 1
+        return ((floors + adjust) / RESULT_SCALE).tolist()
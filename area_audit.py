@@ -0,0 +1,248 @@
+"""
+面积一致性审核
+
+以少量SQL聚合查询核对项目数据库中的面积恒等关系，用于在生成报表前把关:
+    - 分摊模型：分摊公共面积之和等于 应分摊共有建筑部位套内面积之和 × (1 + 计算时使用的上级分摊系数)，
+      即各应分摊共有建筑部位的应分摊公共面积之和；
+      参与分摊单元的分摊系数一致，且 分摊系数 × 参与分摊单元套内面积之和 等于分摊公共面积之和
+    - 单元：各模型分摊公共面积之和等于 套内面积 × 各模型分摊系数之和
+    - 幢：未作为应分摊共有建筑部位的单元的套内面积，加上全部单元的分摊公共面积，
+      再减去下级模型按上级分摊系数转分摊的面积，等于幢总建筑面积
+    - 分摊所属：同一分摊所属的各分组面积之和等于所加载数据表的总面积
+    - 分摊系数计算过程：计算结果对应的单元都存在，视图中的总分摊系数与计算结果一致
+
+取整会带来误差，各项按参与取整的次数放宽容差，报告中给出实际使用的容差。
+
+用法:
+    python area_audit.py 项目.db [更多.db ...] [-t 容差]
+"""
+
+import argparse
+import os
+import sys
+
+from model import BuildingAreaModel
+
+# 基本容差（平方米）
+DEFAULT_TOLERANCE = 0.01
+
+# 单次保留2位小数的最大误差（平方米）
+ROUNDING_ERROR = 0.005
+
+# 分摊系数保留6位小数的最大误差
+COEFFICIENT_ROUNDING_ERROR = 0.0000005
+
+# 单元面积的SQL表达式，单元可能在户单元或共有建筑表中
+UNIT_JOINS = '''LEFT JOIN "户单元套内面积" h ON h.ID = r.unit_id
+                LEFT JOIN "共有建筑面积" c ON c.ID = r.unit_id'''
+UNIT_AREA = "COALESCE(h.套内面积, c.套内面积, 0)"
+
+# 审核项
+MODEL_BALANCE = "模型分摊平衡"
+MODEL_COEFFICIENT = "模型分摊系数"
+UNIT_BALANCE = "单元分摊面积"
+BUILDING_TOTAL = "幢总建筑面积"
+GROUP_TOTAL = "分摊所属分组面积"
+ORPHAN_RESULT = "计算结果单元不存在"
+RESULT_VIEW = "分摊系数计算过程"
+
+
+class AuditFinding:
+    """
+    一项不一致
+
+    属性:
+        check (str): 审核项，取自本模块的常量
+        subject (str): 不一致的对象（模型、单元、分摊所属等）
+        expected (float): 期望值
+        actual (float): 实际值
+        tolerance (float): 使用的容差
+    """
+
+    def __init__(self, check, subject, expected, actual, tolerance):
+        self.check = check
+        self.subject = subject
+        self.expected = expected
+        self.actual = actual
+        self.tolerance = tolerance
+
+    @property
+    def difference(self):
+        return self.actual - self.expected
+
+    def __str__(self):
+        return (f"[{self.check}] {self.subject}：期望 {self.expected:.6f}，实际 {self.actual:.6f}，"
+                f"相差 {self.difference:.6f}，容差 {self.tolerance:.6f}")
+
+    def __repr__(self):
+        return f"AuditFinding({self.check!r}, {self.subject!r}, {self.expected!r}, {self.actual!r})"
+
+
+class AreaAuditor:
+    """
+    面积一致性审核
+
+    通过模型的只读连接查询已提交的数据，不修改数据库。
+
+    用法:
+        findings = AreaAuditor(model).run()
+    """
+
+    def __init__(self, model, tolerance=DEFAULT_TOLERANCE):
+        """
+        :param model: BuildingAreaModel 实例
+        :param tolerance: 基本容差（平方米），各项在此基础上按取整次数放宽
+        """
+        self.model = model
+        self.tolerance = tolerance
+
+    def run(self):
+        """
+        执行全部审核
+
+        返回:
+            list: AuditFinding，全部一致时为空列表
+        """
+        findings = []
+        with self.model.reader() as conn:
+            for check in (self.check_models, self.check_units, self.check_building,
+                          self.check_groups, self.check_results):
+                findings.extend(check(conn))
+        return findings
+
+    def check_models(self, conn):
+        """核对每个分摊模型的分摊公共面积之和"""
+        rows = conn.execute(f'''SELECT m.model_name,
+                                       SUM(r.apportionable_area), COUNT(r.apportionable_area),
+                                       SUM(r.apportioned_area), COUNT(r.apportioned_area),
+                                       MIN(r.coefficient), MAX(r.coefficient),
+                                       SUM(CASE WHEN r.apportioned_area IS NOT NULL THEN {UNIT_AREA} END)
+                                FROM "分摊计算结果" r
+                                JOIN "分摊模型关系" m ON m.model_id = r.model_id
+                                {UNIT_JOINS}
+                                GROUP BY r.model_id
+                                ORDER BY m.order_index, m.model_id''').fetchall()
+        for (name, apportionable, c_count, apportioned, h_count,
+             min_coefficient, max_coefficient, h_area) in rows:
+            # 只计算了应分摊公共面积、尚未分摊的模型不核对
+            if not h_count:
+                continue
+            # 应分摊公共面积已按计算时选择的上级分摊系数（可能为无上级分摊系数）放大，
+            # 其和即应分摊总面积；各单元分别保留2位小数，按单元数放宽容差
+            if c_count:
+                tolerance = self.tolerance + ROUNDING_ERROR * c_count
+                if abs(apportioned - apportionable) > tolerance:
+                    yield AuditFinding(MODEL_BALANCE, name, apportionable, apportioned, tolerance)
+            if max_coefficient - min_coefficient > COEFFICIENT_ROUNDING_ERROR:
+                yield AuditFinding(MODEL_COEFFICIENT, f"{name} 各单元分摊系数不一致",
+                                   min_coefficient, max_coefficient, COEFFICIENT_ROUNDING_ERROR)
+            tolerance = self.tolerance + COEFFICIENT_ROUNDING_ERROR * (h_area or 0)
+            expected = max_coefficient * (h_area or 0)
+            if abs(apportioned - expected) > tolerance:
+                yield AuditFinding(MODEL_COEFFICIENT, f"{name} 分摊系数 × 参与分摊单元面积", expected, apportioned, tolerance)
+
+    def check_units(self, conn):
+        """核对每个单元的分摊公共面积之和，只查询超出容差的单元"""
+        rows = conn.execute(f'''SELECT r.unit_id, {UNIT_AREA} * SUM(r.coefficient), SUM(r.apportioned_area),
+                                       ? + 2 * ? * COUNT(r.apportioned_area)
+                                FROM "分摊计算结果" r
+                                {UNIT_JOINS}
+                                WHERE r.apportioned_area IS NOT NULL
+                                GROUP BY r.unit_id
+                                HAVING ABS(SUM(r.apportioned_area) - {UNIT_AREA} * SUM(r.coefficient))
+                                       > ? + 2 * ? * COUNT(r.apportioned_area)''',
+                            (self.tolerance, ROUNDING_ERROR, self.tolerance, ROUNDING_ERROR)).fetchall()
+        for unit_id, expected, actual, tolerance in rows:
+            yield AuditFinding(UNIT_BALANCE, unit_id, expected, actual, tolerance)
+
+    def check_building(self, conn):
+        """
+        核对幢总建筑面积
+
+        应分摊共有建筑部位的套内面积由分摊公共面积替代。单元从上级模型分得的面积，
+        在其作为下级模型的应分摊共有建筑部位时按上级分摊系数计入应分摊公共面积再次分摊，
+        这部分（应分摊公共面积 - 套内面积）只计一次；其余分摊公共面积，包括参与分摊单元中
+        应分摊共有建筑部位自身分得的面积，都属于最终面积。
+        """
+        model_count = conn.execute('SELECT COUNT(DISTINCT model_id) FROM "分摊计算结果"').fetchone()[0]
+        if not model_count:
+            return
+        total, inner, apportioned, forwarded = conn.execute('''
+            SELECT SUM(u.套内面积),
+                   SUM(CASE WHEN COALESCE(r.apportionable_count, 0) = 0 THEN COALESCE(u.套内面积, 0) END),
+                   SUM(r.apportioned),
+                   SUM(r.apportionable - COALESCE(u.套内面积, 0) * r.apportionable_count)
+            FROM "幢总建筑面积" u
+            LEFT JOIN (SELECT unit_id, SUM(apportioned_area) AS apportioned,
+                              SUM(apportionable_area) AS apportionable,
+                              COUNT(apportionable_area) AS apportionable_count
+                       FROM "分摊计算结果" GROUP BY unit_id) r
+            ON r.unit_id = u.ID''').fetchone()
+        # 下级模型的应分摊共有建筑部位按上级分摊系数放大后分别取整
+        forwarded_count = conn.execute('''SELECT COUNT(r.apportionable_area) FROM "分摊计算结果" r
+                                          JOIN "分摊模型关系" m ON m.model_id = r.model_id
+                                          WHERE m.parent_id IS NOT NULL''').fetchone()[0]
+        distributed = (inner or 0) + (apportioned or 0) - (forwarded or 0)
+        tolerance = self.tolerance + ROUNDING_ERROR * (model_count + forwarded_count)
+        if abs(distributed - (total or 0)) > tolerance:
+            yield AuditFinding(BUILDING_TOTAL, "套内面积 + 分摊公共面积", total or 0, distributed, tolerance)
+
+    def check_groups(self, conn):
+        """核对每个分摊所属的各分组面积之和与所加载数据表的总面积"""
+        rows = conn.execute('''SELECT r.allocation_name, p.belong_name, COUNT(a.ID), SUM(a.套内面积)
+                               FROM "分摊所属关系" r
+                               JOIN "分摊所属关系" p ON p.belong_id = r.parent_id
+                               JOIN "分摊所属成员面积" a ON a.belong_id = r.belong_id
+                               WHERE r.allocation_name IS NOT NULL
+                               GROUP BY r.allocation_name, r.parent_id''').fetchall()
+        for allocation_name, parent_name, count, group_area in rows:
+            parent_area = conn.execute(*self.model.unit_source_query(parent_name, "SUM(套内面积)")).fetchone()[0]
+            if abs((group_area or 0) - (parent_area or 0)) > self.tolerance:
+                yield AuditFinding(GROUP_TOTAL, f"{allocation_name}（{parent_name}）",
+                                   parent_area or 0, group_area or 0, self.tolerance)
+
+    def check_results(self, conn):
+        """核对计算结果对应的单元是否存在，以及分摊系数计算过程视图的总分摊系数"""
+        orphans = conn.execute(f'''SELECT COUNT(*) FROM "分摊计算结果" r {UNIT_JOINS}
+                                   WHERE h.ID IS NULL AND c.ID IS NULL''').fetchone()[0]
+        if orphans:
+            yield AuditFinding(ORPHAN_RESULT, f"{orphans} 条计算结果的单元已删除，请重新计算", 0, orphans, 0)
+
+        view_total, unit_count = conn.execute('SELECT SUM(分摊系数), COUNT(*) FROM "分摊系数计算过程"').fetchone()
+        if not unit_count:
+            return
+        table_total = conn.execute('SELECT SUM(coefficient) FROM "分摊计算结果"').fetchone()[0] or 0
+        tolerance = COEFFICIENT_ROUNDING_ERROR * unit_count
+        if abs((view_total or 0) - table_total) > tolerance:
+            yield AuditFinding(RESULT_VIEW, "总分摊系数之和", table_total, view_total or 0, tolerance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="面积一致性审核")
+    parser.add_argument("paths", nargs="+", help="项目数据库文件")
+    parser.add_argument("-t", "--tolerance", type=float, default=DEFAULT_TOLERANCE, help="基本容差（平方米）")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"[失败] {path}：数据库不存在")
+            failed += 1
+            continue
+        model = BuildingAreaModel(path)
+        try:
+            findings = AreaAuditor(model, args.tolerance).run()
+        finally:
+            model.close()
+        if findings:
+            failed += 1
+            print(f"[不一致] {path}：{len(findings)} 项")
+            for finding in findings:
+                print(f"    {finding}")
+        else:
+            print(f"[一致] {path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+建筑面积计算核心接口
+
+不依赖Qt的计算与存储接口，图形界面的控制器、命令行批处理、工作进程和其他服务共用。
+参数为数据库路径、Excel文件路径或文件流以及数据行，不弹出任何对话框。
+
+耗时操作接受 progress 回调，参数为 (说明, 已完成数量, 总数量)，总数量为0表示进度未知。
+回调中抛出 OperationCancelled 可中止操作：在事务范围内中止时，整个范围的修改回滚。
+
+用法:
+    import area_core
+    model = area_core.open_project("项目.db")
+    area_core.import_units(model, "户单元.xlsx", "户单元套内面积")
+    coefficient, error = area_core.calculate_model(model, ["分摊所属_整幢_C"], ["分摊所属_整幢_H"], 0, "整幢")
+    model.close()
+"""
+
+import os
+
+from allocation_validator import AllocationReport
+from apportionment_engine import ApportionmentEngine
+from area_audit import DEFAULT_TOLERANCE, AreaAuditor
+from model import BuildingAreaModel
+
+
+class OperationCancelled(Exception):
+    """操作被取消"""
+
+
+def notify(progress, text, done=0, total=0):
+    """调用进度回调，未指定回调时忽略"""
+    if progress is not None:
+        progress(text, done, total)
+
+
+def open_project(db_path, performance_mode=False, fixed_point=False, shared_connection=True):
+    """
+    打开项目数据库
+
+    :param db_path: 数据库文件路径，不存在时新建
+    :param performance_mode: 是否启用WAL日志等性能参数
+    :param fixed_point: 是否以整数定点数计算（见area_arithmetic）
+    :param shared_connection: 是否与同一项目的其他模型共享写连接，工作线程使用专用连接
+    :return: BuildingAreaModel，用完后调用close()
+    """
+    arithmetic = None
+    if fixed_point:
+        # area_arithmetic依赖NumPy，只在使用定点数计算时导入；浮点数计算由模型在首次计算时创建
+        from area_arithmetic import FixedPointArithmetic
+        arithmetic = FixedPointArithmetic()
+    return BuildingAreaModel(db_path, performance_mode, arithmetic, shared_connection=shared_connection)
+
+
+def is_file_source(source):
+    """数据来源是否为文件路径或文件流"""
+    return isinstance(source, (str, bytes, os.PathLike)) or hasattr(source, "read")
+
+
+def read_units(model, source, table_name):
+    """
+    读取Excel文件并分配ID，不写入数据库
+
+    :param source: Excel文件路径或文件流
+    :param table_name: 目标单元表名，决定ID前缀
+    :return: 含ID列的数据行列表，读取失败时为空列表
+    """
+    return model.import_data(source, table_name)
+
+
+def import_units(model, source, table_name, progress=None):
+    """
+    向单元表追加数据，ID接在已有ID之后
+
+    Excel文件路径和文件流按块流式读取写入；数据行（列表、NumPy数组等）一次写入。
+    全部数据在同一事务中提交，出错时整体回滚。
+
+    :param source: Excel文件路径、文件流，或不含ID列的数据行
+    :param table_name: 目标单元表名（户单元套内面积 或 共有建筑面积）
+    :return: (是否成功, 导入行数 或 错误信息)
+    """
+    if is_file_source(source):
+        # 流式导入捕获全部异常并回滚，取消需在回滚后重新抛出
+        cancelled = []
+
+        def report(done, total):
+            try:
+                notify(progress, "导入数据", done, total or 0)
+            except OperationCancelled as e:
+                cancelled.append(e)
+                raise
+
+        result = model.import_data_streaming(source, table_name,
+                                             progress_callback=report if progress is not None else None)
+        if cancelled:
+            raise cancelled[0]
+        return result
+
+    rows = source.tolist() if hasattr(source, "tolist") else [list(row) for row in source]
+    try:
+        with model.transaction():
+            count = model.append_rows(table_name, rows)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        return False, str(e)
+    return True, count
+
+
+def save_units(model, table_name, rows, headers):
+    """
+    以数据行替换单元表的全部数据，只写入新增、修改和删除的行
+
+    :param rows: 含ID列的全部数据行
+    :param headers: 表头
+    :return: 是否成功
+    """
+    model.data = rows
+    model.headers = headers
+    return model.save_data(table_name)
+
+
+def save_unit_changes(model, table_name, rows):
+    """
+    只保存修改过的行
+
+    :param rows: 修改后的完整数据行，第一列为ID
+    :return: 是否成功
+    """
+    return model.save_changes(table_name, rows)
+
+
+def recalculate_changed(model):
+    """
+    重新计算受已保存单元变化影响的分摊模型及其下级模型并写回
+
+    :return: ModelResult列表，没有受影响的模型时为空列表
+    """
+    unit_changes = model.take_dirty_units()
+    if not unit_changes:
+        return []
+    return ApportionmentEngine(model).recalculate(unit_changes)
+
+
+def recalculate_all(model, progress=None):
+    """
+    按模型层级自上而下重新计算全部分摊模型，结果在一个事务中写回
+
+    写回之前中止时不修改数据库。
+
+    :return: ModelResult列表
+    """
+    engine = ApportionmentEngine(model)
+    notify(progress, "载入分摊数据")
+    engine.load()
+    notify(progress, "计算分摊模型")
+    results = engine.evaluate()
+    notify(progress, "写回计算结果")
+    engine.write(results)
+    return results
+
+
+def calculate_apportionment_coefficient(model, c_tables, h_tables, upper_coefficient, model_type):
+    """
+    计算并保存分摊系数和分摊公共面积
+
+    :return: (分摊系数, 错误信息)
+    """
+    try:
+        # 获取共有建筑部分的总面积
+        c_total_area = model.get_total_area(c_tables)
+
+        # 获取参与分摊单元的总面积
+        h_total_area = model.get_total_area(h_tables)
+
+        if h_total_area == 0:
+            return 0, "参与分摊单元的总面积为0，无法计算分摊系数"
+
+        # 按模型的算术方式计算分摊系数并保留6位小数
+        coefficient = model.arithmetic.coefficient(c_total_area, h_total_area, upper_coefficient)
+
+        # 保存分摊系数和分摊公共面积到数据库，分摊公共面积之和等于应分摊总面积
+        model.save_apportionment_coefficient(h_tables, coefficient, model_type, c_total_area, upper_coefficient)
+
+        return coefficient, None
+    except Exception as e:
+        return 0, str(e)
+
+
+def calculate_model(model, c_tables, h_tables, upper_coefficient, model_type, progress=None):
+    """
+    计算一个分摊模型：先保存应分摊公共面积，再计算并保存分摊系数
+
+    计算前先删除模型原有的计算结果，已移出所选分组的单元不保留旧结果，与 recalculate_all 一致。
+    删除和两步计算在同一事务中提交，任一步失败或被中止则全部回滚。
+    计算成功时同时保存模型的输入，供 recalculate_all 整体重新计算。
+
+    :return: (分摊系数, 错误信息)
+    """
+    with model.transaction():
+        notify(progress, "计算应分摊公共面积")
+        try:
+            model.delete_apportionment_model_data(model_type)
+            success, error = model.calculate_and_save_apportionable_area(c_tables, upper_coefficient, model_type)
+            if not success:
+                error = f"计算应分摊公共面积时出错：{error}"
+        except Exception as e:
+            success, error = False, str(e)
+        if not success:
+            model.rollback()
+            return 0, error
+
+        notify(progress, "计算分摊系数")
+        coefficient, error = calculate_apportionment_coefficient(
+            model, c_tables, h_tables, upper_coefficient, model_type)
+        if error:
+            model.rollback()
+        else:
+            model.save_model_inputs(model_type, c_tables, h_tables)
+        return coefficient, error
+
+
+def delete_model(model, model_name, progress=None):
+    """
+    删除分摊模型及其子模型的计算结果和关系记录，在同一事务中提交
+
+    :return: (是否成功, 说明)
+    """
+    try:
+        all_models = [model_name] + model.get_child_models(model_name)
+
+        deleted_columns = []
+        with model.transaction():
+            for index, name in enumerate(all_models):
+                notify(progress, f"删除模型 {name}", index, len(all_models))
+                result = model.delete_apportionment_model_data(name)
+                if result:
+                    deleted_columns.extend(result)
+
+            # 删除模型关系记录
+            deleted = model.delete_model_relationship(model_name)
+
+        if not deleted:
+            return False, f"删除模型 '{model_name}' 的关系记录失败"
+        if deleted_columns:
+            return True, f"已成功删除模型 '{model_name}' 及其子模型，删除的数据列：{', '.join(deleted_columns)}"
+        return True, f"已成功删除模型 '{model_name}' 及其子模型的关系记录"
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        return False, f"删除模型时出错：{str(e)}"
+
+
+def validate_allocation(data_to_save, loaded_data, group_names=None):
+    """
+    验证分摊所属的分组数据，错误信息只包含第一页问题
+
+    :param data_to_save: [(分组名, ID, 房号, 套内面积), ...]
+    :param loaded_data: 所加载数据表的 [(ID, 房号, 套内面积), ...]
+    :param group_names: 全部分组名，用于检查空分组
+    :return: (是否通过, 说明)
+    """
+    report = AllocationReport(data_to_save, loaded_data, group_names)
+    errors = [str(issue) for issue in report.next_page()]
+    if report.has_more:
+        errors.append(f"……仅显示前 {report.count} 条问题")
+
+    if errors:
+        return False, "数据验证失败:\n" + "\n".join(errors)
+    return True, "验证通过"
+
+
+def save_allocation(model, allocation_name, data, parent_table=None):
+    """
+    保存已通过验证的分摊所属分组数据
+
+    :return: (是否成功, 说明)
+    """
+    created_tables = model.save_allocation_data(allocation_name, data, parent_table)
+    return True, f"数据已成功保存到以下表: {', '.join(created_tables)}"
+
+
+def delete_allocation(model, allocation_name):
+    """
+    删除分摊所属及其子分摊所属的分组，分组仍被已保存的分摊模型使用时不删除
+
+    :return: (是否成功, 删除的分组名列表 或 错误信息)
+    """
+    try:
+        return True, model.delete_allocation_tables(allocation_name)
+    except ValueError as e:
+        return False, str(e)
+
+
+def audit(model, tolerance=DEFAULT_TOLERANCE):
+    """
+    审核已保存数据的面积一致性
+
+    :return: AuditFinding列表，全部一致时为空列表
+    """
+    return AreaAuditor(model, tolerance).run()
@@ -0,0 +1,208 @@
+"""
+批量导入命令行工具
+
+无需图形界面，批量导入多幢楼的户单元（H）和共有建筑（C）Excel数据。
+各工作簿在工作进程中并行解析，解析结果汇总到主进程中唯一的写入端，
+按幢写入各自的数据库文件（<输出目录>/<幢名>.db）。
+
+用法:
+    python batch_import.py 数据目录 [-o 输出目录] [-j 进程数]
+    python batch_import.py --manifest 清单.csv [-o 输出目录] [-j 进程数]
+
+数据目录下每个子目录视为一幢，文件名以 H 开头的工作簿导入户单元套内面积，
+以 C 开头的导入共有建筑面积。清单为CSV文件，包含 building,kind,path 三列，
+kind 取 H 或 C。
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from excel_reader import ExcelChunkReader
+
+# 文件类型与目标表的对应关系
+KIND_TABLES = {"H": "户单元套内面积", "C": "共有建筑面积"}
+
+
+def scan_directory(root):
+    """
+    扫描数据目录，收集待导入的工作簿
+
+    :param root: 数据目录
+    :return: [(幢名, 类型, 文件路径), ...]
+    """
+    jobs = []
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in sorted(file_names):
+            kind = file_name[:1].upper()
+            if not file_name.lower().endswith(".xlsx") or kind not in KIND_TABLES:
+                continue
+            if file_name.startswith("~$"):
+                # 跳过Excel的临时锁文件
+                continue
+            relative = os.path.relpath(dir_path, root)
+            building = os.path.basename(os.path.abspath(root)) if relative == "." else relative.replace(os.sep, "_")
+            jobs.append((building, kind, os.path.join(dir_path, file_name)))
+    return jobs
+
+
+def read_manifest(manifest_path):
+    """
+    读取导入清单
+
+    :param manifest_path: CSV清单路径，相对路径以清单所在目录为基准
+    :return: [(幢名, 类型, 文件路径), ...]
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            kind = row["kind"].strip().upper()
+            if kind not in KIND_TABLES:
+                raise ValueError(f"清单中的类型无效：{row['kind']}")
+            path = os.path.join(base_dir, row["path"].strip())
+            jobs.append((row["building"].strip(), kind, path))
+    return jobs
+
+
+def parse_workbook(building, kind, path):
+    """
+    在工作进程中解析一个工作簿
+
+    :return: (幢名, 类型, 文件路径, 数据行列表, 解析耗时秒数)
+    """
+    start = time.perf_counter()
+    rows = []
+    with ExcelChunkReader(path) as reader:
+        for chunk in reader:
+            rows.extend(chunk)
+    return building, kind, path, rows, time.perf_counter() - start
+
+
+class BuildingWriter:
+    """
+    按幢写入数据库的写入端
+
+    所有写入都在主进程中完成，每幢一个数据库，同一幢的每张表在首次写入前清空，
+    该幢的全部工作簿写入完成后关闭其数据库。
+
+    每个工作簿的清空和写入在同一事务中提交，写入失败时整体回滚：
+    失败的工作簿不留下任何行，也不清空该表，该表由同一幢下一个写入成功的工作簿清空。
+    """
+
+    def __init__(self, output_dir, pending_counts):
+        """
+        :param output_dir: 数据库输出目录
+        :param pending_counts: 每幢待写入的工作簿数量 {幢名: 数量}
+        """
+        self.output_dir = output_dir
+        self.pending_counts = dict(pending_counts)
+        self.models = {}
+        self.cleared_tables = set()
+
+    def write(self, building, kind, rows):
+        """写入一个工作簿的数据，返回写入行数"""
+        # 写入端只在主进程中使用，推迟导入核心接口，工作进程只解析工作簿
+        import area_core
+
+        if building not in self.models:
+            db_path = os.path.join(self.output_dir, f"{building}.db")
+            self.models[building] = area_core.open_project(db_path)
+        model = self.models[building]
+
+        table_name = KIND_TABLES[kind]
+        clear = (building, table_name) not in self.cleared_tables
+        with model.transaction():
+            if clear:
+                model.clear_table(table_name)
+            count = model.append_rows(table_name, rows)
+        if clear:
+            self.cleared_tables.add((building, table_name))
+
+        self.pending_counts[building] -= 1
+        if self.pending_counts[building] == 0:
+            self.finish(building)
+        return count
+
+    def finish(self, building):
+        """关闭该幢的数据库"""
+        model = self.models.pop(building, None)
+        if model is not None:
+            model.close()
+
+    def close(self):
+        """关闭所有仍打开的数据库（如部分工作簿解析失败）"""
+        for building in list(self.models):
+            self.finish(building)
+
+
+def run_batch(jobs, output_dir, workers=None):
+    """
+    并行解析并写入所有工作簿
+
+    :param jobs: [(幢名, 类型, 文件路径), ...]
+    :param output_dir: 数据库输出目录
+    :param workers: 工作进程数，默认为CPU核数
+    :return: 失败的工作簿数量
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pending_counts = {}
+    for building, _, _ in jobs:
+        pending_counts[building] = pending_counts.get(building, 0) + 1
+
+    writer = BuildingWriter(output_dir, pending_counts)
+    failures = 0
+    total_rows = 0
+    batch_start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(parse_workbook, *job): job for job in jobs}
+            for future in as_completed(futures):
+                building, kind, path = futures[future]
+                try:
+                    _, _, _, rows, parse_seconds = future.result()
+                    write_start = time.perf_counter()
+                    count = writer.write(building, kind, rows)
+                    write_seconds = time.perf_counter() - write_start
+                except Exception as e:
+                    failures += 1
+                    writer.pending_counts[building] -= 1
+                    print(f"[失败] {building} {kind} {path}：{str(e)}")
+                    continue
+                total_rows += count
+                print(f"[完成] {building} {kind} {path}：{count}行，"
+                      f"解析 {parse_seconds:.3f}s，写入 {write_seconds:.3f}s")
+    finally:
+        writer.close()
+
+    print(f"共处理 {len(jobs)} 个工作簿，{total_rows} 行，失败 {failures} 个，"
+          f"总耗时 {time.perf_counter() - batch_start:.3f}s")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导入户单元和共有建筑Excel数据")
+    parser.add_argument("directory", nargs="?", help="数据目录，每个子目录为一幢")
+    parser.add_argument("--manifest", help="CSV导入清单（building,kind,path）")
+    parser.add_argument("-o", "--output", default="buildings", help="数据库输出目录")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        jobs = read_manifest(args.manifest)
+    elif args.directory:
+        jobs = scan_directory(args.directory)
+    else:
+        parser.error("请指定数据目录或 --manifest 清单")
+
+    if not jobs:
+        print("未找到可导入的工作簿")
+        return 1
+    return 1 if run_batch(jobs, args.output, args.jobs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
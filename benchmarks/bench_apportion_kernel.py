@@ -0,0 +1,71 @@
+"""
+分摊公共面积计算内核基准测试
+
+在合成的多幢数据上，对比逐单元计算并各自取整（Python循环）
+与 apportion_kernel 一次批量计算并按最大余数法取整的耗时，
+以及各幢分摊公共面积之和与应分摊总面积之间的偏差。
+
+用法:
+    python benchmarks/bench_apportion_kernel.py [-n 单元数] [-b 幢数]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apportion_kernel import apportion_batch
+
+
+def synthetic_buildings(unit_count, building_count, seed=0):
+    """生成合成的多幢数据：各单元套内面积、所属幢序号，各幢分摊系数和应分摊总面积"""
+    rng = np.random.default_rng(seed)
+    areas = np.round(rng.uniform(30, 180, unit_count), 2)
+    groups = np.sort(rng.integers(0, building_count, unit_count))
+    totals = np.round(rng.uniform(0.05, 0.3, building_count)
+                      * np.bincount(groups, weights=areas, minlength=building_count), 2)
+    coefficients = np.round(totals / np.maximum(np.bincount(groups, weights=areas, minlength=building_count), 1), 6)
+    return areas, groups, coefficients, totals
+
+
+def per_unit_rounding(areas, groups, coefficients):
+    """逐单元计算并各自保留2位小数"""
+    coefficient_list = coefficients.tolist()
+    return [round(area * coefficient_list[group], 2) for area, group in zip(areas.tolist(), groups.tolist())]
+
+
+def max_drift(apportioned, groups, totals):
+    """各幢分摊公共面积之和与应分摊总面积的最大偏差（平方米）"""
+    sums = np.bincount(groups, weights=np.asarray(apportioned), minlength=len(totals))
+    return float(np.max(np.abs(sums - totals)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分摊公共面积计算内核基准测试")
+    parser.add_argument("-n", "--units", type=int, default=2000000, help="单元数")
+    parser.add_argument("-b", "--buildings", type=int, default=1000, help="幢数")
+    args = parser.parse_args()
+
+    areas, groups, coefficients, totals = synthetic_buildings(args.units, args.buildings)
+
+    start = time.perf_counter()
+    rounded = per_unit_rounding(areas, groups, coefficients)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    balanced = apportion_batch(areas, groups, coefficients, totals)
+    kernel_seconds = time.perf_counter() - start
+
+    print(f"单元数：{args.units}，幢数：{args.buildings}")
+    print(f"逐单元取整：{loop_seconds:.3f}s，最大偏差 {max_drift(rounded, groups, totals):.2f}平方米")
+    print(f"批量最大余数取整：{kernel_seconds:.3f}s，最大偏差 {max_drift(balanced, groups, totals):.2f}平方米")
+    print(f"加速 {loop_seconds / kernel_seconds:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
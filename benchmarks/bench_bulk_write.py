@@ -0,0 +1,128 @@
+"""
+分摊计算批量写入基准测试
+
+对比逐行写入（每个单元先 SELECT 再 UPDATE 或 INSERT，写入按模型分列的宽表）
+与批量写入（一次查询单元，一条 INSERT ... ON CONFLICT DO UPDATE 语句
+executemany 整批写入分摊计算结果表）保存应分摊公共面积和分摊系数时
+执行的SQL语句数和耗时。
+
+用法:
+    python benchmarks/bench_bulk_write.py [-n 单元数 ...]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import BuildingAreaModel
+from bench_transactions import synthetic_units
+
+# 参与计算的表、上级分摊系数、分摊系数和模型名
+TABLES = ["分摊所属_整幢"]
+UPPER_COEFFICIENT = 0.05
+COEFFICIENT = 0.123456
+MODEL_TYPE = "整幢"
+
+# 逐行写入使用的宽表
+ROW_BY_ROW_TABLE = "逐行写入对照"
+
+
+def row_by_row_write(model):
+    """逐行写入，与批量写入前的实现相同"""
+    area_column = f"{MODEL_TYPE}_应分摊公共面积"
+    coefficient_column = f"{MODEL_TYPE}_分摊系数"
+    share_column = f"{MODEL_TYPE}_分摊公共面积"
+    with model.transaction():
+        model.cursor.execute(f'''CREATE TABLE IF NOT EXISTS "{ROW_BY_ROW_TABLE}"
+                                 (ID TEXT PRIMARY KEY, 房号 TEXT, 套内面积 REAL, "{area_column}" REAL,
+                                  "{coefficient_column}" REAL, "{share_column}" REAL)''')
+        for table in TABLES:
+            model.cursor.execute(*model.unit_source_query(table))
+            for row in model.cursor.fetchall():
+                inner_area = row[2] or 0
+                apportionable_area = round(inner_area + inner_area * UPPER_COEFFICIENT, 2)
+                model.cursor.execute(f'SELECT * FROM "{ROW_BY_ROW_TABLE}" WHERE ID = ?', (row[0],))
+                if model.cursor.fetchone():
+                    model.cursor.execute(f'''UPDATE "{ROW_BY_ROW_TABLE}"
+                                             SET 房号 = ?, 套内面积 = ?, '{area_column}' = ? WHERE ID = ?''',
+                                         (row[1], row[2], apportionable_area, row[0]))
+                else:
+                    model.cursor.execute(f'''INSERT INTO "{ROW_BY_ROW_TABLE}"
+                                             (ID, 房号, 套内面积, '{area_column}') VALUES (?, ?, ?, ?)''',
+                                         (row[0], row[1], row[2], apportionable_area))
+
+        for table in TABLES:
+            model.cursor.execute(*model.unit_source_query(table))
+            for row in model.cursor.fetchall():
+                apportioned_area = round((row[2] or 0) * COEFFICIENT, 2)
+                model.cursor.execute(f'SELECT * FROM "{ROW_BY_ROW_TABLE}" WHERE ID = ?', (row[0],))
+                if model.cursor.fetchone():
+                    model.cursor.execute(f'''UPDATE "{ROW_BY_ROW_TABLE}"
+                                             SET 房号 = ?, 套内面积 = ?, '{coefficient_column}' = ?, '{share_column}' = ?
+                                             WHERE ID = ?''',
+                                         (row[1], row[2], COEFFICIENT, apportioned_area, row[0]))
+                else:
+                    model.cursor.execute(f'''INSERT INTO "{ROW_BY_ROW_TABLE}"
+                                             (ID, 房号, 套内面积, '{coefficient_column}', '{share_column}')
+                                             VALUES (?, ?, ?, ?, ?)''',
+                                         (row[0], row[1], row[2], COEFFICIENT, apportioned_area))
+
+
+def bulk_write(model):
+    """批量写入"""
+    with model.transaction():
+        model.calculate_and_save_apportionable_area(TABLES, UPPER_COEFFICIENT, MODEL_TYPE)
+        model.save_apportionment_coefficient(TABLES, COEFFICIENT, MODEL_TYPE)
+
+
+def run_case(db_path, rows, write):
+    """
+    在新数据库中写入两次（首次插入、再次更新），返回 [(语句数, 耗时), ...]
+    """
+    model = BuildingAreaModel(db_path)
+    model.append_rows("户单元套内面积", rows)
+    model.commit()
+
+    statements = [0]
+
+    def count_statement(_):
+        statements[0] += 1
+
+    results = []
+    for _ in range(2):
+        statements[0] = 0
+        model.conn.set_trace_callback(count_statement)
+        start = time.perf_counter()
+        write(model)
+        elapsed = time.perf_counter() - start
+        model.conn.set_trace_callback(None)
+        results.append((statements[0], elapsed))
+    model.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分摊计算批量写入基准测试")
+    parser.add_argument("-n", "--units", type=int, nargs="+", default=[10000, 100000], help="单元数")
+    args = parser.parse_args()
+
+    for count in args.units:
+        rows = [row[1:] for row in synthetic_units(count)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            before = run_case(os.path.join(temp_dir, "before.db"), rows, row_by_row_write)
+            after = run_case(os.path.join(temp_dir, "after.db"), rows, bulk_write)
+
+        print(f"单元数：{count}")
+        for name, (before_count, before_time), (after_count, after_time) in zip(
+                ("首次写入", "重复写入"), before, after):
+            print(f"  {name}：逐行 {before_count}条语句 {before_time:.3f}s，"
+                  f"批量 {after_count}条语句 {after_time:.3f}s，加速 {before_time / after_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+整数定点数计算基准测试
+
+在合成的多个分摊模型上，分别以浮点数（FloatArithmetic）和整数定点数（FixedPointArithmetic）
+计算分摊系数、应分摊公共面积和分摊公共面积，对比耗时，
+并以decimal十进制精确计算（四舍五入）的结果为准，统计两者与之不一致的数量:
+    - 分摊系数（6位小数）
+    - 各单元应分摊公共面积（2位小数）
+    - 分摊公共面积之和与应分摊总面积（2位小数）
+
+用法:
+    python benchmarks/bench_fixed_point.py [-n 单元数] [-m 模型数]
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from area_arithmetic import FixedPointArithmetic, FloatArithmetic
+
+COEFFICIENT_QUANTUM = Decimal("0.000001")
+AREA_QUANTUM = Decimal("0.01")
+
+
+def synthetic_models(unit_count, model_count, seed=0):
+    """
+    生成合成的分摊模型：[(应分摊共有建筑部位面积, 参与分摊单元面积, 上级分摊系数), ...]
+
+    面积保留2位小数；上级分摊系数取3位小数（如0.125），使应分摊公共面积较常落在舍入的中间值上
+    """
+    rng = np.random.default_rng(seed)
+    models = []
+    per_model = max(unit_count // model_count, 2)
+    for _ in range(model_count):
+        h_areas = np.round(rng.uniform(30, 180, per_model), 2).tolist()
+        c_areas = np.round(rng.uniform(5, 400, max(per_model // 20, 1)), 2).tolist()
+        upper = round(float(rng.uniform(0, 0.3)), 3) if rng.random() < 0.5 else 0.0
+        models.append((c_areas, h_areas, upper))
+    return models
+
+
+def run(arithmetic, models):
+    """以指定算术方式计算全部模型，返回 [(分摊系数, 应分摊公共面积列表, 分摊公共面积列表), ...]"""
+    results = []
+    for c_areas, h_areas, upper in models:
+        # 面积之和与BuildingAreaModel.get_total_area相同，由SQL的SUM得到浮点数
+        c_total = sum(c_areas)
+        coefficient = arithmetic.coefficient(c_total, sum(h_areas), upper)
+        apportionable = arithmetic.apportionable_areas(c_areas, upper)
+        apportioned = arithmetic.apportioned_areas(h_areas, coefficient, c_total, upper)
+        results.append((coefficient, apportionable, apportioned))
+    return results
+
+
+def reference(models):
+    """以decimal十进制精确计算并四舍五入，返回 [(分摊系数, 应分摊公共面积列表, 应分摊总面积), ...]"""
+    results = []
+    for c_areas, h_areas, upper in models:
+        factor = 1 + Decimal(repr(upper))
+        c_decimals = [Decimal(repr(area)) for area in c_areas]
+        c_total = sum(c_decimals)
+        coefficient = (c_total * factor / sum(Decimal(repr(area)) for area in h_areas)).quantize(
+            COEFFICIENT_QUANTUM, ROUND_HALF_UP)
+        apportionable = [(area * factor).quantize(AREA_QUANTUM, ROUND_HALF_UP) for area in c_decimals]
+        total = (c_total * factor).quantize(AREA_QUANTUM, ROUND_HALF_UP)
+        results.append((coefficient, apportionable, total))
+    return results
+
+
+def mismatches(results, expected):
+    """统计与精确结果不一致的分摊系数、应分摊公共面积和分摊公共面积之和的数量"""
+    coefficients = apportionable = totals = 0
+    for (coefficient, areas, apportioned), (exact_coefficient, exact_areas, exact_total) in zip(results, expected):
+        coefficients += Decimal(repr(coefficient)) != exact_coefficient
+        apportionable += sum(Decimal(repr(area)) != exact for area, exact in zip(areas, exact_areas))
+        # 以0.01平方米为单位比较，避免浮点数求和的误差
+        totals += sum(round(area * 100) for area in apportioned) != int(exact_total * 100)
+    return coefficients, apportionable, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整数定点数计算基准测试")
+    parser.add_argument("-n", "--units", type=int, default=500000, help="参与分摊单元总数")
+    parser.add_argument("-m", "--models", type=int, default=500, help="分摊模型数")
+    args = parser.parse_args()
+
+    models = synthetic_models(args.units, args.models)
+    expected = reference(models)
+    unit_count = sum(len(h_areas) for _, h_areas, _ in models)
+    apportionable_count = sum(len(c_areas) for c_areas, _, _ in models)
+
+    print(f"模型数：{len(models)}，参与分摊单元：{unit_count}，应分摊共有建筑部位：{apportionable_count}")
+    timings = {}
+    for label, arithmetic in (("浮点数", FloatArithmetic()), ("整数定点数", FixedPointArithmetic(ROUND_HALF_UP))):
+        start = time.perf_counter()
+        results = run(arithmetic, models)
+        timings[label] = time.perf_counter() - start
+        coefficients, apportionable, totals = mismatches(results, expected)
+        print(f"{label}：{timings[label]:.3f}s，不一致 分摊系数 {coefficients}，"
+              f"应分摊公共面积 {apportionable}，分摊公共面积之和 {totals}")
+    print(f"整数定点数耗时为浮点数的 {timings['整数定点数'] / timings['浮点数']:.2f} 倍")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+数值列类型基准测试
+
+对比面积以TEXT存储（旧结构）与以REAL存储（新结构）时，
+面积汇总查询和逐单元分摊计算的耗时。
+
+用法:
+    python benchmarks/bench_numeric_schema.py [-n 单元数] [-r 重复次数]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def build_database(path, area_type, units):
+    """创建一个包含指定数量单元的分摊所属表"""
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE "分摊所属_整幢" (ID TEXT, 房号 TEXT, 套内面积 {area_type})')
+    rng = random.Random(0)
+    rows = []
+    for i in range(units):
+        area = round(rng.uniform(30, 200), 2)
+        rows.append((f"H{i + 1}", f"{i // 20 + 1}{i % 20 + 1:02d}",
+                     f"{area:.2f}" if area_type == "TEXT" else area))
+    conn.executemany('INSERT INTO "分摊所属_整幢" VALUES (?, ?, ?)', rows)
+    conn.commit()
+    return conn
+
+
+def best_of(repeat, func):
+    """重复执行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def legacy_aggregate(conn):
+    return conn.execute('SELECT SUM(CAST(套内面积 AS FLOAT)) FROM "分摊所属_整幢"').fetchone()[0]
+
+
+def numeric_aggregate(conn):
+    return conn.execute('SELECT SUM(套内面积) FROM "分摊所属_整幢"').fetchone()[0]
+
+
+def legacy_calculation(conn, coefficient=0.123456):
+    # 旧实现：逐行把文本转为浮点数，结果再格式化为文本
+    formatted_coefficient = f"{coefficient:.6f}"
+    results = []
+    for row in conn.execute('SELECT ID, 房号, 套内面积 FROM "分摊所属_整幢"'):
+        inner_area = float(row[2])
+        results.append((row[0], formatted_coefficient, f"{inner_area * coefficient:.2f}"))
+    return results
+
+
+def numeric_calculation(conn, coefficient=0.123456):
+    coefficient = round(coefficient, 6)
+    results = []
+    for row in conn.execute('SELECT ID, 房号, 套内面积 FROM "分摊所属_整幢"'):
+        results.append((row[0], coefficient, round((row[2] or 0) * coefficient, 2)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="面积列类型基准测试")
+    parser.add_argument("-n", "--units", type=int, default=100000, help="单元数")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        legacy = build_database(os.path.join(temp_dir, "legacy.db"), "TEXT", args.units)
+        numeric = build_database(os.path.join(temp_dir, "numeric.db"), "REAL", args.units)
+
+        assert abs(legacy_aggregate(legacy) - numeric_aggregate(numeric)) < 1e-6
+
+        cases = [
+            ("面积汇总", lambda: legacy_aggregate(legacy), lambda: numeric_aggregate(numeric)),
+            ("分摊计算", lambda: legacy_calculation(legacy), lambda: numeric_calculation(numeric)),
+        ]
+        print(f"单元数：{args.units}")
+        for name, legacy_func, numeric_func in cases:
+            legacy_time = best_of(args.repeat, legacy_func)
+            numeric_time = best_of(args.repeat, numeric_func)
+            print(f"{name}：TEXT {legacy_time * 1000:.2f}ms，REAL {numeric_time * 1000:.2f}ms，"
+                  f"加速 {legacy_time / numeric_time:.2f}x")
+
+        legacy.close()
+        numeric.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
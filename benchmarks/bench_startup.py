@@ -0,0 +1,131 @@
+"""
+启动时间基准测试
+
+在新的Python进程中用 -X importtime 导入 main，按模块汇总导入耗时，
+并分别计时打开数据库（新建与结构已是当前版本）、创建主窗口和首次切换到其余标签页，
+同时检查启动后是否已加载pandas、openpyxl、NumPy等只在导入数据或计算时才需要的库。
+
+没有显示器时以 QT_QPA_PLATFORM=offscreen 运行。
+
+用法:
+    python benchmarks/bench_startup.py [-n 显示的模块数] [-r 重复次数]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 启动时不应加载的库
+DEFERRED_MODULES = ("pandas", "openpyxl", "numpy")
+
+# 在子进程中执行的启动过程，各阶段耗时以 "阶段\t秒数" 输出
+STARTUP_SCRIPT = r'''
+import os, sys, time
+start = time.perf_counter()
+def mark(stage):
+    global start
+    now = time.perf_counter()
+    print(f"{stage}\t{now - start}")
+    start = now
+
+import main
+from PyQt5.QtWidgets import QApplication
+from model import BuildingAreaModel
+from controller import BuildingAreaController
+from MainWindow import MainWindow
+mark("导入模块")
+app = QApplication(sys.argv)
+mark("创建QApplication")
+model = BuildingAreaModel(sys.argv[1])
+mark("打开数据库")
+controller = BuildingAreaController(model, None)
+view = MainWindow(controller)
+controller.set_view(view)
+view.show()
+app.processEvents()
+mark("创建并显示主窗口")
+for index in range(1, view.tab_widget.count()):
+    view.tab_widget.setCurrentIndex(index)
+    app.processEvents()
+mark("首次切换到其余标签页")
+print("已加载\t" + ",".join(name for name in __DEFERRED__ if name in sys.modules))
+controller.tasks.wait()
+model.close()
+'''
+
+
+def import_times(env):
+    """以 -X importtime 导入main，返回 [(层级, 模块名, 累计微秒)]"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+
+def run_startup(db_path, env):
+    """在新进程中执行一次启动过程，返回 ({阶段: 秒数}, 已加载的推迟模块)"""
+    script = STARTUP_SCRIPT.replace("__DEFERRED__", repr(DEFERRED_MODULES))
+    result = subprocess.run([sys.executable, "-c", script, db_path], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    stages = {}
+    loaded = ""
+    for line in result.stdout.splitlines():
+        if "\t" not in line:
+            continue
+        stage, value = line.split("\t", 1)
+        if stage == "已加载":
+            loaded = value
+        else:
+            stages[stage] = float(value)
+    return stages, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动时间基准测试")
+    parser.add_argument("-n", "--top", type=int, default=15, help="显示导入耗时最多的模块数")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="启动过程重复次数，取最小值")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+
+    # 按模块汇总导入耗时：main导入的模块及其下一层导入的模块，按顶层包合并
+    entries = import_times(env)
+    total = next((cumulative for depth, name, cumulative in entries if name == "main"), 0)
+    print(f"导入 main 共 {total / 1000:.1f} ms，耗时最多的模块（累计）:")
+    top_level = {}
+    for depth, name, cumulative in entries:
+        if 1 <= depth <= 2:
+            package = name.split(".")[0]
+            top_level[package] = max(top_level.get(package, 0), cumulative)
+    for name, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<32}{cumulative / 1000:>10.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        print()
+        for label in ("新建数据库", "结构已是当前版本"):
+            runs = [run_startup(db_path, env) for _ in range(1 if label == "新建数据库" else args.repeat)]
+            stages = {stage: min(run[0][stage] for run in runs) for stage in runs[0][0]}
+            loaded = runs[-1][1]
+            print(f"{label}:")
+            for stage, seconds in stages.items():
+                print(f"  {stage:<24}{seconds * 1000:>10.1f} ms")
+            print(f"  启动后已加载的推迟模块: {loaded or '无'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
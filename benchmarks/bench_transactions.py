@@ -0,0 +1,90 @@
+"""
+事务与连接参数基准测试
+
+在合成的大型幢数据上，对比默认连接参数（回滚日志、每步单独提交）
+与性能模式（WAL、synchronous=NORMAL、大页缓存、内存映射，整个操作一次提交）
+下保存和分摊计算的耗时。
+
+用法:
+    python benchmarks/bench_transactions.py [-n 单元数]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import BuildingAreaModel
+
+
+def synthetic_units(count, seed=0):
+    """生成合成的户单元数据行"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        main_area = round(rng.uniform(30, 180), 2)
+        balcony_area = round(rng.uniform(0, 12), 2)
+        rows.append([f"H{i + 1}", str(i // 40 + 1), f"{i // 40 + 1}{i % 40 + 1:02d}",
+                     main_area, balcony_area, round(main_area + balcony_area, 2), "住宅"])
+    return rows
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_case(db_path, rows, performance_mode, single_transaction):
+    """执行一组保存和计算操作，返回各步骤耗时"""
+    model = BuildingAreaModel(db_path, performance_mode=performance_mode)
+    model.headers = ["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"]
+    timings = {}
+
+    model.data = rows
+    timings["全量保存"] = timed(lambda: model.save_data("户单元套内面积"))
+
+    edited = [list(row) for row in rows]
+    edited[len(edited) // 2][5] = edited[len(edited) // 2][5] + 1
+    model.data = edited
+    timings["单行修改保存"] = timed(lambda: model.save_data("户单元套内面积"))
+
+    def calculate():
+        model.calculate_and_save_apportionable_area(["分摊所属_整幢"], 0, "整幢")
+        model.save_apportionment_coefficient(["分摊所属_整幢"], 0.123456, "整幢")
+
+    if single_transaction:
+        def calculate_in_transaction():
+            with model.transaction():
+                calculate()
+        timings["分摊计算"] = timed(calculate_in_transaction)
+    else:
+        timings["分摊计算"] = timed(calculate)
+
+    model.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事务与连接参数基准测试")
+    parser.add_argument("-n", "--units", type=int, default=50000, help="单元数")
+    args = parser.parse_args()
+
+    rows = synthetic_units(args.units)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        before = run_case(os.path.join(temp_dir, "before.db"), rows, False, False)
+        after = run_case(os.path.join(temp_dir, "after.db"), rows, True, True)
+
+    print(f"单元数：{args.units}")
+    for name in before:
+        print(f"{name}：默认 {before[name]:.3f}s，性能模式 {after[name]:.3f}s，"
+              f"加速 {before[name] / after[name]:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+数据库连接管理模块
+
+按项目数据库路径管理SQLite连接：每个项目一个专用的写连接，
+以及一组只读连接供后台线程借用（如报表生成、预览），可与编辑同时进行。
+所有连接启用语句缓存，并由关闭操作显式释放，不依赖对象析构。
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 512
+
+# 每个项目默认的只读连接数量
+DEFAULT_READER_COUNT = 4
+
+# 性能模式的连接参数：WAL日志、NORMAL同步级别、64MB页缓存和256MB内存映射
+PERFORMANCE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# 只读连接使用的参数，日志模式和同步级别由写连接决定
+READER_PRAGMAS = (
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
+class ProjectConnections:
+    """
+    单个项目数据库的连接集合
+
+    写连接在创建时打开，只读连接按需创建，数量不超过reader_count。
+    在非WAL模式下，写事务提交期间只读连接会短暂等待。
+
+    写连接可能由多个模型共享，事务范围的嵌套层数和失败标记因此记录在连接集合上：
+    任一模型打开的事务范围内，其他模型的commit()和rollback()同样推迟到最外层范围结束。
+    writer_lock在事务范围内一直持有，其他线程的事务范围和提交等待当前范围结束。
+    """
+
+    def __init__(self, db_path, reader_count=DEFAULT_READER_COUNT, performance_mode=False):
+        """
+        :param db_path: 数据库文件路径
+        :param reader_count: 只读连接池大小
+        :param performance_mode: 是否启用PERFORMANCE_PRAGMAS
+        """
+        self.db_path = db_path
+        self.reader_count = reader_count
+        self.performance_mode = performance_mode
+        self.writer = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE,
+                                      check_same_thread=False)
+        if performance_mode:
+            for pragma in PERFORMANCE_PRAGMAS:
+                self.writer.execute(pragma)
+        self._readers = queue.LifoQueue()
+        self._all_readers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.ref_count = 0
+        self.writer_lock = threading.RLock()  # 写连接的事务锁，同一线程可重入
+        self.transaction_depth = 0  # 写连接上嵌套的事务范围层数
+        self.transaction_failed = False  # 当前事务范围内是否有操作失败
+
+    def _create_reader(self):
+        """创建一个只读连接"""
+        if self.db_path == ":memory:":
+            raise ValueError("内存数据库不支持只读连接")
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+        if self.performance_mode:
+            for pragma in READER_PRAGMAS:
+                conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def reader(self, timeout=None):
+        """
+        借用一个只读连接，退出时归还
+
+        连接池已满且全部被占用时阻塞等待，直到有连接归还或超时。
+
+        :param timeout: 等待秒数，None表示一直等待
+        """
+        if self._closed:
+            raise RuntimeError(f"数据库连接已关闭：{self.db_path}")
+
+        conn = None
+        with self._lock:
+            if self._readers.empty() and len(self._all_readers) < self.reader_count:
+                conn = self._create_reader()
+                self._all_readers.append(conn)
+        if conn is None:
+            conn = self._readers.get(timeout=timeout)
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def close(self):
+        """关闭写连接和所有只读连接"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+        self.writer.close()
+
+
+class ConnectionManager:
+    """
+    项目连接管理器
+
+    以数据库绝对路径为键管理ProjectConnections，同一项目多次打开时共享连接，
+    打开和关闭次数相同时才真正关闭。可同时打开多个项目。
+    """
+
+    def __init__(self):
+        self._projects = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(db_path):
+        return db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+    def open_project(self, db_path, reader_count=DEFAULT_READER_COUNT, performance_mode=False, shared=True):
+        """
+        打开项目数据库，返回其连接集合
+
+        内存数据库每次打开都是独立的连接集合，不参与共享。
+        shared为False时打开专用的连接集合（如后台任务使用），不与同一项目的其他模型共享写连接。
+        """
+        key = self._key(db_path)
+        with self._lock:
+            if key == ":memory:" or not shared:
+                project = ProjectConnections(db_path, reader_count, performance_mode)
+            else:
+                project = self._projects.get(key)
+                if project is None:
+                    project = ProjectConnections(key, reader_count, performance_mode)
+                    self._projects[key] = project
+            project.ref_count += 1
+            return project
+
+    def get_project(self, db_path):
+        """获取已打开的项目连接集合，未打开时返回None"""
+        return self._projects.get(self._key(db_path))
+
+    def close_project(self, project):
+        """释放一次对项目的引用，引用全部释放后关闭连接"""
+        with self._lock:
+            project.ref_count -= 1
+            if project.ref_count > 0:
+                return
+            if self._projects.get(project.db_path) is project:
+                del self._projects[project.db_path]
+        project.close()
+
+    def close_all(self):
+        """关闭所有已打开的项目"""
+        with self._lock:
+            projects = list(self._projects.values())
+            self._projects.clear()
+        for project in projects:
+            project.close()
+
+
+# 应用程序共用的连接管理器
+connection_manager = ConnectionManager()
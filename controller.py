@@ -1,13 +1,16 @@
-from model import BuildingAreaModel
-from MainWindow import MainWindow
-from PyQt5.QtWidgets import QMessageBox
+import area_core
+from allocation_validator import AllocationReport
+from scenarios import evaluate_scenarios
+from task_runner import TaskRunner
+from PyQt5.QtWidgets import QFileDialog
 
 class BuildingAreaController:
     """
     建筑面积控制器类
     
     负责协调模型（BuildingAreaModel）和视图（MainWindow）之间的交互。
-    控制数据的导入、保存和更新到相应的视图组件。
+    计算和存储由核心接口（area_core）完成，控制器负责选择文件、在后台任务中调用核心接口、
+    把取消和进度接到任务上，并把结果转换为界面显示的说明。
     """
 
     def __init__(self, model, view):
@@ -19,67 +22,213 @@ class BuildingAreaController:
         """
         self.model = model
         self.view = view
+        self.tasks = None  # 后台任务执行器，设置视图后创建
+        self.context = None  # 在后台任务中执行时的TaskContext
         # 移除这里的 self.connect_signals()
 
     def set_view(self, view):
         self.view = view
+        self.tasks = TaskRunner(self.model)
+        if hasattr(view, "connect_tasks"):
+            view.connect_tasks(self.tasks)
         self.connect_signals()
 
+    def run_task(self, name, method, args, on_done, failure):
+        """
+        在后台任务中执行控制器方法
+
+        任务线程中另建一个使用任务模型的控制器，以相同参数同步调用method，
+        完成后在界面线程中以其返回值调用on_done。
+
+        参数:
+            name (str): 任务名称，用于进度显示
+            method: 本控制器的方法，调用时不传on_done
+            args (tuple): 方法的参数
+            on_done (callable): 完成时调用，参数为方法的返回值
+            failure (callable): 由错误信息生成与方法返回值格式相同的结果，任务出错或取消时传给on_done
+        """
+        def function(context):
+            worker = BuildingAreaController(context.model, None)
+            worker.context = context
+            return getattr(worker, method.__name__)(*args)
+
+        if self.tasks is None:
+            on_done(method(*args))
+            return
+        started = self.tasks.start(name, function, on_done,
+                                   on_failed=lambda message: on_done(failure(message)),
+                                   on_cancelled=lambda: on_done(failure("操作已取消")))
+        if started is None:
+            on_done(failure("后台任务正在执行，请等待完成后再操作"))
+
+    def check_cancelled(self):
+        """在后台任务中执行且已请求取消时抛出TaskCancelled"""
+        if self.context is not None:
+            self.context.check_cancelled()
+
+    def report_progress(self, text, done=0, total=0):
+        """在后台任务中执行时报告进度"""
+        if self.context is not None:
+            self.context.progress(done, total, text)
+
+    def progress_hook(self, text, done=0, total=0):
+        """核心接口的进度回调：已请求取消时中止操作，否则报告进度"""
+        self.check_cancelled()
+        self.report_progress(text, done, total)
+
     def connect_signals(self):
         """
         连接视图中的按钮信号到相应的控制器方法
+
+        标签页在首次显示时才创建，已创建的视图立即连接，其余视图在创建时连接。
         """
-        # 连接住房单元1的导入和保存按钮
-        housing_unit_1 = self.view.housing_unit_1
-        housing_unit_1.import_button.clicked.connect(self.import_housing_unit_data)
-        housing_unit_1.save_button.clicked.connect(self.save_housing_unit_data)
+        self.view.view_created.connect(self.connect_view_signals)
+        for name in list(self.view.views):
+            self.connect_view_signals(name)
 
-        # 连接公共财产房屋2的导入和保存按钮
-        common_property_house_2 = self.view.common_property_house_2
-        common_property_house_2.import_button.clicked.connect(self.import_common_property_data)
-        common_property_house_2.save_button.clicked.connect(self.save_common_property_data)
+    def connect_view_signals(self, name):
+        """
+        连接一个标签页视图的按钮信号
+
+        :param name: 视图属性名
+        """
+        if name == "housing_unit_1":
+            # 连接住房单元1的导入和保存按钮
+            housing_unit_1 = self.view.housing_unit_1
+            housing_unit_1.import_button.clicked.connect(self.import_housing_unit_data)
+            housing_unit_1.save_button.clicked.connect(self.save_housing_unit_data)
+        elif name == "common_property_house_2":
+            # 连接公共财产房屋2的导入和保存按钮
+            common_property_house_2 = self.view.common_property_house_2
+            common_property_house_2.import_button.clicked.connect(self.import_common_property_data)
+            common_property_house_2.save_button.clicked.connect(self.save_common_property_data)
 
     def import_housing_unit_data(self):
         """
         导入住房单元数据并更新相应的视图
         """
-        self.model.current_table = "户单元套内面积"  # 设置当前表名
-        data = self.model.import_data()
-        self.view.housing_unit_1.update_table(data)
+        self.import_unit_data(self.view.housing_unit_1, "户单元套内面积")
 
     def import_common_property_data(self):
         """
         导入公共财产数据并更新相应的视图
         """
-        self.model.current_table = "共有建筑面积"  # 设置当前表名
-        data = self.model.import_data()
-        self.view.common_property_house_2.update_table(data)
+        self.import_unit_data(self.view.common_property_house_2, "共有建筑面积")
+
+    def choose_import_file(self):
+        """
+        让用户选择要导入的.xlsx文件
+
+        返回:
+            str: 文件路径，用户取消选择时为空字符串
+        """
+        file_path, _ = QFileDialog.getOpenFileName(None, "选择Excel文件", "", "Excel Files (*.xlsx)")
+        return file_path
+
+    def import_unit_data(self, unit_view, table_name):
+        """在界面线程中选择文件，在后台读取Excel后更新单元表界面"""
+        file_path = self.choose_import_file()
+        if not file_path:
+            print("未选择文件")
+            return
+
+        def done(result):
+            data, error = result
+            if error:
+                self.view.show_message("导入失败", error)
+            else:
+                unit_view.update_table(data)
+
+        self.run_task("导入数据", self.read_unit_file, (file_path, table_name), done, lambda message: ([], message))
+
+    def read_unit_file(self, file_path, table_name):
+        """
+        读取Excel文件并分配ID
+
+        返回:
+            tuple: (数据行列表, 错误信息)
+        """
+        self.report_progress("读取Excel文件")
+        self.model.current_table = table_name  # 设置当前表名
+        data = area_core.read_units(self.model, file_path, table_name)
+        return data, None if data else "未能从文件中读取数据"
 
     def save_housing_unit_data(self):
         """
         保存住房单元数据到数据库
         """
-        data = self.view.housing_unit_1.get_table_data()
-        headers = self.view.housing_unit_1.get_table_headers()
-        self.model.data = data
-        self.model.headers = headers
-        if self.model.save_data("户单元套内面积"):
-            self.view.show_message("保存成功", "户单元数据已成功保存，并更新了幢总建筑面积表和整幢所有单元数据")
-        else:
-            self.view.show_message("保存失败", "保存户单元数据时出错")
+        def done(result):
+            success, message = result
+            if success:
+                self.view.show_message("保存成功", "户单元数据已成功保存，并更新了幢总建筑面积表和整幢所有单元数据"
+                                       + message)
+            else:
+                self.view.show_message("保存失败", message or "保存户单元数据时出错")
+
+        self.save_unit_table(self.view.housing_unit_1, "户单元套内面积", done)
 
     def save_common_property_data(self):
         """
         保存公共财产数据到数据库
         """
-        data = self.view.common_property_house_2.get_table_data()
-        headers = self.view.common_property_house_2.get_table_headers()
-        self.model.data = data
-        self.model.headers = headers
-        if self.model.save_data("共有建筑面积"):
-            self.view.show_message("保存成功", "共有建筑数据已成功保存，并更新了幢总建筑面积表和整幢所有单元数据")
+        def done(result):
+            success, message = result
+            if success:
+                self.view.show_message("保存成功", "共有建筑数据已成功保存，并更新了幢总建筑面积表和整幢所有单元数据"
+                                       + message)
+            else:
+                self.view.show_message("保存失败", message or "保存共有建筑数据时出错")
+
+        self.save_unit_table(self.view.common_property_house_2, "共有建筑面积", done)
+
+    def save_unit_table(self, unit_view, table_name, on_done):
+        """
+        在后台保存单元表界面的数据
+
+        界面内容来自导入时以全部行替换表中数据，否则只保存修改过的行。
+        保存成功后清空界面的修改记录，再以 (是否成功, 说明) 调用on_done。
+
+        参数:
+            unit_view: 户单元或共有建筑界面
+            table_name (str): 单元表名
+            on_done (callable): 完成时调用
+        """
+        changed_rows = unit_view.get_changed_rows()
+        if changed_rows is None:
+            rows, headers = unit_view.get_table_data(), unit_view.get_table_headers()
+        else:
+            rows, headers = changed_rows, None
+
+        def done(result):
+            if result[0]:
+                unit_view.mark_saved()
+            on_done(result)
+
+        self.run_task("保存数据", self.save_unit_rows, (table_name, rows, headers), done,
+                      lambda message: (False, message))
+
+    def save_unit_rows(self, table_name, rows, headers=None):
+        """
+        保存单元表数据并重新计算受影响的分摊模型
+
+        参数:
+            table_name (str): 单元表名
+            rows (list): headers不为None时为表的全部数据行，否则为修改过的行
+            headers (list): 表头
+
+        返回:
+            tuple: (是否成功, 重新计算结果的说明)
+        """
+        self.report_progress("保存数据")
+        if headers is not None:
+            success = area_core.save_units(self.model, table_name, rows, headers)
         else:
-            self.view.show_message("保存失败", "保存共有建筑数据时出错")
+            success = area_core.save_unit_changes(self.model, table_name, rows)
+        if not success:
+            return False, ""
+        # 数据已提交，不再响应取消，以免界面把已保存的数据当作未保存
+        self.report_progress("重新计算受影响的分摊模型")
+        return True, self.recalculate_changed_units()
 
     def show(self):
         """
@@ -95,44 +244,65 @@ class BuildingAreaController:
         """从指定表中获取数据"""
         return self.model.fetch_data_from_table(table_name)
 
-    def validate_allocation_data(self, data_to_save, loaded_data):
-        """验证将要保存的数据"""
-        saved_ids = [unit[1] for unit in data_to_save]  # 获取所有ID
-        loaded_ids = [unit[0] for unit in loaded_data]  # 获取所有加载的ID
-
-        errors = []
-
-        # 1. 检查ID是否有重复
-        duplicate_ids = set([id for id in saved_ids if saved_ids.count(id) > 1])
-        if duplicate_ids:
-            for id in duplicate_ids:
-                rooms = [unit[2] for unit in data_to_save if unit[1] == id]
-                errors.append(f"ID {id} 重复，对应房号: {', '.join(rooms)}")
-
-        # 2. 验证数据数量是否一致，检查缺少的ID
-        if len(saved_ids) != len(loaded_ids):
-            missing_ids = set(loaded_ids) - set(saved_ids)
-            for id in missing_ids:
-                room = next(unit[1] for unit in loaded_data if unit[0] == id)
-                errors.append(f"缺少 ID {id}，对应房号: {room}")
-
-        if errors:
-            return False, "数据验证失败:\n" + "\n".join(errors)
-        return True, "验证通过"
-
-    def save_allocation_data(self, allocation_name, data, loaded_data, parent_table):
-        """保存分配数据，包含验证步骤"""
-        is_valid, message = self.validate_allocation_data(data, loaded_data)
+    def get_unit_details(self):
+        """获取全部单元的实际楼层和用途 {ID: (实际楼层, 用途)}"""
+        return self.model.fetch_unit_details()
+
+    def check_allocation_data(self, data_to_save, loaded_data, group_names=None):
+        """
+        验证将要保存的数据，返回可分页取出问题的验证结果
+
+        参数:
+            data_to_save (list): [(分组名, ID, 房号, 套内面积), ...]
+            loaded_data (list): 所加载数据表的 [(ID, 房号, 套内面积), ...]
+            group_names (list): 全部分组名，用于检查空分组
+
+        返回:
+            AllocationReport: 验证结果
+        """
+        return AllocationReport(data_to_save, loaded_data, group_names)
+
+    def validate_allocation_data(self, data_to_save, loaded_data, group_names=None):
+        """验证将要保存的数据，错误信息只包含第一页问题"""
+        return area_core.validate_allocation(data_to_save, loaded_data, group_names)
+
+    def save_allocation_data(self, allocation_name, data, loaded_data, parent_table, group_names=None,
+                             on_done=None, report=None):
+        """
+        保存分配数据，包含验证步骤
+
+        指定on_done时验证后在后台保存，完成后以 (是否成功, 说明) 调用on_done；否则直接保存并返回结果。
+        指定report时沿用界面上已取出问题的验证结果（check_allocation_data的返回值），不再重复验证。
+        """
+        if report is None:
+            is_valid, message = self.validate_allocation_data(data, loaded_data, group_names)
+        else:
+            is_valid = not report.count and not report.has_more
+            message = "" if is_valid else "数据验证失败，请先修正验证报告中的问题"
         if not is_valid:
+            if on_done is not None:
+                on_done((False, message))
             return False, message
-        
-        created_tables = self.model.save_allocation_data(allocation_name, data, parent_table)
-        return True, f"数据已成功保存到以下表: {', '.join(created_tables)}"
+
+        if on_done is not None:
+            self.run_task("保存分摊所属", self.save_allocation_groups, (allocation_name, data, parent_table),
+                          on_done, lambda error: (False, error))
+            return None
+        return self.save_allocation_groups(allocation_name, data, parent_table)
+
+    def save_allocation_groups(self, allocation_name, data, parent_table):
+        """保存已通过验证的分配数据"""
+        self.report_progress("保存分摊所属")
+        return area_core.save_allocation(self.model, allocation_name, data, parent_table)
 
     def delete_allocation_area(self, allocation_name):
-        """删除分摊属及其相关数据表"""
-        deleted_tables = self.model.delete_allocation_tables(allocation_name)
-        return deleted_tables
+        """
+        删除分摊属及其相关数据表
+
+        返回:
+            tuple: (是否成功, 删除的分组名列表 或 错误信息)
+        """
+        return area_core.delete_allocation(self.model, allocation_name)
 
     def get_allocation_options(self):
         """获取分摊所属选项"""
@@ -143,50 +313,109 @@ class BuildingAreaController:
         return self.model.get_allocation_tables(option)
 
     def calculate_apportionment_coefficient(self, c_tables, h_tables, upper_coefficient, model_type):
+        """计算并保存分摊系数和分摊公共面积，返回 (分摊系数, 错误信息)"""
+        return area_core.calculate_apportionment_coefficient(
+            self.model, c_tables, h_tables, upper_coefficient, model_type)
+
+    def calculate_model(self, c_tables, h_tables, upper_coefficient, model_type, on_done=None):
+        """
+        计算一个分摊模型：先保存应分摊公共面积，再计算并保存分摊系数
+
+        计算前删除模型原有的计算结果，删除和两步计算在同一事务中提交，任一步失败或任务被取消则全部回滚。
+        计算成功时同时保存模型的输入，供 recalculate_all 整体重新计算。
+        指定on_done时在后台计算，完成后以返回值调用on_done。
+
+        返回:
+            tuple: (分摊系数, 错误信息)
+        """
+        if on_done is not None:
+            self.run_task("计算分摊模型", self.calculate_model, (c_tables, h_tables, upper_coefficient, model_type),
+                          on_done, lambda error: (0, error))
+            return None
+
+        return area_core.calculate_model(self.model, c_tables, h_tables, upper_coefficient, model_type,
+                                         self.progress_hook)
+
+    def recalculate_changed_units(self):
+        """
+        重新计算受已保存单元变化影响的分摊模型及其下级模型
+
+        返回:
+            str: 重新计算结果的说明，没有受影响的模型时为空字符串
+        """
         try:
-            # 获取共有建筑部分的总面积
-            c_total_area = self.model.get_total_area(c_tables)
-            
-            # 获取参与分摊单元的总面积
-            h_total_area = self.model.get_total_area(h_tables)
-            
-            if h_total_area == 0:
-                return 0, "参与分摊单元的总面积为0，无法计算分摊系数"
+            results = area_core.recalculate_changed(self.model)
+        except Exception as e:
+            return f"\n重新计算分摊模型时出错：{str(e)}"
+
+        messages = []
+        succeeded = [result.model_name for result in results if result.error is None]
+        if succeeded:
+            messages.append(f"\n已重新计算受影响的分摊模型：{'、'.join(succeeded)}")
+        for result in results:
+            if result.error is not None:
+                messages.append(f"\n分摊模型 {result.model_name} 计算失败：{result.error}")
+        return "".join(messages)
+
+    def evaluate_scenarios(self, scenarios, workers=None):
+        """
+        并行计算多个候选分摊方案并逐单元对比，不修改项目数据库
+
+        方案格式见 scenarios 模块。
+
+        返回:
+            ScenarioComparison: 对比结果
+        """
+        return evaluate_scenarios(self.model, scenarios, workers)
+
+    def recalculate_all(self, on_done=None):
+        """
+        按模型层级自上而下重新计算全部分摊模型，结果在一个事务中写回
 
-            # 计算分摊系数并保留6位小数
-            coefficient = round((c_total_area + c_total_area * upper_coefficient) / h_total_area, 6)
+        指定on_done时在后台计算，完成后以返回值调用on_done；写回之前取消则不修改数据库。
 
-            # 保存分摊系数和分摊公共积到数据库
-            self.model.save_apportionment_coefficient(h_tables, coefficient, model_type)
+        返回:
+            tuple: ({模型名称: 分摊系数}, {模型名称: 错误信息})
+        """
+        if on_done is not None:
+            self.run_task("重新计算全部模型", self.recalculate_all, (), on_done, lambda error: ({}, {"": error}))
+            return None
 
-            return coefficient, None
+        try:
+            results = area_core.recalculate_all(self.model, self.progress_hook)
+        except area_core.OperationCancelled:
+            raise
         except Exception as e:
-            return 0, str(e)
+            return {}, {"": str(e)}
+        coefficients = {result.model_name: result.coefficient for result in results if result.error is None}
+        errors = {result.model_name: result.error for result in results if result.error is not None}
+        return coefficients, errors
+
+    def audit_areas(self):
+        """
+        审核已保存数据的面积一致性，生成报表前调用
 
-    def delete_apportionment_model(self, model_name):
-        """删除分摊模型及其子模型"""
+        返回:
+            tuple: (是否一致, 不一致项的说明列表)
+        """
         try:
-            # 获取所有子模型
-            child_models = self.get_child_models(model_name)
-            all_models = [model_name] + child_models
-            
-            # 删除所有相关模型的数据
-            deleted_columns = []
-            for model in all_models:
-                result = self.model.delete_apportionment_model_data(model)
-                if result:
-                    deleted_columns.extend(result)
-            
-            # 删除模型关系记录
-            if self.model.delete_model_relationship(model_name):
-                if deleted_columns:
-                    return True, f"已成功删除模型 '{model_name}' 及其子模型，删除的数据列：{', '.join(deleted_columns)}"
-                else:
-                    return True, f"已成功删除模型 '{model_name}' 及其子模型的关系记录"
-            else:
-                return False, f"删除模型 '{model_name}' 的关系记录失败"
+            findings = area_core.audit(self.model)
         except Exception as e:
-            return False, f"删除模型时出错：{str(e)}"
+            return False, [str(e)]
+        return not findings, [str(finding) for finding in findings]
+
+    def delete_apportionment_model(self, model_name, on_done=None):
+        """
+        删除分摊模型及其子模型
+
+        指定on_done时在后台删除，完成后以 (是否成功, 说明) 调用on_done；取消时全部回滚。
+        """
+        if on_done is not None:
+            self.run_task("删除分摊模型", self.delete_apportionment_model, (model_name,), on_done,
+                          lambda error: (False, f"删除模型时出错：{error}"))
+            return None
+
+        return area_core.delete_model(self.model, model_name, self.progress_hook)
 
     def get_calculated_coefficients(self):
         """获取已计算的分摊系数"""
@@ -201,21 +430,19 @@ class BuildingAreaController:
         return self.model.get_model_hierarchy()
 
     def get_available_parent_models(self, current_model=None):
-        """获取可用的上级分摊模型"""
+        """
+        获取可用的上级分摊模型
+
+        指定当前模型时，只返回层级先序中排在当前模型之前的模型，当前模型及其子模型不会出现在结果中。
+
+        返回:
+            list: [(模型名称, 层级路径), ...]
+        """
         hierarchy = self.model.get_model_hierarchy()
-        
-        # 过滤掉当前模型及其子模型
-        available_models = []
+
         if current_model:
-            # 构建模型的层级路径
-            model_paths = {model[0]: model[4] for model in hierarchy}
-            current_path = next((model[4] for model in hierarchy 
-                               if model[1] == current_model), None)
-            
-            if current_path:
-                # 只返回路径值小于当前模型的模型
-                available_models = [model for model in hierarchy 
-                                  if model[4] < current_path]
+            position = next((index for index, model in enumerate(hierarchy) if model[1] == current_model), None)
+            available_models = hierarchy[:position] if position is not None else []
         else:
             available_models = hierarchy
             
@@ -225,21 +452,6 @@ class BuildingAreaController:
         """获取指定模型的所有子模型"""
         return self.model.get_child_models(model_name)
 
-    def calculate_and_save_apportionable_area(self, c_tables, upper_coefficient, model_type):
-        """计算并保存应分摊公共面积"""
-        try:
-            success, error = self.model.calculate_and_save_apportionable_area(
-                c_tables, 
-                upper_coefficient,
-                model_type
-            )
-            
-            if not success:
-                return False, f"计算应分摊公共面积时出错：{error}"
-            return True, None
-        except Exception as e:
-            return False, str(e)
-
     def get_available_belong_tables(self):
         """获取可用于加载的分摊所属表"""
         return self.model.get_available_belong_tables()
@@ -0,0 +1,203 @@
+"""
+小区多幢分摊计算命令行工具
+
+共有建筑面积按幢分摊，每幢一个数据库（如 batch_import.py 的输出目录中的 <幢名>.db）。
+各幢在工作进程中独立打开各自的数据库，由分摊计算引擎自上而下计算全部已保存输入的分摊模型并写回，
+主进程汇总各幢的分摊系数、分摊公共面积合计、耗时和失败信息，生成小区汇总。
+某一幢计算失败不影响其他幢。
+
+用法:
+    python estate_runner.py 数据库目录 [-j 进程数] [-o 汇总.csv] [--fixed-point]
+    python estate_runner.py 1幢.db 2幢.db ... [-j 进程数] [-o 汇总.csv] [--fixed-point]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 汇总CSV的列
+SUMMARY_COLUMNS = ("幢名", "数据库", "模型数", "失败模型数", "分摊单元数", "分摊公共面积合计", "耗时(秒)", "错误")
+
+
+def scan_buildings(paths):
+    """
+    收集各幢的数据库
+
+    :param paths: 数据库文件或包含数据库文件的目录
+    :return: [(幢名, 数据库路径), ...]，幢名为数据库文件名（不含扩展名）
+    """
+    buildings = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_names = sorted(name for name in os.listdir(path) if name.lower().endswith(".db"))
+            buildings.extend((os.path.splitext(name)[0], os.path.join(path, name)) for name in file_names)
+        else:
+            buildings.append((os.path.splitext(os.path.basename(path))[0], path))
+    return buildings
+
+
+def run_building(building, db_path, fixed_point=False):
+    """
+    在工作进程中计算一幢的全部分摊模型
+
+    :return: 该幢的汇总 dict，键为
+             building, db_path, coefficients {模型名称: 分摊系数}, errors {模型名称: 错误信息},
+             units 分摊单元数, apportioned_area 分摊公共面积合计, seconds 耗时, error 整幢失败时的错误信息
+    """
+    # 推迟导入，主进程只汇总结果，不需要打开数据库
+    import area_core
+
+    start = time.perf_counter()
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"数据库不存在：{db_path}")
+    model = area_core.open_project(db_path, fixed_point=fixed_point)
+    try:
+        results = area_core.recalculate_all(model)
+    finally:
+        model.close()
+
+    units = {}
+    for result in results:
+        if result.error is None:
+            for unit_id, area in result.apportioned_areas.items():
+                units[unit_id] = units.get(unit_id, 0) + area
+    return {
+        "building": building,
+        "db_path": db_path,
+        "coefficients": {result.model_name: result.coefficient for result in results if result.error is None},
+        "errors": {result.model_name: result.error for result in results if result.error is not None},
+        "units": len(units),
+        "apportioned_area": round(sum(units.values()), 2),
+        "seconds": time.perf_counter() - start,
+        "error": None,
+    }
+
+
+class EstateSummary:
+    """
+    小区汇总
+
+    属性:
+        buildings (list): 各幢的汇总，顺序与输入相同
+    """
+
+    def __init__(self, buildings):
+        self.buildings = buildings
+
+    @property
+    def failed(self):
+        """整幢失败或有模型计算失败的幢"""
+        return [item for item in self.buildings if item["error"] or item["errors"]]
+
+    def rows(self):
+        """生成汇总表的行，列与SUMMARY_COLUMNS相同"""
+        for item in self.buildings:
+            errors = [item["error"]] if item["error"] else [f"{name}：{error}" for name, error in item["errors"].items()]
+            yield (item["building"], item["db_path"], len(item["coefficients"]) + len(item["errors"]),
+                   len(item["errors"]), item["units"], item["apportioned_area"], round(item["seconds"], 3),
+                   "；".join(errors))
+
+    def save_csv(self, path):
+        """保存汇总表为CSV文件"""
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(SUMMARY_COLUMNS)
+            writer.writerows(self.rows())
+
+
+def run_estate(buildings, workers=None, fixed_point=False, progress_callback=None, should_cancel=None):
+    """
+    并行计算各幢
+
+    可在后台任务中调用：每幢完成后报告进度，请求取消后不再开始新的幢，已开始的幢照常完成，
+    未计算的幢不出现在汇总中。
+
+    :param buildings: [(幢名, 数据库路径), ...]
+    :param workers: 工作进程数，默认为CPU核数；为0时在当前进程中依次计算
+    :param fixed_point: 是否以整数定点数计算（见area_arithmetic）
+    :param progress_callback: 进度回调，参数为 (已完成幢数, 总幢数, 幢名)
+    :param should_cancel: 返回True时停止开始新的幢
+    :return: EstateSummary
+    """
+    def failure(building, db_path, error, seconds=0):
+        return {"building": building, "db_path": db_path, "coefficients": {}, "errors": {},
+                "units": 0, "apportioned_area": 0, "seconds": seconds, "error": error}
+
+    def report(item):
+        if item["error"]:
+            print(f"[失败] {item['building']} {item['db_path']}：{item['error']}")
+            return
+        status = "部分失败" if item["errors"] else "完成"
+        print(f"[{status}] {item['building']}：{len(item['coefficients'])}个模型，{item['units']}个单元，"
+              f"分摊公共面积 {item['apportioned_area']:.2f}，耗时 {item['seconds']:.3f}s")
+        for name, error in item["errors"].items():
+            print(f"    {name}：{error}")
+
+    def cancelled():
+        return should_cancel is not None and should_cancel()
+
+    def completed(building):
+        if progress_callback is not None:
+            progress_callback(len(results), len(buildings), building)
+
+    results = {}
+    if workers == 0:
+        for building, db_path in buildings:
+            if cancelled():
+                break
+            start = time.perf_counter()
+            try:
+                results[db_path] = run_building(building, db_path, fixed_point)
+            except Exception as e:
+                results[db_path] = failure(building, db_path, str(e), time.perf_counter() - start)
+            report(results[db_path])
+            completed(building)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_building, building, db_path, fixed_point): (building, db_path)
+                       for building, db_path in buildings}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                building, db_path = futures[future]
+                try:
+                    results[db_path] = future.result()
+                except Exception as e:
+                    results[db_path] = failure(building, db_path, str(e))
+                report(results[db_path])
+                completed(building)
+                if cancelled():
+                    for pending in futures:
+                        pending.cancel()
+
+    return EstateSummary([results[db_path] for _, db_path in buildings if db_path in results])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="小区多幢分摊计算")
+    parser.add_argument("paths", nargs="+", help="各幢的数据库文件，或包含数据库文件的目录")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数")
+    parser.add_argument("-o", "--output", help="汇总CSV文件路径")
+    parser.add_argument("--fixed-point", action="store_true", help="以整数定点数计算")
+    args = parser.parse_args(argv)
+
+    buildings = scan_buildings(args.paths)
+    if not buildings:
+        print("未找到幢数据库")
+        return 1
+
+    start = time.perf_counter()
+    summary = run_estate(buildings, args.jobs, args.fixed_point)
+    if args.output:
+        summary.save_csv(args.output)
+
+    print(f"共计算 {len(buildings)} 幢，失败 {len(summary.failed)} 幢，"
+          f"总耗时 {time.perf_counter() - start:.3f}s")
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
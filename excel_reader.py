@@ -0,0 +1,69 @@
+"""
+Excel分块读取模块
+
+以只读模式惰性读取Excel工作表，不依赖Qt和pandas，
+可在图形界面、命令行批量导入和工作进程中共用。
+openpyxl在打开文件时才加载，导入本模块不增加程序启动时间。
+"""
+
+# 流式导入时每块读取的行数
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ExcelChunkReader:
+    """
+    Excel分块读取器
+
+    以只读模式打开工作簿，按行惰性读取第一个工作表，
+    每次产出不超过chunk_size行的数据块，内存占用与工作表总行数无关。
+    """
+
+    def __init__(self, file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        初始化读取器
+
+        :param file_path: Excel文件路径或文件流
+        :param chunk_size: 每块的最大行数
+        """
+        import openpyxl
+
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        self.sheet = self.workbook.worksheets[0]
+        self._rows = self.sheet.iter_rows(values_only=True)
+        # 第一行为表头
+        first_row = next(self._rows, None)
+        self.headers = list(first_row) if first_row else []
+        # 只读模式下max_row取自工作表的dimension记录，可能缺失
+        self.total_rows = self.sheet.max_row - 1 if self.sheet.max_row else None
+
+    def __iter__(self):
+        """
+        逐块产出数据行
+
+        每行按表头长度补齐或截断，全空行会被跳过。
+        """
+        width = len(self.headers)
+        chunk = []
+        for row in self._rows:
+            if all(value is None for value in row):
+                continue
+            row = list(row[:width])
+            row.extend([None] * (width - len(row)))
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        """关闭工作簿，释放文件句柄"""
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,72 @@
+"""
+层级树
+
+分摊模型关系和分摊所属关系的内存树。同级节点按 order_index、ID 的数值排序，
+层级路径为各级 order_index 组成的元组，按数值而不是按文本比较（"10" 排在 "2" 之后）。
+"""
+
+
+class HierarchyTree:
+    """
+    由 (ID, 名称, 上级ID, order_index) 行构建的层级树
+
+    上级不存在的节点视为顶级节点。
+
+    属性:
+        names (dict): {ID: 名称}
+        parents (dict): {ID: 上级ID}，顶级节点为None
+        children (dict): {上级ID: [ID, ...]}，顶级节点在None下
+        order (list): 先序遍历的ID
+    """
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.names = {node_id: name for node_id, name, _, _ in rows}
+        self.parents = {}
+        self.children = {None: []}
+        self.ids = {}
+        self.paths = {}
+        self.levels = {}
+
+        keys = {node_id: (order_index if order_index is not None else 0, node_id)
+                for node_id, _, _, order_index in rows}
+        for node_id, name, parent_id, _ in sorted(rows, key=lambda row: keys[row[0]]):
+            parent_id = parent_id if parent_id in self.names and parent_id != node_id else None
+            self.parents[node_id] = parent_id
+            self.children.setdefault(parent_id, []).append(node_id)
+            self.ids.setdefault(name, node_id)
+
+        # 先序遍历，同时计算层级和路径；成环的节点不可达，不在遍历结果中
+        self.order = []
+        stack = [(node_id, 0, (keys[node_id][0],)) for node_id in reversed(self.children[None])]
+        while stack:
+            node_id, level, path = stack.pop()
+            self.order.append(node_id)
+            self.levels[node_id] = level
+            self.paths[node_id] = path
+            for child_id in reversed(self.children.get(node_id, [])):
+                stack.append((child_id, level + 1, path + (keys[child_id][0],)))
+        self.positions = {node_id: index for index, node_id in enumerate(self.order)}
+
+    def id_of(self, name):
+        """按名称查找ID，同名时取排在前面的节点，不存在时为None"""
+        return self.ids.get(name)
+
+    def path_text(self, node_id):
+        """层级路径的显示文本，如 1.2.10"""
+        return ".".join(str(part) for part in self.paths[node_id])
+
+    def descendants(self, node_id):
+        """节点的全部下级，按先序排列，不含节点本身"""
+        result = []
+        stack = list(reversed(self.children.get(node_id, [])))
+        while stack:
+            child_id = stack.pop()
+            result.append(child_id)
+            stack.extend(reversed(self.children.get(child_id, [])))
+        return result
+
+    def rows(self):
+        """按先序生成 (ID, 名称, 上级ID, 层级, 路径文本)"""
+        for node_id in self.order:
+            yield node_id, self.names[node_id], self.parents[node_id], self.levels[node_id], self.path_text(node_id)
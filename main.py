@@ -35,8 +35,14 @@ def main():
     
     # 运行应用程序的事件循环
     # 这保持应用程序运行，直到用户关闭它
+    exit_code = app.exec_()
+
+    # 等待后台任务结束后关闭数据库连接
+    controller.tasks.wait()
+    model.close()
+
     # sys.exit()确保应用程序干净地退出，返回退状态码给操作系统
-    sys.exit(app.exec_())
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     """
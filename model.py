@@ -1,7 +1,87 @@
-import pandas as pd
-from PyQt5.QtWidgets import QFileDialog
-import sqlite3
 import re
+from contextlib import contextmanager
+from excel_reader import ExcelChunkReader, DEFAULT_CHUNK_SIZE
+from connection_manager import connection_manager
+from hierarchy import HierarchyTree
+
+# 各数据表的ID前缀
+ID_PREFIXES = {"户单元套内面积": "H", "共有建筑面积": "C"}
+
+# 数据库结构版本，记录在 PRAGMA user_version 中
+SCHEMA_VERSION = 5
+
+# 单元表（ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途）中数值列的位置
+AREA_COLUMN_INDEXES = (3, 4, 5)
+
+# 以文本存储的非数值列，其余面积和系数列均以REAL存储
+TEXT_COLUMNS = ("ID", "实际楼层", "房号", "用途")
+
+# 单元表中文本列的位置
+TEXT_COLUMN_INDEXES = (0, 1, 2, 6)
+
+# 分摊计算结果的三个字段及其在分摊系数计算过程视图中的列名后缀
+RESULT_FIELDS = (
+    ("coefficient", "分摊系数"),
+    ("apportioned_area", "分摊公共面积"),
+    ("apportionable_area", "应分摊公共面积"),
+)
+
+# 分摊所属分组的面积所依赖的表
+GROUP_TABLES = ("户单元套内面积", "共有建筑面积", "分摊所属成员", "分摊所属关系")
+
+# 记录修改次数的表，分组面积缓存和分摊模型层级树据此判断是否失效
+VERSIONED_TABLES = GROUP_TABLES + ("分摊模型关系",)
+
+# 层级表及其闭包表 {层级表: (闭包表, ID列)}，闭包表记录每对 (上级, 下级, 相隔层数)，含节点自身（相隔0层）
+CLOSURE_TABLES = {
+    "分摊模型关系": ("分摊模型层级", "model_id"),
+    "分摊所属关系": ("分摊所属层级", "belong_id"),
+}
+
+# 直接以表或视图存储单元数据的数据源，其余分摊所属分组的单元由成员表记录
+UNIT_SOURCE_TABLES = ("户单元套内面积", "共有建筑面积", "幢总建筑面积", "分摊所属_整幢")
+
+
+def to_number(value):
+    """
+    将单元格的值转换为数值
+
+    空字符串、None和NaN转换为None，无法解析的文本抛出ValueError。
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return None if value != value else value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"无效的面积值：{text}")
+
+
+def to_text(value):
+    """
+    将单元格的值转换为文本，与TEXT列读出的值一致
+
+    None和NaN转换为None，整数值的浮点数按SQLite的方式保留小数点，如 5.0 转换为 "5.0"。
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+def normalize_unit_row(row):
+    """将单元数据行中的面积列转换为数值，文本列转换为文本"""
+    row = list(row)
+    for index in AREA_COLUMN_INDEXES:
+        if index < len(row):
+            row[index] = to_number(row[index])
+    for index in TEXT_COLUMN_INDEXES:
+        if index < len(row):
+            row[index] = to_text(row[index])
+    return row
 
 class BuildingAreaModel:
     """
@@ -11,29 +91,134 @@ class BuildingAreaModel:
     提供了导入Excel文件和保存数据到SQLite数据库的功能。
     """
 
-    def __init__(self):
+    def __init__(self, db_path='building_area.db', performance_mode=False, arithmetic=None, shared_connection=True):
         """
         初始化模型
         
         创建一个空列表来存储导入的数据
+
+        :param db_path: SQLite数据库文件路径
+        :param performance_mode: 是否启用WAL日志等性能参数（见connection_manager.PERFORMANCE_PRAGMAS）
+        :param arithmetic: 分摊计算的算术方式（见area_arithmetic），默认为浮点数计算，首次计算时创建
+        :param shared_connection: 是否与同一项目的其他模型共享写连接，后台任务使用专用连接
         """
         self.data = []  # 用于存储导入的数据
         self.headers = []  # 用于存储表头
-        self.conn = sqlite3.connect('building_area.db')
+        self.db_path = db_path
+        # 写连接由连接管理器按项目提供，同一项目的多个模型共享
+        self.performance_mode = performance_mode
+        self.project = connection_manager.open_project(db_path, performance_mode=performance_mode,
+                                                       shared=shared_connection)
+        self.conn = self.project.writer
         self.cursor = self.conn.cursor()
+        self.dirty_units = {}  # 已保存但尚未重新计算分摊的单元 {单元表名: ID集合}
+        self.area_cache = {}  # 分组面积缓存 {分组名: (依赖表的版本, 总面积)}
+        self.area_cache_stats = {"hits": 0, "misses": 0}
+        self._arithmetic = arithmetic
+        self.model_tree = None  # 分摊模型层级树缓存 (分摊模型关系的修改次数, HierarchyTree)
         self.initialize_tables()
 
+    def reader(self, timeout=None):
+        """
+        借用一个只读连接，供后台线程执行报表、预览等查询
+
+        只读连接看不到写连接中尚未提交的修改。
+
+        用法:
+            with model.reader() as conn:
+                rows = conn.execute('SELECT ...').fetchall()
+        """
+        return self.project.reader(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        事务范围
+
+        范围内所有写操作在同一个事务中执行，最外层范围结束时统一提交一次；
+        范围内抛出异常或有方法调用rollback()时，整个范围的修改全部回滚。
+        范围可以嵌套，内层范围不单独提交。嵌套层数记录在项目连接集合上，
+        共享写连接的其他模型在范围内的提交和回滚同样推迟到最外层范围结束；
+        范围持有写连接的事务锁，其他线程在同一写连接上开启的范围等待本范围结束。
+
+        用法:
+            with model.transaction():
+                model.calculate_and_save_apportionable_area(...)
+                model.save_apportionment_coefficient(...)
+        """
+        project = self.project
+        with project.writer_lock:
+            outermost = project.transaction_depth == 0
+            if outermost:
+                project.transaction_failed = False
+                if not self.conn.in_transaction:
+                    self.cursor.execute("BEGIN")
+            project.transaction_depth += 1
+            try:
+                yield self
+            except Exception:
+                project.transaction_failed = True
+                raise
+            finally:
+                project.transaction_depth -= 1
+                if outermost:
+                    if project.transaction_failed:
+                        self.conn.rollback()
+                        self.area_cache.clear()
+                        self.model_tree = None
+                    else:
+                        self.conn.commit()
+
+    def commit(self):
+        """提交事务，处于事务范围内时推迟到范围结束统一提交"""
+        with self.project.writer_lock:
+            if self.project.transaction_depth == 0:
+                self.conn.commit()
+
+    def rollback(self):
+        """回滚事务，处于事务范围内时标记失败，范围结束时整体回滚"""
+        with self.project.writer_lock:
+            if self.project.transaction_depth == 0:
+                self.conn.rollback()
+                self.area_cache.clear()
+                self.model_tree = None
+            else:
+                self.project.transaction_failed = True
+
+    @property
+    def arithmetic(self):
+        """分摊计算的算术方式，未指定时在首次使用时创建浮点数计算"""
+        if self._arithmetic is None:
+            # area_arithmetic依赖NumPy，推迟到计算时导入，不在启动时加载
+            from area_arithmetic import FloatArithmetic
+            self._arithmetic = FloatArithmetic()
+        return self._arithmetic
+
     def initialize_tables(self):
-        """初始化数据库表结构"""
+        """
+        初始化数据库表结构
+
+        结构版本已是当前版本的数据库跳过建表和升级检查，打开项目时只执行一次查询。
+        """
+        self.cursor.execute("PRAGMA user_version")
+        if self.cursor.fetchone()[0] == SCHEMA_VERSION:
+            return
+
         try:
             # 修改户单元套内面积表，将 HID 改为 ID
             self.cursor.execute('''CREATE TABLE IF NOT EXISTS "户单元套内面积" 
                                  (ID TEXT PRIMARY KEY, 
                                   实际楼层 TEXT, 
                                   房号 TEXT, 
-                                  主间面积 TEXT, 
-                                  阳台面积 TEXT, 
-                                  套内面积 TEXT, 
+                                  主间面积 REAL, 
+                                  阳台面积 REAL, 
+                                  套内面积 REAL, 
                                   用途 TEXT)''')
             
             # 修改共有建筑面积表，将 CID 改为 ID
@@ -41,22 +226,12 @@ class BuildingAreaModel:
                                  (ID TEXT PRIMARY KEY, 
                                   实际楼层 TEXT, 
                                   房号 TEXT, 
-                                  主间面积 TEXT, 
-                                  阳台面积 TEXT, 
-                                  套内面积 TEXT, 
+                                  主间面积 REAL, 
+                                  阳台面积 REAL, 
+                                  套内面积 REAL, 
                                   用途 TEXT)''')
             
-            # 创建幢总建筑面积表
-            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "幢总建筑面积" 
-                                 (ID TEXT PRIMARY KEY, 
-                                  实际楼层 TEXT, 
-                                  房号 TEXT, 
-                                  主间面积 TEXT, 
-                                  阳台面积 TEXT, 
-                                  套内面积 TEXT, 
-                                  用途 TEXT)''')
-            
-            
+
             # 创建分摊模型关系表
             self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊模型关系" 
                                  (model_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -65,14 +240,36 @@ class BuildingAreaModel:
                                   order_index INTEGER NOT NULL,
                                   FOREIGN KEY (parent_id) REFERENCES "分摊模型关系" (model_id))''')
             
-            # 创建新的分摊所属关系表，增加 belong_alias 列
+            # 创建新的分摊所属关系表，增加 belong_alias 列，
+            # allocation_name 记录分组所属的分摊所属名称
             self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊所属关系" 
                                  (belong_id INTEGER PRIMARY KEY AUTOINCREMENT,
                                   belong_name TEXT NOT NULL,
                                   belong_alias TEXT NOT NULL,
                                   parent_id INTEGER,
                                   order_index INTEGER NOT NULL,
+                                  allocation_name TEXT,
                                   FOREIGN KEY (parent_id) REFERENCES "分摊所属关系" (belong_id))''')
+
+            # 层级表的上级和名称索引，以及由触发器维护的闭包表
+            self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊模型关系_parent"
+                                 ON "分摊模型关系" (parent_id, order_index)''')
+            self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊模型关系_name"
+                                 ON "分摊模型关系" (model_name)''')
+            self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊所属关系_parent"
+                                 ON "分摊所属关系" (parent_id, order_index)''')
+            for table_name, (closure_table, id_column) in CLOSURE_TABLES.items():
+                self.create_closure_table(table_name, closure_table, id_column)
+
+            # 创建分摊所属成员表，记录每个分组包含的单元
+            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊所属成员" 
+                                 (belong_id INTEGER NOT NULL,
+                                  unit_id TEXT NOT NULL,
+                                  PRIMARY KEY (belong_id, unit_id),
+                                  FOREIGN KEY (belong_id) REFERENCES "分摊所属关系" (belong_id))
+                                 WITHOUT ROWID''')
+            self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊所属成员_unit" 
+                                 ON "分摊所属成员" (unit_id, belong_id)''')
             
             # 检查是否已存在整幢记录
             self.cursor.execute('''SELECT belong_id FROM "分摊所属关系" 
@@ -83,83 +280,475 @@ class BuildingAreaModel:
                                      (belong_name, belong_alias, parent_id, order_index)
                                      VALUES ("分摊所属_整幢", "整幢", NULL, 0)''')
             
-            # 创建分摊系数计算过程表，确保分摊系数列在套内面积列之后
-            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊系数计算过程" 
-                                 (ID TEXT PRIMARY KEY, 
-                                  房号 TEXT, 
-                                  套内面积 TEXT,
-                                  分摊系数 TEXT)''')
+            # 创建分摊计算结果表，每个单元在每个模型下一行
+            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊计算结果" 
+                                 (unit_id TEXT NOT NULL,
+                                  model_id INTEGER NOT NULL,
+                                  coefficient REAL,
+                                  apportioned_area REAL,
+                                  apportionable_area REAL,
+                                  PRIMARY KEY (unit_id, model_id),
+                                  FOREIGN KEY (model_id) REFERENCES "分摊模型关系" (model_id))
+                                 WITHOUT ROWID''')
+            self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊计算结果_model" 
+                                 ON "分摊计算结果" (model_id)''')
+
+            # 创建数据版本表，记录单元表和分组表的修改次数
+            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "数据版本" 
+                                 (table_name TEXT PRIMARY KEY,
+                                  version INTEGER NOT NULL DEFAULT 0)''')
+            self.cursor.executemany('INSERT OR IGNORE INTO "数据版本" (table_name) VALUES (?)',
+                                    [(table_name,) for table_name in VERSIONED_TABLES])
+
+            # 创建分摊模型输入表，记录每个模型选择的应分摊共有建筑部位（C）和参与分摊单元（H）
+            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊模型输入" 
+                                 (model_id INTEGER NOT NULL,
+                                  role TEXT NOT NULL,
+                                  belong_name TEXT NOT NULL,
+                                  order_index INTEGER NOT NULL,
+                                  PRIMARY KEY (model_id, role, belong_name),
+                                  FOREIGN KEY (model_id) REFERENCES "分摊模型关系" (model_id))
+                                 WITHOUT ROWID''')
             
-            self.conn.commit()
+            self.commit()
+
+            # 升级旧版本数据库的表结构
+            self.migrate_schema()
+
+            # 幢总建筑面积和整幢所有单元数据由视图实时提供
+            self.create_derived_views()
         except Exception as e:
             print(f"初始化表时出错：{str(e)}")
-            self.conn.rollback()
+            self.rollback()
+
+    def migrate_schema(self):
+        """
+        升级数据库结构
+
+        根据 PRAGMA user_version 判断数据库版本并依次升级：
+        - 版本0的数据库中面积和系数列以TEXT存储，将其重建为REAL列并转换已有数据
+        - 版本1的数据库中幢总建筑面积和分摊所属_整幢为物理表，删除后由视图代替
+        - 版本2的数据库中每个分摊所属分组是一张 分摊所属_{分摊所属}_{分组} 表，
+          将其并入分摊所属成员表后删除
+        - 版本3的数据库中分摊系数计算过程为每个模型三列的宽表，
+          将其转存到分摊计算结果表后删除，由同名视图代替
+        - 版本4的数据库没有层级闭包表，按已有的层级关系生成
+
+        全部升级步骤在同一事务中执行，失败时数据库保持原样。
+        """
+        self.cursor.execute("PRAGMA user_version")
+        version = self.cursor.fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        try:
+            with self.transaction():
+                if version < 1:
+                    self.cursor.execute("""SELECT name FROM sqlite_master WHERE type='table' 
+                                           AND (name IN ('户单元套内面积', '共有建筑面积', '幢总建筑面积', '分摊系数计算过程')
+                                                OR name LIKE '分摊所属\\_%' ESCAPE '\\')""")
+                    for (table_name,) in self.cursor.fetchall():
+                        self.convert_columns_to_numeric(table_name)
+
+                if version < 2:
+                    self.cursor.execute('DROP TABLE IF EXISTS "幢总建筑面积"')
+                    self.cursor.execute('DROP TABLE IF EXISTS "分摊所属_整幢"')
+
+                if version < 3:
+                    self.fold_allocation_tables()
+
+                if version < 4:
+                    self.fold_result_columns()
+
+                if version < 5:
+                    for table_name, (closure_table, id_column) in CLOSURE_TABLES.items():
+                        self.rebuild_closure_table(table_name, closure_table, id_column)
+
+                self.touch_tables(*VERSIONED_TABLES)
+
+                self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except Exception as e:
+            print(f"升级数据库结构时出错：{str(e)}")
+
+    def fold_allocation_tables(self):
+        """
+        将旧版本的分摊所属分组表并入分摊所属成员表
+
+        分组表名形如 分摊所属_{分摊所属}_{分组}，分摊所属名称取第一个下划线分隔的部分。
+        未登记在分摊所属关系表中的分组表补充登记为顶级记录。本方法不提交事务。
+        """
+        self.cursor.execute('PRAGMA table_info("分摊所属关系")')
+        if "allocation_name" not in [row[1] for row in self.cursor.fetchall()]:
+            self.cursor.execute('ALTER TABLE "分摊所属关系" ADD COLUMN allocation_name TEXT')
+
+        self.cursor.execute("""SELECT name FROM sqlite_master WHERE type='table' 
+                               AND name LIKE '分摊所属\\_%' ESCAPE '\\'""")
+        for (table_name,) in self.cursor.fetchall():
+            match = re.match(r'分摊所属_(.+?)_', table_name)
+            if not match:
+                continue
+
+            belong_id = self.get_belong_id(table_name)
+            if belong_id is None:
+                self.cursor.execute('''INSERT INTO "分摊所属关系" 
+                                       (belong_name, belong_alias, parent_id, order_index)
+                                       VALUES (?, ?, NULL, 
+                                              (SELECT COALESCE(MAX(order_index), 0) + 1 
+                                               FROM "分摊所属关系" 
+                                               WHERE parent_id IS NULL))''',
+                                    (table_name, table_name.replace("分摊所属_", "")))
+                belong_id = self.cursor.lastrowid
+
+            self.cursor.execute('UPDATE "分摊所属关系" SET allocation_name = ? WHERE belong_id = ?',
+                                (match.group(1), belong_id))
+            self.cursor.execute(f'''INSERT OR IGNORE INTO "分摊所属成员" (belong_id, unit_id)
+                                    SELECT ?, ID FROM "{table_name}" WHERE ID IS NOT NULL''',
+                                (belong_id,))
+            self.cursor.execute(f'DROP TABLE "{table_name}"')
+
+    def fold_result_columns(self):
+        """
+        将旧版本分摊系数计算过程宽表中的模型列转存到分摊计算结果表
 
-    def import_data(self):
+        未登记在分摊模型关系表中的模型补充登记为顶级模型。本方法不提交事务。
+        """
+        self.cursor.execute("""SELECT name FROM sqlite_master 
+                               WHERE type='table' AND name='分摊系数计算过程'""")
+        if not self.cursor.fetchone():
+            return
+
+        self.cursor.execute("PRAGMA table_info('分摊系数计算过程')")
+        columns = [row[1] for row in self.cursor.fetchall()]
+        model_names = []
+        for column in columns:
+            for _, suffix in RESULT_FIELDS:
+                model_name = column[:-len(suffix) - 1]
+                if column.endswith(f"_{suffix}") and model_name and model_name not in model_names:
+                    model_names.append(model_name)
+                    break
+
+        for model_name in model_names:
+            model_id = self.get_model_id(model_name, create=True)
+            select_columns = ', '.join(f'"{model_name}_{suffix}"' if f"{model_name}_{suffix}" in columns else 'NULL'
+                                       for _, suffix in RESULT_FIELDS)
+            self.cursor.execute(f'''INSERT OR REPLACE INTO "分摊计算结果" 
+                                    (unit_id, model_id, coefficient, apportioned_area, apportionable_area)
+                                    SELECT ID, ?, {select_columns} FROM "分摊系数计算过程"
+                                    WHERE ID IS NOT NULL''', (model_id,))
+        self.cursor.execute('DROP TABLE "分摊系数计算过程"')
+
+    def create_closure_table(self, table_name, closure_table, id_column):
+        """
+        创建层级表的闭包表，并以触发器在层级表插入、修改上级和删除时同步维护
+
+        修改上级时整棵子树随之移动，上级不能是节点自身或其下级。
+        删除节点时其下级视为顶级节点，与上级不存在时的处理一致。
+        """
+        self.cursor.execute(f'''CREATE TABLE IF NOT EXISTS "{closure_table}"
+                                (ancestor_id INTEGER NOT NULL,
+                                 descendant_id INTEGER NOT NULL,
+                                 depth INTEGER NOT NULL,
+                                 PRIMARY KEY (ancestor_id, descendant_id))
+                                WITHOUT ROWID''')
+        self.cursor.execute(f'''CREATE INDEX IF NOT EXISTS "idx_{closure_table}_descendant"
+                                ON "{closure_table}" (descendant_id, depth)''')
+
+        def subtree(node):
+            return f'SELECT descendant_id FROM "{closure_table}" WHERE ancestor_id = {node}'
+
+        self.cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS "trg_{table_name}_insert"
+                                AFTER INSERT ON "{table_name}"
+                                BEGIN
+                                    INSERT INTO "{closure_table}" (ancestor_id, descendant_id, depth)
+                                    SELECT NEW.{id_column}, NEW.{id_column}, 0
+                                    UNION ALL
+                                    SELECT ancestor_id, NEW.{id_column}, depth + 1 FROM "{closure_table}"
+                                    WHERE descendant_id = NEW.parent_id;
+                                END''')
+        self.cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS "trg_{table_name}_check_parent"
+                                BEFORE UPDATE OF parent_id ON "{table_name}"
+                                WHEN NEW.parent_id IS NOT OLD.parent_id
+                                BEGIN
+                                    SELECT RAISE(ABORT, '上级不能是自身或其下级')
+                                    WHERE NEW.parent_id IN ({subtree(f"NEW.{id_column}")});
+                                END''')
+        self.cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS "trg_{table_name}_move"
+                                AFTER UPDATE OF parent_id ON "{table_name}"
+                                WHEN NEW.parent_id IS NOT OLD.parent_id
+                                BEGIN
+                                    DELETE FROM "{closure_table}"
+                                    WHERE descendant_id IN ({subtree(f"NEW.{id_column}")})
+                                    AND ancestor_id NOT IN ({subtree(f"NEW.{id_column}")});
+                                    INSERT INTO "{closure_table}" (ancestor_id, descendant_id, depth)
+                                    SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+                                    FROM "{closure_table}" a JOIN "{closure_table}" d
+                                    ON d.ancestor_id = NEW.{id_column}
+                                    WHERE a.descendant_id = NEW.parent_id;
+                                END''')
+        self.cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS "trg_{table_name}_delete"
+                                AFTER DELETE ON "{table_name}"
+                                BEGIN
+                                    DELETE FROM "{closure_table}"
+                                    WHERE descendant_id IN ({subtree(f"OLD.{id_column}")})
+                                    AND ancestor_id IN (SELECT ancestor_id FROM "{closure_table}"
+                                                        WHERE descendant_id = OLD.{id_column});
+                                END''')
+
+    def rebuild_closure_table(self, table_name, closure_table, id_column):
+        """按层级表的现有数据重新生成闭包表，层级成环时不会无限展开。本方法不提交事务。"""
+        self.cursor.execute(f'DELETE FROM "{closure_table}"')
+        self.cursor.execute(f'''INSERT INTO "{closure_table}" (ancestor_id, descendant_id, depth)
+                                WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+                                    SELECT {id_column}, {id_column}, 0 FROM "{table_name}"
+                                    UNION ALL
+                                    SELECT tree.ancestor_id, t.{id_column}, tree.depth + 1
+                                    FROM "{table_name}" t JOIN tree ON t.parent_id = tree.descendant_id
+                                    WHERE tree.depth < (SELECT COUNT(*) FROM "{table_name}")
+                                )
+                                SELECT ancestor_id, descendant_id, MIN(depth) FROM tree
+                                GROUP BY ancestor_id, descendant_id''')
+
+    def create_derived_views(self):
+        """
+        创建幢总建筑面积、整幢所有单元数据和分组成员面积的视图
+
+        视图直接查询户单元套内面积和共有建筑面积表，数据始终与源表一致，
+        无需在保存后重新生成。
+        """
+        self.cursor.execute('''CREATE VIEW IF NOT EXISTS "幢总建筑面积" AS
+                               SELECT ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途 
+                               FROM "户单元套内面积"
+                               UNION ALL
+                               SELECT ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途 
+                               FROM "共有建筑面积"''')
+        self.cursor.execute('''CREATE VIEW IF NOT EXISTS "分摊所属_整幢" AS
+                               SELECT ID, 房号, 套内面积 FROM "幢总建筑面积"''')
+
+        # 分组成员及其面积，按分组查询时条件会下推到两个子查询中，均可走索引
+        self.cursor.execute('''CREATE VIEW IF NOT EXISTS "分摊所属成员面积" AS
+                               SELECT m.belong_id, h.ID, h.房号, h.套内面积 
+                               FROM "分摊所属成员" m JOIN "户单元套内面积" h ON h.ID = m.unit_id
+                               UNION ALL
+                               SELECT m.belong_id, c.ID, c.房号, c.套内面积 
+                               FROM "分摊所属成员" m JOIN "共有建筑面积" c ON c.ID = m.unit_id''')
+
+        self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊所属关系_name" 
+                               ON "分摊所属关系" (belong_name)''')
+        self.cursor.execute('''CREATE INDEX IF NOT EXISTS "idx_分摊所属关系_allocation" 
+                               ON "分摊所属关系" (allocation_name, order_index)''')
+
+        self.create_result_view()
+        self.commit()
+
+    def create_result_view(self):
+        """
+        重建分摊系数计算过程视图
+
+        将分摊计算结果表按模型展开为宽表：ID、房号、套内面积、总分摊系数，
+        以及每个模型的 {模型}_分摊系数、{模型}_分摊公共面积、{模型}_应分摊公共面积 列。
+        列随分摊模型变化，因此在添加或删除模型后重建。本方法不提交事务。
+        """
+        self.cursor.execute('SELECT model_id, model_name FROM "分摊模型关系" ORDER BY model_id')
+        model_columns = []
+        for model_id, model_name in self.cursor.fetchall():
+            for field, suffix in RESULT_FIELDS:
+                column = f"{model_name}_{suffix}".replace('"', '""')
+                model_columns.append(f'MAX(CASE WHEN r.model_id = {int(model_id)} THEN r.{field} END) AS "{column}"')
+
+        self.cursor.execute('DROP VIEW IF EXISTS "分摊系数计算过程"')
+        self.cursor.execute(f'''CREATE VIEW "分摊系数计算过程" AS
+                                SELECT r.unit_id AS ID, u.房号, u.套内面积, 
+                                       ROUND(SUM(COALESCE(r.coefficient, 0)), 6) AS 分摊系数
+                                       {''.join(', ' + column for column in model_columns)}
+                                FROM "分摊计算结果" r 
+                                LEFT JOIN "幢总建筑面积" u ON u.ID = r.unit_id
+                                GROUP BY r.unit_id''')
+
+    def convert_columns_to_numeric(self, table_name):
+        """
+        将表中的面积和系数列重建为REAL类型
+
+        SQLite不支持修改列类型，因此按新类型建表、转换数据后替换原表。
+        空字符串转换为NULL，列顺序和主键保持不变。本方法不提交事务。
+        """
+        self.cursor.execute(f"PRAGMA table_info('{table_name}')")
+        columns = self.cursor.fetchall()
+        numeric_columns = [col[1] for col in columns if col[1] not in TEXT_COLUMNS]
+        if all(col[2].upper() == "REAL" for col in columns if col[1] in numeric_columns):
+            return
+
+        column_defs = []
+        select_exprs = []
+        for _, name, col_type, _, _, pk in columns:
+            if name in numeric_columns:
+                column_defs.append(f'"{name}" REAL')
+                select_exprs.append(f'CAST(NULLIF(TRIM("{name}"), \'\') AS REAL)')
+            else:
+                column_defs.append(f'"{name}" {col_type}{" PRIMARY KEY" if pk else ""}')
+                select_exprs.append(f'"{name}"')
+
+        temp_table = f"temp_{table_name}"
+        self.cursor.execute(f'CREATE TABLE "{temp_table}" ({", ".join(column_defs)})')
+        self.cursor.execute(f'INSERT INTO "{temp_table}" SELECT {", ".join(select_exprs)} FROM "{table_name}"')
+        self.cursor.execute(f'DROP TABLE "{table_name}"')
+        self.cursor.execute(f'ALTER TABLE "{temp_table}" RENAME TO "{table_name}"')
+
+    def import_data(self, file_path, table_name=None):
         """
         从Excel文件导入数据
-        
-        使用QFileDialog让用户选择.xlsx文件，然后使用pandas读取文件内容。
-        将读取的数据转换为列表格式并存储在self.data中。
-        
+
+        按块读取文件内容，为每行数据在表中已有ID之后分配新ID，
+        将结果存储在self.data中，不写入数据库。不显示对话框，可在后台线程和无界面场景中调用。
+        各行在读取的数据块上直接加入ID，不另建DataFrame及其副本。
+
+        参数:
+            file_path: Excel文件路径或文件流
+            table_name (str): 目标单元表名，决定ID前缀，为None时使用self.current_table
+
         返回:
             list: 导入的数据列表，如导入失败则返回空列表
-        
+
         注意:
             - 仅支持.xlsx格式的文件
-            - 如果用户取消选择文件，将返回空列表
+            - 全空行会被跳过，空单元格为None
             - 捕获并打印任何导入过程中的异常
         """
-        # 打开文件对话框，让用户选择.xlsx文件
-        file_path, _ = QFileDialog.getOpenFileName(None, "选择Excel文件", "", "Excel Files (*.xlsx)")
-        
-        if file_path:
-            try:
-                # 使用pandas读取Excel文件
-                df = pd.read_excel(file_path)
-                
+        if table_name is None:
+            table_name = getattr(self, 'current_table', None)
+
+        # 获取当前最大ID号
+        prefix, max_id = self.get_id_prefix_and_max(table_name)
+        if prefix is None:
+            return []
+
+        try:
+            data = []
+            with ExcelChunkReader(file_path) as reader:
                 # 保存表头
-                self.headers = df.columns.tolist()
-                
-                # 将DataFrame转换为列表
-                imported_data = df.values.tolist()
-                
-                # 获取当前最大ID号
-                table_name = self.current_table if hasattr(self, 'current_table') else None
-                if table_name == "户单元套内面积":
-                    prefix = "H"
-                    self.cursor.execute('SELECT MAX(CAST(SUBSTR(ID, 2) AS INTEGER)) FROM "户单元套内面积" WHERE ID LIKE "H%"')
-                elif table_name == "共有建筑面积":
-                    prefix = "C"
-                    self.cursor.execute('SELECT MAX(CAST(SUBSTR(ID, 2) AS INTEGER)) FROM "共有建筑面积" WHERE ID LIKE "C%"')
-                else:
-                    return []
-                
-                max_id = self.cursor.fetchone()[0] or 0
-                
+                self.headers = reader.headers
+
                 # 为每行数据生成新的ID
-                self.data = []
-                for i, row in enumerate(imported_data):
-                    new_id = f"{prefix}{max_id + i + 1}"
-                    self.data.append([new_id] + row)
-                
-                print(f"成功导入数据，共{len(self.data)}行")
-                return self.data
-            except Exception as e:
-                # 捕获并打印任何导入过程中的异常
-                print(f"导入数据时出错：{str(e)}")
-                return []
-        else:
-            # 用户取消选择文件
-            print("未选择文件")
+                for chunk in reader:
+                    for row in chunk:
+                        row.insert(0, f"{prefix}{max_id + len(data) + 1}")
+                        data.append(row)
+
+            self.data = data
+            print(f"成功导入数据，共{len(self.data)}行")
+            return self.data
+        except Exception as e:
+            # 捕获并打印任何导入过程中的异常
+            print(f"导入数据时出错：{str(e)}")
             return []
 
+    def get_id_prefix_and_max(self, table_name):
+        """
+        获取表的ID前缀和当前最大ID号
+
+        户单元套内面积使用"H"前缀，共有建筑面积使用"C"前缀。
+
+        返回:
+            tuple: (前缀, 最大ID号)，不支持的表返回 (None, 0)
+        """
+        prefix = ID_PREFIXES.get(table_name)
+        if prefix is None:
+            return None, 0
+
+        self.cursor.execute(f'SELECT MAX(CAST(SUBSTR(ID, 2) AS INTEGER)) FROM "{table_name}" WHERE ID LIKE ?',
+                            (f"{prefix}%",))
+        return prefix, self.cursor.fetchone()[0] or 0
+
+    def import_data_streaming(self, file_path, table_name, chunk_size=DEFAULT_CHUNK_SIZE,
+                              progress_callback=None):
+        """
+        流式分块导入Excel数据
+
+        按块惰性读取工作表，每块分配ID后直接用executemany写入SQLite，
+        不在内存中保留整张工作表，导入的数据追加到现有数据之后。
+        全部写入后在同一事务内提交，出错时整体回滚。
+
+        参数:
+            file_path: Excel文件路径或文件流
+            table_name (str): 目标表名（户单元套内面积 或 共有建筑面积）
+            chunk_size (int): 每块的最大行数
+            progress_callback (callable): 进度回调，参数为 (已导入行数, 估计总行数)，
+                                          总行数未知时为None
+
+        返回:
+            tuple: (是否成功, 导入行数 或 错误信息)
+        """
+        prefix, max_id = self.get_id_prefix_and_max(table_name)
+        if prefix is None:
+            return False, f"不支持导入到表 {table_name}"
+
+        imported = 0
+        try:
+            with ExcelChunkReader(file_path, chunk_size) as reader:
+                self.headers = reader.headers
+                for chunk in reader:
+                    imported += self.append_rows(table_name, chunk, max_id + imported)
+
+                    if progress_callback:
+                        progress_callback(imported, reader.total_rows)
+
+            self.commit()
+        except Exception as e:
+            self.rollback()
+            print(f"流式导入数据时出错：{str(e)}")
+            return False, str(e)
+
+        print(f"成功导入数据到表 {table_name}，共{imported}行")
+        return True, imported
+
+    def append_rows(self, table_name, rows, max_id=None):
+        """
+        为数据行分配ID并追加写入指定表
+
+        ID从max_id之后连续分配，新单元记为变化单元，本方法不提交事务。
+
+        参数:
+            table_name (str): 目标表名（户单元套内面积 或 共有建筑面积）
+            rows (list): 不含ID列的数据行列表
+            max_id (int): 已分配的最大ID号，为None时从数据库查询
+
+        返回:
+            int: 写入的行数
+        """
+        if not rows:
+            return 0
+        prefix = ID_PREFIXES[table_name]
+        if max_id is None:
+            max_id = self.get_id_prefix_and_max(table_name)[1]
+        new_ids = [f"{prefix}{max_id + i + 1}" for i in range(len(rows))]
+        placeholders = ', '.join(['?'] * (len(rows[0]) + 1))
+        self.cursor.executemany(
+            f'INSERT INTO "{table_name}" VALUES ({placeholders})',
+            (normalize_unit_row([unit_id] + list(row)) for unit_id, row in zip(new_ids, rows)))
+        self.touch_tables(table_name)
+        self.mark_dirty(table_name, new_ids)
+        return len(rows)
+
+    def clear_table(self, table_name):
+        """清空指定表中的数据，本方法不提交事务"""
+        self.cursor.execute(f'DELETE FROM "{table_name}"')
+        self.touch_tables(table_name)
+
+    def touch_tables(self, *table_names):
+        """
+        将表的修改次数加一，使依赖这些表的分组面积缓存失效
+
+        所有修改单元表和分组表的方法都应调用本方法，与修改在同一事务中提交。
+        本方法不提交事务。
+        """
+        self.cursor.executemany('UPDATE "数据版本" SET version = version + 1 WHERE table_name = ?',
+                                [(table_name,) for table_name in table_names])
+
     def save_data(self, table_name):
         """
         保存数据到SQLite数据库
         
-        将self.data中的数据保存到指定的SQLite数据库表中。
-        如果表不存在，则创建新表；如果表已存在，则覆盖原有数据。
+        将self.data与表中已保存的数据按ID比较，
+        只写入新增、修改和删除的行。幢总建筑面积和整幢所有单元数据为视图，随之更新。
         
         参数:
             table_name (str): 要保存数据的表名
@@ -172,73 +761,182 @@ class BuildingAreaModel:
             return False
 
         try:
-            # 删除表中现有数据
-            self.cursor.execute(f'DELETE FROM "{table_name}"')
+            with self.transaction():
+                inserted, updated, deleted_ids = self.compute_changes(table_name, self.data)
+                self.apply_changes(table_name, inserted, updated, deleted_ids)
 
-            # 插入新数据
-            placeholders = ', '.join(['?' for _ in self.headers])
-            self.cursor.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', self.data)
+            self.mark_dirty(table_name, [row[0] for row in inserted + updated] + deleted_ids)
+            print(f"成功保存数据到表 {table_name}，共{len(self.data)}行"
+                  f"（新增{len(inserted)}行，修改{len(updated)}行，删除{len(deleted_ids)}行）")
+            return True
+        except Exception as e:
+            print(f"保存数据时出错：{str(e)}")
+            return False
+
+    def save_changes(self, table_name, updated):
+        """
+        只保存修改过的行
+
+        界面的内容已与表中数据一致、只编辑了部分行时使用，不读取和比较整张表。
 
-            # 更新幢总建筑面积表
-            self.update_total_building_area()
+        参数:
+            table_name (str): 单元表名
+            updated (list): 修改后的完整数据行，第一列为ID
+
+        返回:
+            bool: 保存成功返回True，失败返回False
+        """
+        updated = [tuple(normalize_unit_row(row)) for row in updated]
+        if not updated:
+            print("没有修改需要保存")
+            return True
 
-            # 更新整幢所有单元数据
-            self.save_total_building_units()
+        try:
+            with self.transaction():
+                self.apply_changes(table_name, [], updated, [])
 
-            self.conn.commit()
-            print(f"成功保存数据到表 {table_name}，共{len(self.data)}行")
+            self.mark_dirty(table_name, [row[0] for row in updated])
+            print(f"成功保存数据到表 {table_name}，修改{len(updated)}行")
             return True
         except Exception as e:
             print(f"保存数据时出错：{str(e)}")
             return False
 
-    def update_total_building_area(self):
-        """更新幢总建筑面积表"""
-        try:
-            # 清空幢总建筑面积表
-            self.cursor.execute('DELETE FROM "幢总建筑面积"')
-
-            # 插入户单元套内面积数据，不再需要添加'H'前缀
-            self.cursor.execute('''INSERT INTO "幢总建筑面积" 
-                                 (ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途)
-                                 SELECT ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途 
-                                 FROM "户单元套内面积"''')
-
-            # 插入共有建筑面积数据，不再需要添加'C'前缀
-            self.cursor.execute('''INSERT INTO "幢总建筑面积" 
-                                 (ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途)
-                                 SELECT ID, 实际楼层, 房号, 主间面积, 阳台面积, 套内面积, 用途 
-                                 FROM "共有建筑面积"''')
-
-            self.conn.commit()
-        except Exception as e:
-            print(f"更新幢总建筑面积表时出错：{str(e)}")
-            self.conn.rollback()
+    def mark_dirty(self, table_name, unit_ids):
+        """记录发生变化、需要重新计算分摊的单元"""
+        if unit_ids:
+            self.dirty_units.setdefault(table_name, set()).update(unit_ids)
+
+    def take_dirty_units(self):
+        """取出并清空已记录的变化单元，返回 {单元表名: ID集合}"""
+        dirty_units, self.dirty_units = self.dirty_units, {}
+        return dirty_units
+
+    def compute_changes(self, table_name, rows):
+        """
+        按ID比较新数据与表中已保存的数据
+
+        参数:
+            table_name (str): 单元表名
+            rows (list): 完整的新数据行列表，第一列为ID
+
+        返回:
+            tuple: (新增行列表, 修改行列表, 删除的ID列表)
+        """
+        self.cursor.execute(f'SELECT * FROM "{table_name}"')
+        stored = {row[0]: row for row in self.cursor.fetchall()}
 
-    def __del__(self):
-        # 确保在对象被销毁时关闭数据库连接
-        self.conn.close()
+        inserted = []
+        updated = []
+        seen_ids = set()
+        for row in rows:
+            row = tuple(normalize_unit_row(row))
+            seen_ids.add(row[0])
+            stored_row = stored.get(row[0])
+            if stored_row is None:
+                inserted.append(row)
+            elif stored_row != row:
+                updated.append(row)
+
+        deleted_ids = [row_id for row_id in stored if row_id not in seen_ids]
+        return inserted, updated, deleted_ids
+
+    def apply_changes(self, table_name, inserted, updated, deleted_ids):
+        """
+        将变更写入单元表
+
+        只处理发生变化的行，耗时与变更行数成正比。本方法不提交事务。
+
+        参数:
+            table_name (str): 单元表名
+            inserted (list): 新增的完整数据行
+            updated (list): 修改后的完整数据行
+            deleted_ids (list): 删除的ID
+        """
+        if deleted_ids:
+            self.cursor.executemany(f'DELETE FROM "{table_name}" WHERE ID = ?',
+                                    [(row_id,) for row_id in deleted_ids])
+        if updated:
+            self.cursor.executemany(f'''UPDATE "{table_name}" 
+                                        SET 实际楼层 = ?, 房号 = ?, 主间面积 = ?, 阳台面积 = ?, 套内面积 = ?, 用途 = ?
+                                        WHERE ID = ?''',
+                                    [tuple(row[1:]) + (row[0],) for row in updated])
+        if inserted:
+            placeholders = ', '.join(['?'] * len(inserted[0]))
+            self.cursor.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', inserted)
+        if inserted or updated or deleted_ids:
+            self.touch_tables(table_name)
+
+    def close(self):
+        """释放数据库连接，同一项目的最后一个模型关闭时连接才真正关闭"""
+        if self.project is not None:
+            self.cursor.close()
+            connection_manager.close_project(self.project)
+            self.project = None
 
     def get_table_names(self):
-        """获取数据库中所表的名称"""
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        """获取数据库中所表的名称，包括登记在分摊所属关系表中的分组"""
+        self.cursor.execute("""SELECT name FROM sqlite_master WHERE type IN ('table', 'view')
+                               UNION
+                               SELECT belong_name FROM "分摊所属关系";""")
         return [row[0] for row in self.cursor.fetchall()]
 
+    def get_belong_id(self, belong_name):
+        """获取分摊所属分组的belong_id，不存在时返回None"""
+        self.cursor.execute('SELECT belong_id FROM "分摊所属关系" WHERE belong_name = ?', (belong_name,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def unit_source_query(self, table_name, columns="ID, 房号, 套内面积"):
+        """
+        构造查询分组单元数据的SQL
+
+        单元表、幢总建筑面积和整幢直接查询对应的表或视图，
+        其他分摊所属分组通过分摊所属成员表关联单元表查询。
+
+        参数:
+            table_name (str): 表名或分摊所属分组名
+            columns (str): 查询的列
+
+        返回:
+            tuple: (SQL语句, 参数)
+        """
+        if table_name in UNIT_SOURCE_TABLES:
+            return f'SELECT {columns} FROM "{table_name}"', ()
+        return (f'''SELECT {columns} FROM "分摊所属成员面积" 
+                    WHERE belong_id = (SELECT belong_id FROM "分摊所属关系" WHERE belong_name = ?)''',
+                (table_name,))
+
     def fetch_data_from_table(self, table_name):
-        """从指定表中获取数据"""
+        """从指定表或分摊所属分组中获取数据"""
         try:
-            # 根据表名确定ID字段名
-            id_field = "HID" if table_name == "户单元套内面积" else "CID" if table_name == "共有建筑面积" else "ID"
-            
-            # 执行查询
-            self.cursor.execute(f"SELECT {id_field}, 房号, 套内面积 FROM '{table_name}'")
+            self.cursor.execute(*self.unit_source_query(table_name))
             return self.cursor.fetchall()
         except Exception as e:
             print(f"获取数据时出错：{str(e)}")
             return []
 
+    def fetch_unit_details(self):
+        """
+        获取全部单元的实际楼层和用途，供选择单元时筛选
+
+        返回:
+            dict: {ID: (实际楼层, 用途)}
+        """
+        try:
+            self.cursor.execute('SELECT ID, 实际楼层, 用途 FROM "幢总建筑面积"')
+            return {unit_id: (floor, use) for unit_id, floor, use in self.cursor.fetchall()}
+        except Exception as e:
+            print(f"获取单元信息时出错：{str(e)}")
+            return {}
+
     def save_allocation_data(self, allocation_name, data, parent_table=None):
-        """保存分配数据到多个表"""
+        """
+        保存分配数据到分摊所属成员表
+
+        每个分组登记为分摊所属关系表中的一条记录（名称为 分摊所属_{分摊所属}_{分组}），
+        分组包含的单元ID写入分摊所属成员表，面积等数据从单元表关联查询。
+        """
         base_table_name = f"分摊所属_{allocation_name}"
         
         # 按 group_name 分组数据
@@ -247,304 +945,328 @@ class BuildingAreaModel:
             group_name, id, room, area = item
             if group_name not in grouped_data:
                 grouped_data[group_name] = []
-            grouped_data[group_name].append((id, room, area))
-
-        # 为每个组创建一个表并保存数据
-        created_tables = []
-        for group_name, group_data in grouped_data.items():
-            table_name = f"{base_table_name}_{group_name}"
-            self.cursor.execute(f"CREATE TABLE IF NOT EXISTS '{table_name}' (ID TEXT, 房号 TEXT, 套内面积 TEXT)")
-            self.cursor.execute(f"DELETE FROM '{table_name}'")
-            self.cursor.executemany(f"INSERT INTO '{table_name}' (ID, 房号, 套内面积) VALUES (?, ?, ?)", group_data)
-            created_tables.append(table_name)
-
-        # 更新分摊所属关系表
-        if parent_table:
+            grouped_data[group_name].append(id)
+
+        with self.transaction():
             # 获取父表的belong_id
-            self.cursor.execute('''SELECT belong_id FROM "分摊所属关系" WHERE belong_name = ?''', 
-                              (parent_table,))
-            parent_result = self.cursor.fetchone()
-            parent_id = parent_result[0] if parent_result else None
-
-            # 如果父表不存在于关系表中，先添加父表
-            if parent_id is None:
-                # 创建父表的别名
-                parent_alias = parent_table.replace("分摊所属_", "")
-                self.cursor.execute('''INSERT INTO "分摊所属关系" 
-                                     (belong_name, belong_alias, parent_id, order_index)
-                                     VALUES (?, ?, NULL, 
-                                            (SELECT COALESCE(MAX(order_index), 0) + 1 
-                                             FROM "分摊所属关系" 
-                                             WHERE parent_id IS NULL))''', 
-                                  (parent_table, parent_alias))
-                parent_id = self.cursor.lastrowid
-
-            # 添加或更新当前分摊所属的记录
-            for table_name in created_tables:
+            parent_id = None
+            if parent_table:
+                parent_id = self.get_belong_id(parent_table)
+
+                # 如果父表不存在于关系表中，先添加父表
+                if parent_id is None:
+                    # 创建父表的别名
+                    parent_alias = parent_table.replace("分摊所属_", "")
+                    self.cursor.execute('''INSERT INTO "分摊所属关系" 
+                                         (belong_name, belong_alias, parent_id, order_index)
+                                         VALUES (?, ?, NULL, 
+                                                (SELECT COALESCE(MAX(order_index), 0) + 1 
+                                                 FROM "分摊所属关系" 
+                                                 WHERE parent_id IS NULL))''', 
+                                      (parent_table, parent_alias))
+                    parent_id = self.cursor.lastrowid
+
+            # 添加或更新每个分组的记录并保存成员
+            created_tables = []
+            for group_name, unit_ids in grouped_data.items():
+                table_name = f"{base_table_name}_{group_name}"
+
                 # 获取当前最大的order_index
                 self.cursor.execute('''SELECT COALESCE(MAX(order_index), 0) 
                                      FROM "分摊所属关系" 
-                                     WHERE parent_id = ?''', 
+                                     WHERE parent_id IS ?''', 
                                   (parent_id,))
                 max_order = self.cursor.fetchone()[0]
 
                 # 创建表的别名
                 table_alias = table_name.replace("分摊所属_", "")
 
-                # 检查是否已存在记录
-                self.cursor.execute('''SELECT belong_id FROM "分摊所属关系" 
-                                     WHERE belong_name = ?''', 
-                                  (table_name,))
-                existing = self.cursor.fetchone()
-
-                if existing:
+                belong_id = self.get_belong_id(table_name)
+                if belong_id is not None:
                     # 更新现有记录
                     self.cursor.execute('''UPDATE "分摊所属关系" 
-                                         SET parent_id = ?, order_index = ?, belong_alias = ?
+                                         SET parent_id = ?, order_index = ?, belong_alias = ?, allocation_name = ?
                                          WHERE belong_id = ?''',
-                                      (parent_id, max_order + 1, table_alias, existing[0]))
+                                      (parent_id, max_order + 1, table_alias, allocation_name, belong_id))
                 else:
                     # 插入新记录
                     self.cursor.execute('''INSERT INTO "分摊所属关系" 
-                                         (belong_name, belong_alias, parent_id, order_index)
-                                         VALUES (?, ?, ?, ?)''',
-                                      (table_name, table_alias, parent_id, max_order + 1))
+                                         (belong_name, belong_alias, parent_id, order_index, allocation_name)
+                                         VALUES (?, ?, ?, ?, ?)''',
+                                      (table_name, table_alias, parent_id, max_order + 1, allocation_name))
+                    belong_id = self.cursor.lastrowid
+
+                self.cursor.execute('DELETE FROM "分摊所属成员" WHERE belong_id = ?', (belong_id,))
+                self.cursor.executemany('INSERT OR IGNORE INTO "分摊所属成员" (belong_id, unit_id) VALUES (?, ?)',
+                                        [(belong_id, unit_id) for unit_id in unit_ids])
+                created_tables.append(table_name)
+
+            self.touch_tables("分摊所属成员", "分摊所属关系")
 
-        self.conn.commit()
         return created_tables
 
     def delete_allocation_tables(self, allocation_name):
-        """删除与指定分摊所属相关的所有数据表，但保留整幢表"""
-        base_table_name = f"分摊所属_{allocation_name}"
-        
-        # 使用递归CTE获取所有需要删除的表
-        self.cursor.execute("""
-            WITH RECURSIVE belong_tree AS (
-                -- 基础查询：获取指定分摊所属
-                SELECT belong_id, belong_name, parent_id
-                FROM "分摊所属关系"
-                WHERE belong_name LIKE ?
-                
-                UNION ALL
-                
-                -- 递归查询：获取子分摊所属
-                SELECT c.belong_id, c.belong_name, c.parent_id
-                FROM "分摊所属关系" c
-                JOIN belong_tree p ON c.parent_id = p.belong_id
-            )
-            SELECT belong_name FROM belong_tree
-        """, (f"{base_table_name}%",))
-        
-        tables_to_delete = set(row[0] for row in self.cursor.fetchall())
-        
-        # 删除表和关系记录
-        deleted_tables = []
-        for table_name in tables_to_delete:
-            if table_name != "分摊属_整幢":
-                try:
-                    # 删除数据表
-                    self.cursor.execute(f"DROP TABLE IF EXISTS '{table_name}'")
-                    # 删除关系记录
-                    self.cursor.execute('''DELETE FROM "分摊所属关系" WHERE belong_name = ?''',
-                                      (table_name,))
-                    deleted_tables.append(table_name)
-                except Exception as e:
-                    print(f"删除表 {table_name} 时出错：{str(e)}")
-        
-        self.conn.commit()
-        return deleted_tables
+        """
+        删除指定分摊所属及其子分摊所属的分组和成员数据，但保留整幢
+
+        已保存输入的分摊模型仍使用其中的分组时不删除，以免重新计算时把这些模型当作空分组计算。
+
+        返回:
+            list: 删除的分组名
+
+        异常:
+            ValueError: 分组仍被分摊模型使用
+        """
+        with self.transaction():
+            # 通过闭包表一次查出各分组及其全部下级
+            self.cursor.execute("""
+                SELECT DISTINCT r.belong_id, r.belong_name
+                FROM "分摊所属关系" g
+                JOIN "分摊所属层级" c ON c.ancestor_id = g.belong_id
+                JOIN "分摊所属关系" r ON r.belong_id = c.descendant_id
+                WHERE g.allocation_name = ? AND r.belong_name != '分摊所属_整幢'
+            """, (allocation_name,))
+            groups = self.cursor.fetchall()
+            if not groups:
+                return []
+
+            # 检查分摊模型输入是否仍使用这些分组
+            belong_names = [belong_name for _, belong_name in groups]
+            self.cursor.execute(f"""
+                SELECT DISTINCT m.model_name
+                FROM "分摊模型输入" i JOIN "分摊模型关系" m ON m.model_id = i.model_id
+                WHERE i.belong_name IN ({', '.join(['?'] * len(belong_names))})
+                ORDER BY m.model_name
+            """, belong_names)
+            models = [row[0] for row in self.cursor.fetchall()]
+            if models:
+                raise ValueError(f"分摊所属 '{allocation_name}' 的分组正被分摊模型使用：{'、'.join(models)}，"
+                                 f"请先删除这些分摊模型")
+
+            # 删除成员和关系记录
+            params = [(belong_id,) for belong_id, _ in groups]
+            self.cursor.executemany('DELETE FROM "分摊所属成员" WHERE belong_id = ?', params)
+            self.cursor.executemany('DELETE FROM "分摊所属关系" WHERE belong_id = ?', params)
+            self.touch_tables("分摊所属成员", "分摊所属关系")
+        return belong_names
 
     def get_allocation_options(self):
         """获取分摊所属选项，不包括整幢"""
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '分摊所属_%'")
-        tables = self.cursor.fetchall()
-        
-        options = set()
-        for (table,) in tables:
-            # 排除整幢表
-            if table != "分摊所属_整幢":
-                match = re.match(r'分摊所属_(.+?)_', table)
-                if match:
-                    options.add(match.group(1))
-        
-        return list(options)
+        self.cursor.execute('''SELECT allocation_name FROM "分摊所属关系" 
+                               WHERE allocation_name IS NOT NULL
+                               GROUP BY allocation_name
+                               ORDER BY MIN(belong_id)''')
+        return [row[0] for row in self.cursor.fetchall()]
 
     def get_allocation_tables(self, option):
-        """获取指定分摊所属选项的相关数据表，不包括整幢表"""
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?", (f'分摊所属_{option}_%',))
-        tables = self.cursor.fetchall()
-        # 过滤掉整幢表
-        return [table[0] for table in tables if table[0] != "分摊所属_整幢"]
+        """获取指定分摊所属选项的分组名称，不包括整幢"""
+        self.cursor.execute('''SELECT belong_name FROM "分摊所属关系" 
+                               WHERE allocation_name = ?
+                               ORDER BY order_index''', (option,))
+        return [row[0] for row in self.cursor.fetchall()]
 
     def get_total_area(self, tables):
+        """
+        计算多个表或分摊所属分组的套内面积之和
+
+        每个分组的总面积按分组名缓存，并记录计算时所依赖表的修改次数；
+        依赖的表未被修改时直接使用缓存，命中和未命中次数记录在area_cache_stats中。
+        事务回滚时修改次数随之恢复，缓存随之清空，避免与之后的修改次数重合。
+        """
+        self.cursor.execute('SELECT table_name, version FROM "数据版本"')
+        versions = dict(self.cursor.fetchall())
+
         total_area = 0
         for table in tables:
-            self.cursor.execute(f"SELECT SUM(CAST(套内面积 AS FLOAT)) FROM '{table}'")
-            result = self.cursor.fetchone()
-            if result[0]:
-                total_area += result[0]
+            if table in ("户单元套内面积", "共有建筑面积"):
+                dependencies = (table,)
+            elif table in UNIT_SOURCE_TABLES:
+                dependencies = ("户单元套内面积", "共有建筑面积")
+            else:
+                dependencies = GROUP_TABLES
+            key = tuple(versions.get(name) for name in dependencies)
+
+            cached = self.area_cache.get(table)
+            if cached is not None and cached[0] == key:
+                self.area_cache_stats["hits"] += 1
+                area = cached[1]
+            else:
+                self.area_cache_stats["misses"] += 1
+                self.cursor.execute(*self.unit_source_query(table, "SUM(套内面积)"))
+                area = self.cursor.fetchone()[0] or 0
+                self.area_cache[table] = (key, area)
+            total_area += area
         return total_area
 
-    def save_apportionment_coefficient(self, tables, coefficient, model_type):
-        # 创建或更新"分摊系数计算过程"表
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊系数计算过程" 
-                               (ID TEXT PRIMARY KEY, 房号 TEXT, 套内面积 TEXT)''')
+    def get_area_cache_stats(self):
+        """
+        获取分组面积缓存的统计信息
 
-        # 添加新的分摊系数列和分摊公共面积列（如果不存在）
-        coefficient_column = f"{model_type}_分摊系数"
-        area_column = f"{model_type}_分摊公共面积"
-        self.cursor.execute(f"PRAGMA table_info('分摊系数计算过程')")
-        columns = [row[1] for row in self.cursor.fetchall()]
-        if coefficient_column not in columns:
-            self.cursor.execute(f"ALTER TABLE '分摊系数计算过程' ADD COLUMN '{coefficient_column}' TEXT")
-        if area_column not in columns:
-            self.cursor.execute(f"ALTER TABLE '分摊系数计算过程' ADD COLUMN '{area_column}' TEXT")
+        返回:
+            dict: {"hits": 命中次数, "misses": 未命中次数, "size": 缓存的分组数}
+        """
+        return dict(self.area_cache_stats, size=len(self.area_cache))
+
+    def get_model_id(self, model_name, create=False):
+        """
+        获取分摊模型的model_id
+
+        参数:
+            model_name (str): 模型名称
+            create (bool): 模型不存在时是否登记为顶级模型
 
-        # 将系数格式化为保留6位小数的字符串
-        formatted_coefficient = f"{coefficient:.6f}"
+        返回:
+            int: model_id，模型不存在且未创建时返回None
+        """
+        self.cursor.execute('SELECT model_id FROM "分摊模型关系" WHERE model_name = ? ORDER BY model_id',
+                            (model_name,))
+        result = self.cursor.fetchone()
+        if result:
+            return result[0]
+        if not create:
+            return None
+        self.cursor.execute('''INSERT INTO "分摊模型关系" (model_name, parent_id, order_index)
+                               VALUES (?, NULL, (SELECT COALESCE(MAX(order_index), 0) + 1 
+                                                 FROM "分摊模型关系" WHERE parent_id IS NULL))''',
+                            (model_name,))
+        model_id = self.cursor.lastrowid
+        self.touch_tables("分摊模型关系")
+        self.create_result_view()
+        return model_id
+
+    def upsert_results(self, model_id, fields, rows):
+        """
+        批量写入分摊计算结果表
+
+        已存在的 (unit_id, model_id) 只更新指定字段，其余字段保持不变；不存在的插入新记录。
+        整批数据由一条预编译语句通过executemany写入。
 
-        # 更新或插入数
+        参数:
+            model_id (int): 模型ID
+            fields (list): 要写入的字段，取自RESULT_FIELDS
+            rows (list): [(unit_id, 各字段的值...), ...]
+        """
+        updates = ', '.join(f'{field} = excluded.{field}' for field in fields)
+        self.cursor.executemany(f'''INSERT INTO "分摊计算结果" (unit_id, model_id, {', '.join(fields)})
+                                    VALUES (?, {model_id}, {', '.join(['?'] * len(fields))})
+                                    ON CONFLICT(unit_id, model_id) DO UPDATE SET {updates}''', rows)
+
+    def fetch_units(self, tables):
+        """获取多个表或分摊所属分组的全部单元 (ID, 房号, 套内面积)"""
+        rows = []
         for table in tables:
-            self.cursor.execute(f"SELECT ID, 房号, 套内面积 FROM '{table}'")
-            rows = self.cursor.fetchall()
-            for row in rows:
-                # 计算分摊公共面积
-                inner_area = float(row[2])
-                apportioned_area = inner_area * coefficient
-                formatted_apportioned_area = f"{apportioned_area:.2f}"  # 修改为保留2位小数
-
-                # 检查是否已存在该 ID 的记录
-                self.cursor.execute("SELECT * FROM '分摊系数计算过程' WHERE ID = ?", (row[0],))
-                existing_record = self.cursor.fetchone()
-                
-                if existing_record:
-                    # 如果记录已存在，更新它
-                    self.cursor.execute(f'''UPDATE "分摊系数计算过程" 
-                                            SET 房号 = ?, 套内面积 = ?, '{coefficient_column}' = ?, '{area_column}' = ?
-                                            WHERE ID = ?''', 
-                                        (row[1], row[2], formatted_coefficient, formatted_apportioned_area, row[0]))
-                else:
-                    # 如果记录不存在，插入新记录
-                    self.cursor.execute(f'''INSERT INTO "分摊系数计算过程" 
-                                            (ID, 房号, 套内面积, '{coefficient_column}', '{area_column}')
-                                            VALUES (?, ?, ?, ?, ?)''', 
-                                        (row[0], row[1], row[2], formatted_coefficient, formatted_apportioned_area))
+            self.cursor.execute(*self.unit_source_query(table))
+            rows.extend(self.cursor.fetchall())
+        return rows
 
-        self.conn.commit()
+    def save_apportionment_coefficient(self, tables, coefficient, model_type, common_area=None, upper_coefficient=0):
+        """
+        计算并保存分摊系数和分摊公共面积
 
-        # 更新总分摊系数
-        self.update_total_coefficient()
+        各单元的分摊公共面积按模型的算术方式一次计算，按最大余数法保留2位小数，
+        使其总和等于应分摊总面积；结果一次批量写入分摊计算结果表，
+        总分摊系数由分摊系数计算过程视图汇总得到。
+
+        参数:
+            tables (list): 参与分摊单元的表或分组
+            coefficient (float): 分摊系数
+            model_type (str): 分摊模型名称
+            common_area (float): 应分摊共有建筑面积，应分摊总面积为 common_area × (1 + upper_coefficient)；
+                                 为None时取各单元未取整的分摊公共面积之和
+            upper_coefficient (float): 上级分摊系数
+        """
+        with self.transaction():
+            model_id = self.get_model_id(model_type, create=True)
+
+            # 系数保留6位小数
+            coefficient = round(coefficient, 6)
+
+            # 同一单元出现在多个分组中时只分摊一次
+            units = dict((unit_id, inner_area) for unit_id, _, inner_area in self.fetch_units(tables))
+            areas = self.arithmetic.apportioned_areas([area or 0 for area in units.values()], coefficient,
+                                                      common_area, upper_coefficient)
+            rows = [(unit_id, coefficient, area) for unit_id, area in zip(units, areas)]
+            self.upsert_results(model_id, ["coefficient", "apportioned_area"], rows)
 
     def calculate_and_save_apportionable_area(self, tables, upper_coefficient, model_type):
         """计算并保存应分摊公共面积"""
         try:
-            # 创建或更新"分摊系数计算过程"表
-            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊系数计算过程" 
-                                 (ID TEXT PRIMARY KEY, 房号 TEXT, 套内面积 TEXT)''')
-            
-            # 添加新的应分摊公共面积列（如果不存在）
-            area_column = f"{model_type}_应分摊公共面积"
-            self.cursor.execute(f"PRAGMA table_info('分摊系数计算过程')")
-            columns = [row[1] for row in self.cursor.fetchall()]
-            if area_column not in columns:
-                self.cursor.execute(f"ALTER TABLE '分摊系数计算过程' ADD COLUMN '{area_column}' TEXT")
-
-            # 计算并保存每个ID的应分摊公共面积
-            for table in tables:
-                self.cursor.execute(f"SELECT ID, 房号, 套内面积 FROM '{table}'")
-                rows = self.cursor.fetchall()
-                for row in rows:
-                    # 计算应分摊公共面积
-                    inner_area = float(row[2])
-                    apportionable_area = inner_area + (inner_area * upper_coefficient)
-                    formatted_area = f"{apportionable_area:.2f}"  # 保留2位小数
-
-                    # 检查是否已存在该ID的记录
-                    self.cursor.execute("SELECT * FROM '分摊系数计算过程' WHERE ID = ?", (row[0],))
-                    existing_record = self.cursor.fetchone()
-                    
-                    if existing_record:
-                        # 更新现有记录
-                        self.cursor.execute(f'''UPDATE "分摊系数计算过程" 
-                                             SET 房号 = ?, 套内面积 = ?, '{area_column}' = ?
-                                             WHERE ID = ?''', 
-                                          (row[1], row[2], formatted_area, row[0]))
-                    else:
-                        # 构建动态SQL语句
-                        columns = ["ID", "房号", "套内面积", area_column]
-                        placeholders = ["?"] * len(columns)
-                        sql = f'''INSERT INTO "分摊系数计算过程" ({', '.join(f'"{col}"' for col in columns)})
-                                 VALUES ({', '.join(placeholders)})'''
-                        self.cursor.execute(sql, (row[0], row[1], row[2], formatted_area))
+            with self.transaction():
+                model_id = self.get_model_id(model_type, create=True)
 
-                self.conn.commit()
-                return True, None
+                # 计算每个ID的应分摊公共面积，保留2位小数
+                units = self.fetch_units(tables)
+                areas = self.arithmetic.apportionable_areas([inner_area or 0 for _, _, inner_area in units],
+                                                            upper_coefficient)
+                rows = [(unit_id, area) for (unit_id, _, _), area in zip(units, areas)]
+                self.upsert_results(model_id, ["apportionable_area"], rows)
+            return True, None
         except Exception as e:
-            self.conn.rollback()
             return False, str(e)
 
     def delete_apportionment_model_data(self, model_name):
-        """删除与指定分摊模型相关的数列"""
-        try:
-            # 获取"分摊系数计算过程"表的列信息
-            self.cursor.execute("PRAGMA table_info('分摊系数计算过程')")
-            columns = [row[1] for row in self.cursor.fetchall()]
-
-            # 找到与模型相关的列
-            coefficient_column = f"{model_name}_分摊系数"
-            area_column = f"{model_name}_分摊公共面积"
-            apportionable_area_column = f"{model_name}_应分摊公共面积"
-            columns_to_delete = []
-            
-            # 如果列存在，则添加到要删除的列列表中
-            if coefficient_column in columns:
-                columns_to_delete.append(coefficient_column)
-            if area_column in columns:
-                columns_to_delete.append(area_column)
-            if apportionable_area_column in columns:
-                columns_to_delete.append(apportionable_area_column)
-
-            if columns_to_delete:
-                # 创建新表，不包含要删除的列
-                new_columns = [col for col in columns if col not in columns_to_delete]
-                # 使用双引号包裹列名
-                new_columns_str = ', '.join(f'"{col}"' for col in new_columns)
-                self.cursor.execute(f'CREATE TABLE "temp_分摊系数计算过程" AS SELECT {new_columns_str} FROM "分摊系数计算过程"')
-
-                # 删旧表，重命名新表
-                self.cursor.execute('DROP TABLE "分摊系数计算过程"')
-                self.cursor.execute('ALTER TABLE "temp_分摊系数计算过程" RENAME TO "分摊系数计算过程"')
+        """
+        删除与指定分摊模型相关的计算结果
 
-                self.conn.commit()
-                
-                # 更新总分摊系数
-                self.update_total_coefficient()
-                
-                return columns_to_delete
-            else:
+        返回:
+            list: 被删除数据在分摊系数计算过程视图中对应的列名，无数据时为空列表
+        """
+        try:
+            model_id = self.get_model_id(model_name)
+            if model_id is None:
                 return []
+
+            with self.transaction():
+                self.cursor.execute('DELETE FROM "分摊计算结果" WHERE model_id = ?', (model_id,))
+                deleted = self.cursor.rowcount
+
+            if deleted:
+                return [f"{model_name}_{suffix}" for _, suffix in RESULT_FIELDS]
+            return []
         except Exception as e:
             print(f"删除分摊模型数据时出错：{str(e)}")
-            self.conn.rollback()
             raise
 
+    def save_model_inputs(self, model_name, c_tables, h_tables):
+        """
+        保存分摊模型选择的应分摊共有建筑部位和参与分摊单元，供整体重新计算使用
+
+        参数:
+            model_name (str): 模型名称
+            c_tables (list): 应分摊共有建筑部位的分组名
+            h_tables (list): 参与分摊单元的分组名
+        """
+        with self.transaction():
+            model_id = self.get_model_id(model_name, create=True)
+            self.cursor.execute('DELETE FROM "分摊模型输入" WHERE model_id = ?', (model_id,))
+            rows = [(model_id, "C", name, index) for index, name in enumerate(c_tables)]
+            rows += [(model_id, "H", name, index) for index, name in enumerate(h_tables)]
+            self.cursor.executemany('''INSERT OR IGNORE INTO "分摊模型输入" 
+                                       (model_id, role, belong_name, order_index)
+                                       VALUES (?, ?, ?, ?)''', rows)
+
+    def get_total_coefficients(self):
+        """
+        获取每个单元的总分摊系数（各模型分摊系数之和）
+
+        返回:
+            dict: {单元ID: 总分摊系数}
+        """
+        self.cursor.execute('''SELECT unit_id, ROUND(SUM(COALESCE(coefficient, 0)), 6) 
+                               FROM "分摊计算结果" GROUP BY unit_id''')
+        return dict(self.cursor.fetchall())
+
     def get_calculated_coefficients(self):
         """获取已计算的分摊系数"""
         try:
-            self.cursor.execute("PRAGMA table_info('分摊系数计算过程')")
-            columns = [row[1] for row in self.cursor.fetchall()]
-            coefficient_columns = [col for col in columns if col.endswith('_分摊系数')]
-            
-            coefficients = []
-            for col in coefficient_columns:
-                # 使用引号包裹列名以处理特殊字符
-                self.cursor.execute(f'SELECT DISTINCT "{col}" FROM "分摊系数计算过程" WHERE "{col}" IS NOT NULL')
-                result = self.cursor.fetchone()
-                if result:
-                    model_name = col.replace('_分摊系数', '')
-                    coefficients.append((model_name, result[0]))
-            
-            return coefficients
+            self.cursor.execute('''SELECT m.model_name, 
+                                          (SELECT r.coefficient FROM "分摊计算结果" r 
+                                           WHERE r.model_id = m.model_id AND r.coefficient IS NOT NULL 
+                                           LIMIT 1) AS coefficient
+                                   FROM "分摊模型关系" m
+                                   WHERE coefficient IS NOT NULL
+                                   ORDER BY m.model_id''')
+            return self.cursor.fetchall()
         except Exception as e:
             print(f"获取分摊系数时出错：{str(e)}")
             return []
@@ -569,79 +1291,64 @@ class BuildingAreaModel:
             """, (parent_id, parent_id))
             max_order = self.cursor.fetchone()[0]
             
-            # 插入新模型
-            self.cursor.execute("""
-                INSERT INTO '分摊模型关系' (model_name, parent_id, order_index)
-                VALUES (?, ?, ?)
-            """, (model_name, parent_id, max_order + 1))
+            # 插入新模型，计算时已自动登记的同名模型则更新其层级关系
+            model_id = self.get_model_id(model_name)
+            if model_id is None:
+                self.cursor.execute("""
+                    INSERT INTO '分摊模型关系' (model_name, parent_id, order_index)
+                    VALUES (?, ?, ?)
+                """, (model_name, parent_id, max_order + 1))
+            else:
+                self.cursor.execute("""
+                    UPDATE '分摊模型关系' SET parent_id = ?, order_index = ? WHERE model_id = ?
+                """, (parent_id, max_order + 1, model_id))
+            self.touch_tables("分摊模型关系")
+            self.create_result_view()
             
-            self.conn.commit()
+            self.commit()
             return True, "分摊模型保存成功"
         except Exception as e:
             return False, f"保存分摊模型失败: {str(e)}"
 
+    def get_model_tree(self):
+        """
+        获取分摊模型层级树
+
+        层级树缓存在模型上，分摊模型关系表未被修改时直接使用缓存。
+
+        返回:
+            HierarchyTree: 同级模型按 order_index 的数值排序
+        """
+        self.cursor.execute('SELECT version FROM "数据版本" WHERE table_name = "分摊模型关系"')
+        result = self.cursor.fetchone()
+        version = result[0] if result else None
+        if self.model_tree is None or self.model_tree[0] != version:
+            self.cursor.execute('SELECT model_id, model_name, parent_id, order_index FROM "分摊模型关系"')
+            self.model_tree = (version, HierarchyTree(self.cursor.fetchall()))
+        return self.model_tree[1]
+
     def get_model_hierarchy(self):
-        """获取分摊模型的层级结构"""
-        self.cursor.execute("""
-            WITH RECURSIVE model_tree AS (
-                -- 基础查询：获取顶级模型
-                SELECT 
-                    model_id, 
-                    model_name, 
-                    parent_id, 
-                    order_index,
-                    0 as level,
-                    CAST(order_index AS TEXT) as path
-                FROM '分摊模型关系'
-                WHERE parent_id IS NULL
-                
-                UNION ALL
-                
-                -- 递归查询：获取子模型
-                SELECT 
-                    t.model_id, 
-                    t.model_name, 
-                    t.parent_id, 
-                    t.order_index,
-                    mt.level + 1,
-                    mt.path || '.' || CAST(t.order_index AS TEXT)
-                FROM '分摊模型关系' t
-                JOIN model_tree mt ON t.parent_id = mt.model_id
-            )
-            SELECT model_id, model_name, parent_id, level, path
-            FROM model_tree
-            ORDER BY path;
-        """)
-        return self.cursor.fetchall()
+        """
+        获取分摊模型的层级结构
+
+        返回:
+            list: 按层级先序排列的 (model_id, model_name, parent_id, level, path)，
+                  path 为各级 order_index 组成的文本，如 1.2.10
+        """
+        return list(self.get_model_tree().rows())
 
     def get_child_models(self, model_name):
         """取指定模型的所有子模型"""
         try:
-            # 首先获取当前模型的ID
+            # 通过闭包表一次查出全部下级模型
             self.cursor.execute("""
-                WITH RECURSIVE model_tree AS (
-                    -- 基础查询：获取指定模型
-                    SELECT 
-                        model_id, 
-                        model_name,
-                        parent_id
-                    FROM '分摊模型关系'
-                    WHERE model_name = ?
-                    
-                    UNION ALL
-                    
-                    -- 递归查询：获取子模型
-                    SELECT 
-                        t.model_id, 
-                        t.model_name,
-                        t.parent_id
-                    FROM '分摊模型关系' t
-                    JOIN model_tree mt ON t.parent_id = mt.model_id
-                )
-                SELECT model_name
-                FROM model_tree
-                WHERE model_name != ?;
-            """, (model_name, model_name))
+                SELECT m.model_name
+                FROM '分摊模型层级' c
+                JOIN '分摊模型关系' m ON m.model_id = c.descendant_id
+                WHERE c.ancestor_id = (SELECT model_id FROM '分摊模型关系' WHERE model_name = ? ORDER BY model_id)
+                AND c.depth > 0
+                ORDER BY c.depth, m.order_index, m.model_id
+            """, (model_name,))
             
             return [row[0] for row in self.cursor.fetchall()]
         except Exception as e:
@@ -652,51 +1359,25 @@ class BuildingAreaModel:
         """删除模型及其子模型的关系记录"""
         try:
             # 获取要删除的模型ID
-            self.cursor.execute("SELECT model_id FROM '分摊模型关系' WHERE model_name = ?", (model_name,))
-            model_id = self.cursor.fetchone()
+            model_id = self.get_model_id(model_name)
             
-            if model_id:
-                model_id = model_id[0]
-                # 删除该模型及其所有子模型的关系记录
-                self.cursor.execute("""
-                    WITH RECURSIVE model_tree AS (
-                        SELECT model_id FROM '分摊模型关系' WHERE model_id = ?
-                        UNION ALL
-                        SELECT t.model_id 
-                        FROM '分摊模型关系' t
-                        JOIN model_tree mt ON t.parent_id = mt.model_id
-                    )
-                    DELETE FROM '分摊模型关系'
-                    WHERE model_id IN (SELECT model_id FROM model_tree);
-                """, (model_id,))
-                
-                self.conn.commit()
+            if model_id is not None:
+                # 通过闭包表查出该模型及其所有子模型
+                self.cursor.execute("SELECT descendant_id FROM '分摊模型层级' WHERE ancestor_id = ?", (model_id,))
+                params = [(row[0],) for row in self.cursor.fetchall()] or [(model_id,)]
+
+                # 删除计算结果、模型输入和关系记录
+                with self.transaction():
+                    self.cursor.executemany("DELETE FROM '分摊计算结果' WHERE model_id = ?", params)
+                    self.cursor.executemany("DELETE FROM '分摊模型输入' WHERE model_id = ?", params)
+                    self.cursor.executemany("DELETE FROM '分摊模型关系' WHERE model_id = ?", params)
+                    self.touch_tables("分摊模型关系")
+                    self.create_result_view()
                 return True
             return False
         except Exception as e:
             print(f"删除模型关系时出错：{str(e)}")
-            self.conn.rollback()
-            return False
-
-    def save_total_building_units(self):
-        """保存整幢所有单元数据到分摊所属表"""
-        try:
-            # 创建分摊所属_整幢表
-            self.cursor.execute('''CREATE TABLE IF NOT EXISTS "分摊所属_整幢" 
-                                 (ID TEXT, 房号 TEXT, 套内面积 TEXT)''')
-            
-            # 从幢总建筑面积表获取数据并保存
-            self.cursor.execute('''DELETE FROM "分摊所属_整幢"''')
-            self.cursor.execute('''INSERT INTO "分摊所属_整幢" 
-                                 (ID, 房号, 套内面积)
-                                 SELECT ID, 房号, 套内面积 
-                                 FROM "幢总建筑面积"''')
-            
-            self.conn.commit()
-            return True
-        except Exception as e:
-            print(f"保存整幢数据时出错：{str(e)}")
-            self.conn.rollback()
+            self.rollback()
             return False
 
     def get_available_belong_tables(self):
@@ -719,50 +1400,3 @@ class BuildingAreaModel:
         except Exception as e:
             print(f"获取可用分摊所属表时出错：{str(e)}")
             return []
-
-    def update_total_coefficient(self):
-        """更新每个ID的总分摊系数，确保分摊系数列位于套内面积列之后"""
-        try:
-            # 获取当前表的所有列信息
-            self.cursor.execute("PRAGMA table_info('分摊系数计算过程')")
-            columns = [row[1] for row in self.cursor.fetchall()]
-            
-            # 如果"分摊系数"列已存在，先删除它
-            if "分摊系数" in columns:
-                # 创建临时表，不包含"分摊系数"列
-                new_columns = [col for col in columns if col != "分摊系数"]
-                # 使用双引号包裹列名
-                new_columns_str = ', '.join(f'"{col}"' for col in new_columns)
-                self.cursor.execute(f'CREATE TABLE "temp_分摊系数计算过程" AS SELECT {new_columns_str} FROM "分摊系数计算过程"')
-                self.cursor.execute('DROP TABLE "分摊系数计算过程"')
-                self.cursor.execute('ALTER TABLE "temp_分摊系数计算过程" RENAME TO "分摊系数计算过程"')
-                
-                # 更新列信息
-                self.cursor.execute("PRAGMA table_info('分摊系数计算过程')")
-                columns = [row[1] for row in self.cursor.fetchall()]
-
-            # 获取所有以"_分摊系数"结尾的列
-            coefficient_columns = [col for col in columns if col.endswith('_分摊系数')]
-
-            # 在"套内面积"列后添加"分摊系数"列
-            self.cursor.execute('ALTER TABLE "分摊系数计算过程" ADD COLUMN "分摊系数" TEXT')
-
-            # 如果没有分摊系数列，将总系数设为0
-            if not coefficient_columns:
-                self.cursor.execute('UPDATE "分摊系数计算过程" SET "分摊系数" = "0"')
-                self.conn.commit()
-                return
-
-            # 构建SQL语句，计算所有分摊系数的和
-            coeff_sum = " + ".join([f'CAST(COALESCE("{col}", "0") AS FLOAT)' 
-                                   for col in coefficient_columns])
-            update_sql = f'''
-                UPDATE "分摊系数计算过程"
-                SET "分摊系数" = ROUND(({coeff_sum}), 6)
-            '''
-            
-            self.cursor.execute(update_sql)
-            self.conn.commit()
-        except Exception as e:
-            print(f"更新总分摊系数时出错：{str(e)}")
-            self.conn.rollback()
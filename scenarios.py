@@ -0,0 +1,189 @@
+"""
+分摊方案对比
+
+在与开发商商定服务范围时，对比多个候选的分摊所属分组和分摊模型层级。
+各方案在进程池中并行计算，只读取项目数据库的只读快照，不修改项目数据库。
+
+方案为普通字典，可直接序列化到工作进程:
+    {
+        "name": "方案一",
+        # 方案新增或替换的分组 {分组名: [单元ID, ...]}，未列出的分组使用项目中已保存的成员
+        "groups": {"分摊所属_方案一_住宅": ["H1", "H2"], ...},
+        # 分摊模型，上级模型须在下级模型之前列出
+        "models": [
+            {"name": "整幢", "parent": None,
+             "c_tables": ["共有建筑面积"], "h_tables": ["户单元套内面积"]},
+            ...
+        ],
+    }
+
+用法:
+    comparison = evaluate_scenarios(model, [scenario_1, scenario_2])
+    for unit_id, values in comparison.rows():
+        ...
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from model import UNIT_SOURCE_TABLES
+
+# 每个方案在对比矩阵中的列
+COMPARISON_FIELDS = ("分摊系数", "分摊公共面积")
+
+# 工作进程中的项目数据快照，由进程池初始化函数设置
+_snapshot = None
+
+
+def read_snapshot(model):
+    """
+    通过只读连接读取项目的单元和分组数据
+
+    参数:
+        model: BuildingAreaModel 实例
+
+    返回:
+        dict: {"units": {单元ID: 套内面积}, "rooms": {单元ID: 房号}, "groups": {分组名: [单元ID, ...]}}
+    """
+    units = {}
+    rooms = {}
+    groups = {}
+    with model.reader() as conn:
+        for table_name in ("户单元套内面积", "共有建筑面积"):
+            rows = conn.execute(f'SELECT ID, 房号, 套内面积 FROM "{table_name}"').fetchall()
+            for unit_id, room, area in rows:
+                units[unit_id] = area or 0
+                rooms[unit_id] = room
+            groups[table_name] = [unit_id for unit_id, _, _ in rows]
+        for table_name in UNIT_SOURCE_TABLES:
+            groups.setdefault(table_name, list(units))
+        # 没有成员的分组也是存在的分组，与模型输入中已删除的分组区分
+        for (belong_name,) in conn.execute('SELECT belong_name FROM "分摊所属关系"'):
+            groups.setdefault(belong_name, [])
+        rows = conn.execute('''SELECT r.belong_name, m.unit_id
+                               FROM "分摊所属成员" m JOIN "分摊所属关系" r ON r.belong_id = m.belong_id''')
+        for belong_name, unit_id in rows:
+            groups.setdefault(belong_name, []).append(unit_id)
+    return {"units": units, "rooms": rooms, "groups": groups}
+
+
+def _init_worker(snapshot):
+    """进程池初始化：每个工作进程只接收一次快照"""
+    global _snapshot
+    _snapshot = snapshot
+
+
+def evaluate_scenario(scenario, snapshot=None, arithmetic=None):
+    """
+    计算单个方案
+
+    参数:
+        scenario (dict): 方案
+        snapshot (dict): 项目数据快照，为None时使用工作进程中的快照
+        arithmetic: 算术方式（见area_arithmetic），默认为浮点数计算
+
+    返回:
+        dict: {"name": 方案名称,
+               "coefficients": {模型名称: 分摊系数},
+               "errors": {模型名称: 错误信息},
+               "units": {单元ID: (总分摊系数, 总分摊公共面积)}}
+    """
+    from apportionment_engine import ApportionmentEngine
+
+    snapshot = snapshot or _snapshot
+    groups = dict(snapshot["groups"])
+    groups.update(scenario.get("groups", {}))
+    models = [(item["name"], item.get("parent"), item.get("c_tables", []), item.get("h_tables", []))
+              for item in scenario.get("models", [])]
+
+    engine = ApportionmentEngine.from_setup(snapshot["units"], groups, models, arithmetic)
+    results = engine.evaluate()
+
+    units = {}
+    for result in results:
+        if result.error is not None:
+            continue
+        for unit_id, area in result.apportioned_areas.items():
+            coefficient, apportioned_area = units.get(unit_id, (0, 0))
+            units[unit_id] = (coefficient + result.coefficient, apportioned_area + area)
+    units = {unit_id: (round(coefficient, 6), round(area, 2)) for unit_id, (coefficient, area) in units.items()}
+
+    return {
+        "name": scenario.get("name", ""),
+        "coefficients": {result.model_name: result.coefficient for result in results if result.error is None},
+        "errors": {result.model_name: result.error for result in results if result.error is not None},
+        "units": units,
+    }
+
+
+class ScenarioComparison:
+    """
+    多个方案的逐单元对比结果
+
+    属性:
+        unit_ids (list): 单元ID，顺序与项目中的单元表相同
+        rooms (dict): {单元ID: 房号}
+        results (list): 各方案的 evaluate_scenario 结果，顺序与输入的方案相同
+    """
+
+    def __init__(self, unit_ids, rooms, results):
+        self.unit_ids = unit_ids
+        self.rooms = rooms
+        self.results = results
+
+    @property
+    def columns(self):
+        """对比矩阵的列：[(方案名称, 字段), ...]，字段取自COMPARISON_FIELDS"""
+        return [(result["name"], field) for result in self.results for field in COMPARISON_FIELDS]
+
+    def rows(self):
+        """
+        逐单元生成对比矩阵的行
+
+        返回:
+            generator: (单元ID, [各列的值])，单元在方案中未参与分摊时值为None
+        """
+        for unit_id in self.unit_ids:
+            values = []
+            for result in self.results:
+                values.extend(result["units"].get(unit_id, (None, None)))
+            yield unit_id, values
+
+    def to_dataframe(self):
+        """转换为以单元ID为索引、(方案名称, 字段) 为列的pandas.DataFrame"""
+        import pandas as pd
+
+        data = [values for _, values in self.rows()]
+        return pd.DataFrame(data, index=pd.Index(self.unit_ids, name="ID"),
+                            columns=pd.MultiIndex.from_tuples(self.columns))
+
+
+def evaluate_scenarios(model, scenarios, workers=None):
+    """
+    并行计算多个方案并生成逐单元对比
+
+    参数:
+        model: BuildingAreaModel 实例，只通过其只读连接读取快照，方案按其算术方式计算
+        scenarios (list): 方案列表
+        workers (int): 工作进程数，默认为CPU核数；为0时在当前进程中依次计算
+
+    返回:
+        ScenarioComparison: 对比结果。单个方案计算出错时，其结果的errors中键为空字符串
+    """
+    snapshot = read_snapshot(model)
+    arithmetic = model.arithmetic
+
+    if workers == 0:
+        results = [evaluate_scenario(scenario, snapshot, arithmetic) for scenario in scenarios]
+    else:
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(snapshot,)) as executor:
+            futures = [executor.submit(evaluate_scenario, scenario, None, arithmetic) for scenario in scenarios]
+            for scenario, future in zip(scenarios, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"name": scenario.get("name", ""), "coefficients": {},
+                                    "errors": {"": str(e)}, "units": {}})
+
+    return ScenarioComparison(list(snapshot["units"]), snapshot["rooms"], results)
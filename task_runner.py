@@ -0,0 +1,207 @@
+"""
+后台任务
+
+导入、保存、计算等耗时操作在线程池的工作线程中执行，界面保持响应。
+每个任务打开一个使用专用数据库连接的模型，操作在该模型上进行，不占用界面模型的写连接；
+分组面积缓存和分摊模型层级树按数据库中的修改次数判断是否失效，任务结束后界面模型自然读到新数据。
+
+任务之间依次执行，同一时间只有一个任务写数据库。任务通过 TaskContext 报告进度，
+并在各步骤之间调用 check_cancelled() 响应取消：在事务范围内取消时，整个范围的修改回滚。
+
+用法:
+    runner = TaskRunner(model)
+    runner.start("保存数据", lambda context: context.model.save_data(...), on_finished)
+"""
+
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from area_core import OperationCancelled
+
+
+class TaskCancelled(OperationCancelled):
+    """任务被取消，核心接口的进度回调中抛出时中止操作"""
+
+
+class TaskContext:
+    """
+    任务函数的运行环境
+
+    属性:
+        model (BuildingAreaModel): 使用专用连接的模型，只在任务线程中使用
+    """
+
+    def __init__(self, task, model):
+        self._task = task
+        self.model = model
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._task.cancel_requested
+
+    def check_cancelled(self):
+        """已请求取消时抛出TaskCancelled"""
+        if self._task.cancel_requested:
+            raise TaskCancelled()
+
+    def progress(self, done, total=0, text=""):
+        """
+        报告进度
+
+        :param done: 已完成的数量
+        :param total: 总数量，为0时表示进度未知
+        :param text: 当前步骤的说明
+        """
+        self._task.signals.progress.emit(int(done), int(total), text)
+
+
+class TaskSignals(QObject):
+    """任务信号，在界面线程中创建，工作线程发出的信号排队到界面线程处理"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Task(QRunnable):
+    """
+    在工作线程中执行的任务
+
+    任务函数的参数为TaskContext，返回值通过finished信号传回界面线程。
+    任务开始时将dirty_units交给任务模型，结束时（无论成功与否）再取回任务模型尚未重新计算的变化单元。
+    """
+
+    def __init__(self, name, function, db_path, performance_mode=False, arithmetic=None, dirty_units=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.function = function
+        self.db_path = db_path
+        self.performance_mode = performance_mode
+        self.arithmetic = arithmetic
+        self.dirty_units = dirty_units or {}
+        self.cancel_requested = False
+        self.signals = TaskSignals()
+
+    def cancel(self):
+        """请求取消，任务在下一次检查时停止"""
+        self.cancel_requested = True
+
+    def run(self):
+        # 推迟导入，避免模块之间循环依赖
+        from model import BuildingAreaModel
+
+        model = None
+        try:
+            model = BuildingAreaModel(self.db_path, self.performance_mode, self.arithmetic,
+                                      shared_connection=False)
+            for table_name, unit_ids in self.dirty_units.items():
+                model.mark_dirty(table_name, unit_ids)
+            context = TaskContext(self, model)
+            context.check_cancelled()
+            result = self.function(context)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+            return
+        finally:
+            if model is not None:
+                self.dirty_units = model.take_dirty_units()
+                model.close()
+        self.signals.finished.emit(result)
+
+
+class TaskRunner(QObject):
+    """
+    后台任务执行器
+
+    同一时间只执行一个任务，任务执行期间再次启动任务会被拒绝。
+    界面模型中尚未重新计算的变化单元交由任务处理，任务结束后未处理的部分合并回界面模型。
+
+    信号:
+        started (str): 任务开始，参数为任务名称
+        progress (int, int, str): 任务进度 (已完成, 总数, 说明)，总数为0表示进度未知
+        stopped (str): 任务结束（完成、失败或取消），参数为任务名称
+    """
+    started = pyqtSignal(str)
+    progress = pyqtSignal(int, int, str)
+    stopped = pyqtSignal(str)
+
+    def __init__(self, model, parent=None):
+        """
+        :param model: 界面使用的BuildingAreaModel实例，任务按其数据库路径和计算方式打开专用模型
+        """
+        super().__init__(parent)
+        self.model = model
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.current = None
+
+    @property
+    def busy(self):
+        """是否有任务正在执行"""
+        return self.current is not None
+
+    def start(self, name, function, on_finished=None, on_failed=None, on_cancelled=None):
+        """
+        启动任务
+
+        :param name: 任务名称，用于进度显示
+        :param function: 任务函数，参数为TaskContext
+        :param on_finished: 完成时在界面线程中调用，参数为任务函数的返回值
+        :param on_failed: 任务函数抛出异常时调用，参数为错误信息
+        :param on_cancelled: 任务被取消时调用
+        :return: Task；已有任务正在执行时为None
+        """
+        if self.busy:
+            return None
+
+        task = Task(name, function, self.model.db_path, self.model.performance_mode,
+                    self.model.arithmetic, self.model.take_dirty_units())
+        task.signals.progress.connect(self.progress)
+
+        def finished(result):
+            self._stop(task)
+            if on_finished:
+                on_finished(result)
+
+        def failed(message):
+            self._stop(task)
+            if on_failed:
+                on_failed(message)
+
+        def cancelled():
+            self._stop(task)
+            if on_cancelled:
+                on_cancelled()
+
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(failed)
+        task.signals.cancelled.connect(cancelled)
+
+        self.current = task
+        self.started.emit(name)
+        self.pool.start(task)
+        return task
+
+    def _stop(self, task):
+        for table_name, unit_ids in task.dirty_units.items():
+            self.model.mark_dirty(table_name, unit_ids)
+        if self.current is task:
+            self.current = None
+        self.stopped.emit(task.name)
+
+    def cancel(self):
+        """请求取消正在执行的任务"""
+        if self.current is not None:
+            self.current.cancel()
+
+    def wait(self, msecs=-1):
+        """等待任务结束，关闭程序前调用"""
+        self.cancel()
+        return self.pool.waitForDone(msecs)
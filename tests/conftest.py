@@ -0,0 +1,10 @@
+"""
+测试公共设置
+
+与benchmarks相同，把项目根目录加入模块搜索路径，测试以 python -m pytest 或 pytest 运行均可。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
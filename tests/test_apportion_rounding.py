@@ -0,0 +1,80 @@
+"""
+分摊公共面积按最大余数法取整：各单元分摊公共面积之和等于保留2位小数的应分摊总面积，
+浮点数和整数定点数两种算术方式都成立。
+"""
+
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+
+from apportionment_engine import ApportionmentEngine
+from area_arithmetic import FixedPointArithmetic, FloatArithmetic
+
+ARITHMETICS = [FloatArithmetic(), FixedPointArithmetic()]
+
+
+def cents(values):
+    """面积之和，以百分之一平方米为单位"""
+    return sum(round(value * 100) for value in values)
+
+
+def expected_cents(arithmetic, common_area, upper_coefficient):
+    """
+    保留2位小数的应分摊总面积 common_area × (1 + upper_coefficient)，以百分之一平方米为单位
+
+    定点数按十进制精确计算后四舍五入；浮点数与FloatArithmetic相同，对浮点数乘积取最接近的整数。
+    """
+    if arithmetic.name == "fixed":
+        total = Decimal(str(common_area)) * (1 + Decimal(str(upper_coefficient)))
+        return int(total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+    return round((common_area + common_area * upper_coefficient) * 100)
+
+
+def random_areas(rng, count):
+    return [round(rng.uniform(5, 150), 2) for _ in range(count)]
+
+
+@pytest.mark.parametrize("arithmetic", ARITHMETICS, ids=lambda arithmetic: arithmetic.name)
+@pytest.mark.parametrize("seed", range(20))
+def test_apportioned_areas_sum_to_total(arithmetic, seed):
+    rng = random.Random(seed)
+    areas = random_areas(rng, rng.randint(1, 300))
+    common_area = round(rng.uniform(10, 2000), 2)
+    upper_coefficient = rng.choice([0, round(rng.uniform(0, 0.3), 6)])
+
+    coefficient = arithmetic.coefficient(common_area, sum(areas), upper_coefficient)
+    result = arithmetic.apportioned_areas(areas, coefficient, common_area, upper_coefficient)
+
+    assert len(result) == len(areas)
+    assert cents(result) == expected_cents(arithmetic, common_area, upper_coefficient)
+    # 每个单元与未取整的值相差不到1个最小单位加上平均差额
+    spread = abs(cents(result) - sum(area * coefficient * 100 for area in areas)) / len(areas) + 1
+    assert all(abs(value - area * coefficient) * 100 <= spread for value, area in zip(result, areas))
+
+
+@pytest.mark.parametrize("arithmetic", ARITHMETICS, ids=lambda arithmetic: arithmetic.name)
+def test_engine_model_totals_balance(arithmetic):
+    rng = random.Random(7)
+    units = {f"H{i}": area for i, area in enumerate(random_areas(rng, 120), 1)}
+    units.update({f"C{i}": area for i, area in enumerate(random_areas(rng, 6), 1)})
+    groups = {
+        "住宅": [f"H{i}" for i in range(1, 81)],
+        "商业": [f"H{i}" for i in range(81, 121)],
+        "楼梯": ["C1", "C2", "C3", "C4"],
+        "商业公共": ["C5", "C6"],
+    }
+    models = [
+        ("整幢", None, ["楼梯"], ["住宅", "商业", "商业公共"]),
+        ("商业", "整幢", ["商业公共"], ["商业"]),
+    ]
+    engine = ApportionmentEngine.from_setup(units, groups, models, arithmetic)
+    results = {result.model_name: result for result in engine.evaluate()}
+
+    assert all(result.error is None for result in results.values())
+    top, child = results["整幢"], results["商业"]
+    top_common = sum(units[unit_id] for unit_id in groups["楼梯"])
+    child_common = sum(units[unit_id] for unit_id in groups["商业公共"])
+    assert cents(top.apportioned_areas.values()) == expected_cents(arithmetic, round(top_common, 2), 0)
+    assert cents(child.apportioned_areas.values()) == expected_cents(arithmetic, round(child_common, 2),
+                                                                    top.coefficient)
@@ -0,0 +1,72 @@
+"""
+批量导入：写入失败的工作簿整体回滚，不随同一幢后续工作簿提交。
+"""
+
+import sqlite3
+
+import pytest
+
+from batch_import import BuildingWriter
+
+
+def unit_rows(count, start=0):
+    """不含ID列的单元数据行"""
+    return [[str(i // 4 + 1), f"{i // 4 + 1}0{i % 4 + 1}", 30.0 + i, 4.5, 34.5 + i, "住宅"]
+            for i in range(start, start + count)]
+
+
+def table_rows(db_path, table_name):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f'SELECT ID, 房号 FROM "{table_name}" ORDER BY rowid').fetchall()
+
+
+def write_failing(writer, building, kind, rows):
+    with pytest.raises(ValueError):
+        writer.write(building, kind, rows)
+    writer.pending_counts[building] -= 1
+
+
+def test_failed_workbook_is_rolled_back(tmp_path):
+    bad = unit_rows(2)
+    bad[1][4] = "无效"
+    writer = BuildingWriter(str(tmp_path), {"1号楼": 2})
+    try:
+        write_failing(writer, "1号楼", "H", bad)
+        assert writer.write("1号楼", "H", unit_rows(1, start=2)) == 1
+    finally:
+        writer.close()
+
+    assert table_rows(str(tmp_path / "1号楼.db"), "户单元套内面积") == [("H1", "103")]
+
+
+def test_failed_workbook_does_not_clear_table(tmp_path):
+    # 上次导入的数据
+    writer = BuildingWriter(str(tmp_path), {"1号楼": 1})
+    writer.write("1号楼", "H", unit_rows(2))
+
+    bad = unit_rows(1)
+    bad[0][3] = "无效"
+    writer = BuildingWriter(str(tmp_path), {"1号楼": 1})
+    try:
+        write_failing(writer, "1号楼", "H", bad)
+    finally:
+        writer.close()
+
+    assert table_rows(str(tmp_path / "1号楼.db"), "户单元套内面积") == [("H1", "101"), ("H2", "102")]
+
+
+def test_table_cleared_once_after_failure(tmp_path):
+    writer = BuildingWriter(str(tmp_path), {"1号楼": 1})
+    writer.write("1号楼", "H", unit_rows(2))
+
+    bad = unit_rows(1)
+    bad[0][3] = "无效"
+    writer = BuildingWriter(str(tmp_path), {"1号楼": 3})
+    try:
+        write_failing(writer, "1号楼", "H", bad)
+        writer.write("1号楼", "H", unit_rows(1, start=4))
+        writer.write("1号楼", "H", unit_rows(1, start=5))
+    finally:
+        writer.close()
+
+    assert table_rows(str(tmp_path / "1号楼.db"), "户单元套内面积") == [("H1", "201"), ("H2", "202")]
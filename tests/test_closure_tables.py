@@ -0,0 +1,91 @@
+"""
+闭包表由触发器在层级表插入、移动和删除时维护，结果与按层级表重新生成的闭包表相同。
+"""
+
+import pytest
+
+import area_core
+from model import CLOSURE_TABLES
+
+
+def closure_rows(model, closure_table):
+    model.cursor.execute(f'SELECT ancestor_id, descendant_id, depth FROM "{closure_table}" ORDER BY 1, 2')
+    return model.cursor.fetchall()
+
+
+def assert_closure_consistent(model):
+    """比较触发器维护的闭包表与重新生成的闭包表，比较后回滚，不修改数据库"""
+    with model.transaction():
+        for table_name, (closure_table, id_column) in CLOSURE_TABLES.items():
+            maintained = closure_rows(model, closure_table)
+            model.rebuild_closure_table(table_name, closure_table, id_column)
+            assert maintained == closure_rows(model, closure_table), closure_table
+        model.rollback()
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = area_core.open_project(str(tmp_path / "project.db"))
+    area_core.import_units(model, [[str(i // 4 + 1), f"{i // 4 + 1}0{i % 4 + 1}", 40.0 + i, 5.0, 45.0 + i, "住宅"]
+                                   for i in range(12)], "户单元套内面积")
+    yield model
+    model.close()
+
+
+def move_model(model, model_name, parent_model_name):
+    success, message = model.save_apportionment_model(model_name, parent_model_name)
+    assert success, message
+
+
+def test_model_hierarchy_moves_and_deletes(model):
+    # a ─ b ─ c ─ d，a ─ e ─ f，g
+    for name, parent in (("a", None), ("b", "a"), ("c", "b"), ("d", "c"), ("e", "a"), ("f", "e"), ("g", None)):
+        move_model(model, name, parent)
+    assert_closure_consistent(model)
+
+    # 移动中间节点时整棵子树随之移动，移为顶级模型后再移回
+    move_model(model, "c", "f")
+    assert_closure_consistent(model)
+    move_model(model, "e", None)
+    assert_closure_consistent(model)
+    move_model(model, "e", "g")
+    assert_closure_consistent(model)
+
+    # 不能移到自身的下级
+    assert not model.save_apportionment_model("e", "d")[0]
+    model.rollback()
+    assert_closure_consistent(model)
+
+    # 删除模型及其子模型，以及只删除关系记录时下级成为顶级节点
+    assert model.delete_model_relationship("c")
+    assert_closure_consistent(model)
+    with model.transaction():
+        model.cursor.execute('DELETE FROM "分摊模型关系" WHERE model_name = ?', ("a",))
+    assert_closure_consistent(model)
+    assert model.get_child_models("g") == ["e", "f"]
+
+
+def test_allocation_hierarchy_moves_and_deletes(model):
+    units = model.fetch_data_from_table("户单元套内面积")
+    area_core.save_allocation(model, "X", [("A",) + tuple(unit) for unit in units[:6]]
+                                          + [("B",) + tuple(unit) for unit in units[6:]])
+    area_core.save_allocation(model, "Y", [("A1",) + tuple(unit) for unit in units[:3]]
+                                          + [("A2",) + tuple(unit) for unit in units[3:6]], "分摊所属_X_A")
+    area_core.save_allocation(model, "Z", [("B1",) + tuple(unit) for unit in units[6:]], "分摊所属_X_B")
+    assert_closure_consistent(model)
+
+    # 把Y的分组移到B下，再把B移为顶级分组
+    with model.transaction():
+        b_id = model.get_belong_id("分摊所属_X_B")
+        model.cursor.execute('UPDATE "分摊所属关系" SET parent_id = ? WHERE allocation_name = ?', (b_id, "Y"))
+    assert_closure_consistent(model)
+    with model.transaction():
+        model.cursor.execute('UPDATE "分摊所属关系" SET parent_id = NULL WHERE belong_id = ?', (b_id,))
+    assert_closure_consistent(model)
+
+    # 删除分摊所属时其分组的全部下级一并删除：B下的Z随X删除
+    assert area_core.delete_allocation(model, "Y") == (True, ["分摊所属_Y_A1", "分摊所属_Y_A2"])
+    assert_closure_consistent(model)
+    success, deleted = area_core.delete_allocation(model, "X")
+    assert success and "分摊所属_Z_B1" in deleted
+    assert_closure_consistent(model)
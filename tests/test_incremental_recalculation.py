@@ -0,0 +1,103 @@
+"""
+增量重新计算：保存单元变化后只重新计算受影响的模型，结果与整体重新计算全部模型相同。
+"""
+
+import pytest
+
+import area_core
+
+ALLOCATION = "X"
+GROUPS = {
+    "住宅": [f"H{i}" for i in range(1, 15)],
+    "商业": [f"H{i}" for i in range(15, 21)],
+    "楼梯": ["C1", "C2"],
+    "商业公共": ["C3", "C4"],
+}
+
+
+def group(name):
+    return f"分摊所属_{ALLOCATION}_{name}"
+
+
+def unit_rows(count, start=0):
+    """不含ID列的单元数据行"""
+    return [[str(i // 4 + 1), f"{i // 4 + 1}0{i % 4 + 1}", 30.0 + i * 2.37, 4.5, 34.5 + i * 2.37, "住宅"]
+            for i in range(start, start + count)]
+
+
+def results(model):
+    model.cursor.execute('''SELECT unit_id, model_id, coefficient, apportioned_area, apportionable_area
+                            FROM "分摊计算结果" ORDER BY model_id, unit_id''')
+    return model.cursor.fetchall()
+
+
+@pytest.fixture(params=[False, True], ids=["float", "fixed"])
+def project(request, tmp_path):
+    model = area_core.open_project(str(tmp_path / "project.db"), fixed_point=request.param)
+    area_core.import_units(model, unit_rows(20), "户单元套内面积")
+    area_core.import_units(model, unit_rows(4), "共有建筑面积")
+    units = {row[0]: row for table in ("户单元套内面积", "共有建筑面积")
+             for row in model.fetch_data_from_table(table)}
+    area_core.save_allocation(model, ALLOCATION, [(name,) + tuple(units[unit_id])
+                                                  for name, unit_ids in GROUPS.items() for unit_id in unit_ids])
+
+    # 顶级模型、以其分摊系数为上级分摊系数的下级模型，以及直接使用单元表的模型
+    model.save_apportionment_model("整幢")
+    model.save_apportionment_model("商业", "整幢")
+    model.save_apportionment_model("全幢")
+    top, error = area_core.calculate_model(model, [group("楼梯")], [group("住宅"), group("商业"), group("商业公共")],
+                                           0, "整幢")
+    assert error is None
+    assert area_core.calculate_model(model, [group("商业公共")], [group("商业")], top, "商业")[1] is None
+    assert area_core.calculate_model(model, ["共有建筑面积"], ["户单元套内面积"], 0, "全幢")[1] is None
+    area_core.recalculate_all(model)
+    model.take_dirty_units()
+    yield model
+    model.close()
+
+
+def full_row(model, table_name, unit_id, area):
+    model.cursor.execute(f'SELECT * FROM "{table_name}" WHERE ID = ?', (unit_id,))
+    row = list(model.cursor.fetchone())
+    row[5] = area
+    return row
+
+
+def assert_incremental_matches_full(model):
+    recalculated = area_core.recalculate_changed(model)
+    assert recalculated
+    assert all(result.error is None for result in recalculated)
+    incremental = results(model)
+    area_core.recalculate_all(model)
+    assert incremental == results(model)
+
+
+def test_changed_participating_unit(project):
+    assert area_core.save_unit_changes(project, "户单元套内面积", [full_row(project, "户单元套内面积", "H16", 88.88)])
+    assert_incremental_matches_full(project)
+
+
+def test_changed_common_unit(project):
+    assert area_core.save_unit_changes(project, "共有建筑面积", [full_row(project, "共有建筑面积", "C3", 21.07)])
+    assert_incremental_matches_full(project)
+
+
+def test_replaced_unit_table(project):
+    rows = [list(row) for row in project.cursor.execute('SELECT * FROM "户单元套内面积"').fetchall()]
+    rows[2][5] += 1.11
+    rows.pop()
+    headers = ["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"]
+    assert area_core.save_units(project, "户单元套内面积", rows, headers)
+    assert_incremental_matches_full(project)
+
+
+def test_appended_units(project):
+    assert area_core.import_units(project, unit_rows(3, start=20), "户单元套内面积") == (True, 3)
+    assert_incremental_matches_full(project)
+
+
+def test_unchanged_save_recalculates_nothing(project):
+    rows = [list(row) for row in project.cursor.execute('SELECT * FROM "户单元套内面积"').fetchall()]
+    headers = ["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"]
+    assert area_core.save_units(project, "户单元套内面积", rows, headers)
+    assert area_core.recalculate_changed(project) == []
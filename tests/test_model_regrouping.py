@@ -0,0 +1,66 @@
+"""
+调整分组后重新计算分摊模型：移出分组的单元不再保留原模型的计算结果。
+"""
+
+import pytest
+
+import area_core
+
+ALLOCATION = "X"
+
+
+def group(name):
+    return f"分摊所属_{ALLOCATION}_{name}"
+
+
+def unit_rows(count):
+    """不含ID列的单元数据行"""
+    return [[str(i // 4 + 1), f"{i // 4 + 1}0{i % 4 + 1}", 30.0 + i * 2.37, 4.5, 34.5 + i * 2.37, "住宅"]
+            for i in range(count)]
+
+
+def save_groups(model, groups):
+    units = {row[0]: row for table in ("户单元套内面积", "共有建筑面积")
+             for row in model.fetch_data_from_table(table)}
+    area_core.save_allocation(model, ALLOCATION, [(name,) + tuple(units[unit_id])
+                                                  for name, unit_ids in groups.items() for unit_id in unit_ids])
+
+
+def results(model):
+    model.cursor.execute('''SELECT unit_id, model_id, coefficient, apportioned_area, apportionable_area
+                            FROM "分摊计算结果" ORDER BY model_id, unit_id''')
+    return model.cursor.fetchall()
+
+
+@pytest.fixture(params=[False, True], ids=["float", "fixed"])
+def project(request, tmp_path):
+    model = area_core.open_project(str(tmp_path / "project.db"), fixed_point=request.param)
+    area_core.import_units(model, unit_rows(10), "户单元套内面积")
+    area_core.import_units(model, unit_rows(2), "共有建筑面积")
+    save_groups(model, {"住宅": [f"H{i}" for i in range(1, 11)], "楼梯": ["C1", "C2"]})
+    model.save_apportionment_model("整幢")
+    assert area_core.calculate_model(model, [group("楼梯")], [group("住宅")], 0, "整幢")[1] is None
+    yield model
+    model.close()
+
+
+def test_units_moved_out_of_group(project):
+    save_groups(project, {"住宅": ["H1", "H2", "H3"] + [f"H{i}" for i in range(7, 11)],
+                          "其他": ["H4", "H5", "H6"], "楼梯": ["C1", "C2"]})
+    assert area_core.calculate_model(project, [group("楼梯")], [group("住宅")], 0, "整幢")[1] is None
+
+    calculated = results(project)
+    assert {row[0] for row in calculated} == {"C1", "C2", "H1", "H2", "H3", "H7", "H8", "H9", "H10"}
+    assert area_core.audit(project) == []
+
+    # 与引擎整体重新计算的结果相同
+    area_core.recalculate_all(project)
+    assert calculated == results(project)
+
+
+def test_failed_recalculation_keeps_results(project):
+    before = results(project)
+    save_groups(project, {"住宅": [f"H{i}" for i in range(1, 11)], "楼梯": ["C1", "C2"], "空": []})
+    coefficient, error = area_core.calculate_model(project, [group("楼梯")], [group("空")], 0, "整幢")
+    assert error is not None
+    assert results(project) == before
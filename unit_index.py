@@ -0,0 +1,115 @@
+"""
+单元索引
+
+供选择单元对话框使用：以单元ID为键索引所加载的单元，按房号、楼层、用途筛选，
+并按楼层范围和房号尾号批量选择（如 5–20 层所有 01 户）。
+筛选和范围选择各遍历一次单元，耗时与单元数成线性关系，与已选单元数无关。
+"""
+
+import re
+
+# 楼层文本中的楼层号，如 "5"、"5F"、"-1"
+FLOOR_PATTERN = re.compile(r"-?\d+")
+
+
+def parse_floor(text):
+    """从实际楼层文本中取出楼层号，无法识别时返回None"""
+    match = FLOOR_PATTERN.search(str(text)) if text is not None else None
+    return int(match.group()) if match else None
+
+
+def unit_label(unit):
+    """单元的显示文本，格式为 ID-房号(面积)"""
+    return f"{unit[0]}-{unit[1]}({unit[2]})"
+
+
+class UnitIndex:
+    """
+    所加载单元的索引
+
+    属性:
+        units (list): 单元数据 [(ID, 房号, 套内面积), ...]，保持加载顺序
+        positions (dict): {ID: 在units中的位置}
+        floors (list): 各单元的楼层号，未知时为None
+        uses (list): 各单元的用途
+    """
+
+    def __init__(self, units, details=None):
+        """
+        :param units: 所加载的单元 [(ID, 房号, 套内面积), ...]
+        :param details: {ID: (实际楼层, 用途)}，缺少的单元按楼层和用途未知处理
+        """
+        details = details or {}
+        self.units = list(units)
+        self.positions = {}
+        self.floors = []
+        self.uses = []
+        self.labels = []
+        self._search_keys = []
+        for position, unit in enumerate(self.units):
+            unit_id, room = unit[0], unit[1]
+            self.positions.setdefault(unit_id, position)
+            floor_text, use = details.get(unit_id, (None, None))
+            self.floors.append(parse_floor(floor_text))
+            self.uses.append(use or "")
+            self.labels.append(unit_label(unit))
+            # 各字段以换行分隔，筛选词不会跨字段匹配
+            self._search_keys.append("\n".join(str(value) for value in (
+                room if room is not None else "", floor_text if floor_text is not None else "",
+                use or "", unit_id)).lower())
+
+    def __len__(self):
+        return len(self.units)
+
+    def get(self, unit_id):
+        """按ID取出单元数据，不存在时返回None"""
+        position = self.positions.get(unit_id)
+        return None if position is None else self.units[position]
+
+    def search(self, text):
+        """
+        筛选单元
+
+        筛选文本按空白分隔为多个词，每个词须出现在房号、实际楼层、用途或ID中（不区分大小写）。
+
+        返回:
+            list: 符合条件的单元位置，保持加载顺序；筛选文本为空时为全部单元
+        """
+        terms = text.lower().split()
+        if not terms:
+            return list(range(len(self.units)))
+        keys = self._search_keys
+        return [position for position in range(len(keys)) if all(term in keys[position] for term in terms)]
+
+    def select_range(self, floor_from=None, floor_to=None, room_suffix="", use=""):
+        """
+        按楼层范围、房号尾号和用途选择单元
+
+        参数:
+            floor_from (int): 起始楼层（含），为None时不限
+            floor_to (int): 结束楼层（含），为None时不限
+            room_suffix (str): 房号尾号，如 "01"，为空时不限
+            use (str): 用途，为空时不限
+
+        返回:
+            list: 符合条件的单元位置，保持加载顺序；限定楼层时不含楼层未知的单元
+        """
+        if floor_from is not None and floor_to is not None and floor_from > floor_to:
+            floor_from, floor_to = floor_to, floor_from
+        limit_floor = floor_from is not None or floor_to is not None
+        result = []
+        for position, unit in enumerate(self.units):
+            floor = self.floors[position]
+            if limit_floor:
+                if floor is None:
+                    continue
+                if floor_from is not None and floor < floor_from:
+                    continue
+                if floor_to is not None and floor > floor_to:
+                    continue
+            if room_suffix and not str(unit[1]).endswith(room_suffix):
+                continue
+            if use and self.uses[position] != use:
+                continue
+            result.append(position)
+        return result
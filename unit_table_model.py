@@ -0,0 +1,146 @@
+"""
+单元表的表格模型
+
+户单元套内面积和共有建筑面积界面的数据按列存储：面积列为NumPy float64数组（空值为NaN），
+其余列为字符串列表。NumPy在首次载入数据时才导入，空表格的各列均为空列表。表格只在Qt绘制可见单元格时按需生成显示文本，不为每个单元格创建控件。
+
+编辑过的行记录在变更集中。表格内容来自导入时，保存需要以全部行替换表中数据；
+保存成功后以当前内容为基准，之后再保存时只需写入变更集中的行。
+"""
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from model import AREA_COLUMN_INDEXES, to_number
+
+# 单元表的列
+UNIT_HEADERS = ["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"]
+
+
+def format_number(value):
+    """面积的显示文本，空值为空字符串"""
+    return "" if value != value else str(value)
+
+
+class UnitTableModel(QAbstractTableModel):
+    """
+    按列存储的单元表格模型
+
+    属性:
+        replaced (bool): 内容是否来自导入，保存时需要以全部行替换表中数据
+        edited (set): 编辑过的行号
+    """
+
+    def __init__(self, headers=UNIT_HEADERS, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.numeric_columns = set(index for index in AREA_COLUMN_INDEXES if index < len(self.headers))
+        self.columns = [[] for _ in self.headers]
+        self.row_count = 0
+        self.replaced = False
+        self.edited = set()
+
+    def load(self, data, replaced=True):
+        """
+        载入数据行，替换全部内容
+
+        参数:
+            data (list): 数据行列表，列顺序与表头相同
+            replaced (bool): 内容是否需要整体替换表中数据（如导入的数据）
+        """
+        import numpy as np
+
+        self.beginResetModel()
+        self.row_count = len(data)
+        columns = list(zip(*data)) if data else [()] * len(self.headers)
+        self.columns = []
+        for col in range(len(self.headers)):
+            values = columns[col] if col < len(columns) else [None] * self.row_count
+            if col in self.numeric_columns:
+                converted = [to_number(value) for value in values]
+                self.columns.append(np.array([np.nan if value is None else value for value in converted],
+                                             dtype=np.float64))
+            else:
+                self.columns.append(["" if value is None or value != value else str(value) for value in values])
+        self.replaced = replaced
+        self.edited = set()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        value = self.columns[index.column()][index.row()]
+        return format_number(value) if index.column() in self.numeric_columns else value
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        # ID由系统分配，不可编辑
+        if index.column() != 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or index.column() == 0:
+            return False
+        row, col = index.row(), index.column()
+        if col in self.numeric_columns:
+            try:
+                number = to_number(value)
+            except ValueError:
+                return False
+            number = float("nan") if number is None else number
+            current = self.columns[col][row]
+            if number == current or (number != number and current != current):
+                return True
+            self.columns[col][row] = number
+        else:
+            text = "" if value is None else str(value)
+            if text == self.columns[col][row]:
+                return True
+            self.columns[col][row] = text
+        self.edited.add(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def row(self, row):
+        """生成一行数据，面积空值为None"""
+        return [(None if value != value else float(value)) if col in self.numeric_columns else value
+                for col, value in ((col, column[row]) for col, column in enumerate(self.columns))]
+
+    def rows(self):
+        """生成全部数据行"""
+        if not self.row_count:
+            return []
+        numeric = [[None if value != value else value for value in column.tolist()]
+                   if col in self.numeric_columns else column for col, column in enumerate(self.columns)]
+        return [list(values) for values in zip(*numeric)]
+
+    def changed_rows(self):
+        """
+        获取需要保存的行
+
+        返回:
+            list: 编辑过的行；内容需要整体替换表中数据时为None
+        """
+        if self.replaced:
+            return None
+        return [self.row(row) for row in sorted(self.edited)]
+
+    def mark_saved(self):
+        """保存成功后以当前内容为基准，清空变更集"""
+        self.replaced = False
+        self.edited = set()
@@ -1,6 +1,7 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QHeaderView
+from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QTableView, QVBoxLayout, QHBoxLayout, QHeaderView
 from PyQt5.QtCore import Qt
+from unit_table_model import UnitTableModel, UNIT_HEADERS
 
 class CommonPropertyHouse(QWidget):
     """
@@ -37,10 +38,10 @@ class CommonPropertyHouse(QWidget):
         top_layout.addStretch(1)
         main_layout.addLayout(top_layout)
 
-        # 创建表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"])
+        # 创建表格，数据按列存储在表格模型中，只为可见的单元格生成显示内容
+        self.table_model = UnitTableModel(UNIT_HEADERS, self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         main_layout.addWidget(self.table)
 
@@ -51,18 +52,16 @@ class CommonPropertyHouse(QWidget):
         bottom_layout.addWidget(self.save_button)
         main_layout.addLayout(bottom_layout)
 
-    def update_table(self, data):
+    def update_table(self, data, replaced=True):
         """
         更新表格数据
-        
+
         :param data: 要显示在表格中的数据列表
-        
+        :param replaced: 数据是否需要整体替换表中已保存的数据（如导入的数据）
+
         将传入的数据填充到表格中，每个列表项对应一行数据。
         """
-        self.table.setRowCount(len(data))
-        for row, row_data in enumerate(data):
-            for col, value in enumerate(row_data):
-                self.table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.table_model.load(data, replaced)
 
     def get_table_data(self):
         """
@@ -71,14 +70,20 @@ class CommonPropertyHouse(QWidget):
         返回:
             list: 包含表格所有数据的二维列表
         """
-        data = []
-        for row in range(self.table.rowCount()):
-            row_data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
-            data.append(row_data)
-        return data
+        return self.table_model.rows()
+
+    def get_changed_rows(self):
+        """
+        获取自上次保存以来修改过的行
+        
+        返回:
+            list: 修改过的数据行；表格内容需要整体保存时为None
+        """
+        return self.table_model.changed_rows()
+
+    def mark_saved(self):
+        """保存成功后清空修改记录"""
+        self.table_model.mark_saved()
 
     def get_table_headers(self):
         """
@@ -87,7 +92,7 @@ class CommonPropertyHouse(QWidget):
         返回:
             list: 包含表格表头的列表
         """
-        return ["ID", "实际楼层", "房号", "主间面积", "阳台面积", "套内面积", "用途"]
+        return list(UNIT_HEADERS)
 
 if __name__ == '__main__':
     """
@@ -1,21 +1,113 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QGroupBox, QListWidget, QDialog, QDialogButtonBox, QScrollArea, QInputDialog, QTabWidget, QMessageBox, QComboBox, QListWidgetItem
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QGroupBox, QListWidget, QDialog, QDialogButtonBox, QScrollArea, QInputDialog, QTabWidget, QMessageBox, QComboBox, QListWidgetItem, QListView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from unit_index import UnitIndex, unit_label
 import re
 
-# 选择单元对话框类
+# 选择单元列表的数据模型，只为可见的行生成显示内容，勾选状态按单元位置记录，筛选后保留
+class UnitListModel(QAbstractListModel):
+    def __init__(self, unit_index, parent=None):
+        super().__init__(parent)
+        self.unit_index = unit_index
+        self.visible = list(range(len(unit_index)))  # 当前显示的单元位置
+        self.checked = set()  # 已勾选的单元位置
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def data(self, model_index, role=Qt.DisplayRole):
+        if not model_index.isValid():
+            return None
+        position = self.visible[model_index.row()]
+        if role == Qt.DisplayRole:
+            return self.unit_index.labels[position]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if position in self.checked else Qt.Unchecked
+        return None
+
+    def flags(self, model_index):
+        if not model_index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, model_index, value, role=Qt.EditRole):
+        if not model_index.isValid() or role != Qt.CheckStateRole:
+            return False
+        position = self.visible[model_index.row()]
+        if value == Qt.Checked:
+            self.checked.add(position)
+        else:
+            self.checked.discard(position)
+        self.dataChanged.emit(model_index, model_index, [Qt.CheckStateRole])
+        return True
+
+    # 设置显示的单元位置
+    def set_visible(self, positions):
+        self.beginResetModel()
+        self.visible = positions
+        self.endResetModel()
+
+    # 勾选或取消勾选一批单元
+    def set_checked(self, positions, checked=True):
+        if checked:
+            self.checked.update(positions)
+        else:
+            self.checked.difference_update(positions)
+        if self.visible:
+            self.dataChanged.emit(self.index(0), self.index(len(self.visible) - 1), [Qt.CheckStateRole])
+
+
+# 选择单元对话框类，单元较多时按房号、楼层、用途筛选，或按楼层范围和房号尾号批量勾选
 class SelectUnitsDialog(QDialog): 
-    def __init__(self, available_units):
-        super().__init__()  # 调用父类构造函数
+    def __init__(self, available_units, details=None, parent=None):
+        super().__init__(parent)  # 调用父类构造函数
         self.setWindowTitle("选择单元")  # 设置窗口标题
+        self.resize(500, 600)
         self.layout = QVBoxLayout()  # 创建一个垂直布局
-
-        # 创建可选单元列表
-        self.unit_list = QListWidget()  # 创建一个列表控件
-        self.unit_list.addItems(available_units)  # 添加可用单元
-        self.unit_list.setSelectionMode(QListWidget.MultiSelection)  # 允许多选
+        self.unit_index = UnitIndex(available_units, details)
+
+        # 筛选框
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("按房号、楼层、用途筛选，多个条件以空格分隔")
+        self.search_edit.textChanged.connect(self.apply_filter)
+        self.layout.addWidget(self.search_edit)
+
+        # 范围选择：楼层范围和房号尾号
+        range_layout = QHBoxLayout()
+        self.floor_from = QLineEdit()
+        self.floor_from.setPlaceholderText("起始楼层")
+        self.floor_to = QLineEdit()
+        self.floor_to.setPlaceholderText("结束楼层")
+        self.room_suffix = QLineEdit()
+        self.room_suffix.setPlaceholderText("房号尾号，如 01")
+        range_button = QPushButton("按范围勾选")
+        range_button.clicked.connect(self.select_range)
+        for widget in (self.floor_from, QLabel("至"), self.floor_to, self.room_suffix, range_button):
+            range_layout.addWidget(widget)
+        self.layout.addLayout(range_layout)
+
+        # 创建可选单元列表，只为可见的行生成显示内容
+        self.unit_model = UnitListModel(self.unit_index, self)
+        self.unit_model.dataChanged.connect(self.update_count)
+        self.unit_model.modelReset.connect(self.update_count)
+        self.unit_list = QListView()
+        self.unit_list.setUniformItemSizes(True)
+        self.unit_list.setModel(self.unit_model)
         self.layout.addWidget(self.unit_list)  # 将列表控件添加到布局中
 
+        # 勾选当前筛选结果或清除勾选
+        check_layout = QHBoxLayout()
+        check_all_button = QPushButton("勾选筛选结果")
+        check_all_button.clicked.connect(lambda: self.unit_model.set_checked(self.unit_model.visible))
+        clear_button = QPushButton("清除勾选")
+        clear_button.clicked.connect(lambda: self.unit_model.set_checked(list(self.unit_model.checked), False))
+        self.count_label = QLabel()
+        check_layout.addWidget(check_all_button)
+        check_layout.addWidget(clear_button)
+        check_layout.addStretch(1)
+        check_layout.addWidget(self.count_label)
+        self.layout.addLayout(check_layout)
+
         # 添加确定和取消按钮
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)  # 连接确定按钮的信号到对话框的接受槽
@@ -23,11 +115,74 @@ class SelectUnitsDialog(QDialog):
         self.layout.addWidget(buttons)
 
         self.setLayout(self.layout)  # 设置对话框的布局
+        self.update_count()
+
+    # 按筛选文本更新显示的单元
+    def apply_filter(self, text):
+        self.unit_model.set_visible(self.unit_index.search(text))
+
+    # 按楼层范围和房号尾号勾选单元
+    def select_range(self):
+        try:
+            floor_from = int(self.floor_from.text()) if self.floor_from.text().strip() else None
+            floor_to = int(self.floor_to.text()) if self.floor_to.text().strip() else None
+        except ValueError:
+            QMessageBox.warning(self, "警告", "楼层必须为整数")
+            return
+        positions = self.unit_index.select_range(floor_from, floor_to, self.room_suffix.text().strip())
+        if not positions:
+            QMessageBox.information(self, "提示", "没有符合条件的单元")
+            return
+        self.unit_model.set_checked(positions)
 
-    # 获取选中的单元
+    def update_count(self, *args):
+        self.count_label.setText(f"显示 {len(self.unit_model.visible)} 个，已勾选 {len(self.unit_model.checked)} 个")
+
+    # 获取选中的单元，按加载顺序返回单元数据 (ID, 房号, 套内面积)
     def get_selected_units(self):
-        # 返回所有被选中的单元的文本
-        return [item.text() for item in self.unit_list.selectedItems()]
+        return [self.unit_index.units[position] for position in sorted(self.unit_model.checked)]
+
+# 验证问题对话框类，问题较多时分页加载
+class ValidationReportDialog(QDialog):
+    def __init__(self, report, first_page, parent=None):
+        super().__init__(parent)
+        self.report = report
+        self.setWindowTitle("数据验证失败")
+        self.resize(600, 400)
+        self.layout = QVBoxLayout()
+
+        self.issue_list = QListWidget()
+        self.layout.addWidget(self.issue_list)
+        self.count_label = QLabel()
+        self.layout.addWidget(self.count_label)
+
+        # 加载更多和关闭按钮
+        buttons_layout = QHBoxLayout()
+        self.more_button = QPushButton("显示更多")
+        self.more_button.clicked.connect(self.load_next_page)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.accept)
+        buttons_layout.addWidget(self.more_button)
+        buttons_layout.addStretch(1)
+        buttons_layout.addWidget(close_button)
+        self.layout.addLayout(buttons_layout)
+        self.setLayout(self.layout)
+
+        self.add_issues(first_page)
+
+    # 添加一页问题并更新计数
+    def add_issues(self, issues):
+        for issue in issues:
+            item = QListWidgetItem(f"[{issue.kind}] {issue}")
+            item.setData(Qt.UserRole, issue)
+            self.issue_list.addItem(item)
+        more = "，还有更多问题" if self.report.has_more else ""
+        self.count_label.setText(f"已显示 {self.report.count} 条问题{more}，请修改数据后再次尝试保存。")
+        self.more_button.setEnabled(self.report.has_more)
+
+    # 从验证结果中取出下一页
+    def load_next_page(self):
+        self.add_issues(self.report.next_page())
 
 # 共有建筑分摊所属设置视图类
 class CPHouseBelongseting(QWidget):
@@ -144,8 +299,11 @@ class CPHouseBelongseting(QWidget):
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             
             if reply == QMessageBox.Yes:
-                # 删除数据库中的相关表
-                deleted_tables = self.controller.delete_allocation_area(allocation_name)
+                # 删除数据库中的相关表，分组仍被分摊模型使用时不删除
+                success, deleted_tables = self.controller.delete_allocation_area(allocation_name)
+                if not success:
+                    QMessageBox.warning(self, "删除失败", deleted_tables)
+                    return
                 
                 # 从表名中提取所有相关的分摊所属名称
                 deleted_allocations = set()
@@ -283,44 +441,61 @@ class CPHouseBelongseting(QWidget):
     def save_data(self, allocation_widget):
         allocation_name = self.tab_widget.tabText(self.tab_widget.indexOf(allocation_widget))
         data = []
+        group_names = []
         
         for group in allocation_widget.findChildren(QGroupBox):
             group_name = group.title()
             list_widget = group.findChild(QListWidget)
             if list_widget:
+                group_names.append(group_name)
                 for i in range(list_widget.count()):
                     item = list_widget.item(i)
                     unit_data = item.data(Qt.UserRole)
                     data.append((group_name,) + unit_data)  # 添加组名和完整的单元数据
+
+        # 先验证数据，有问题时分页显示
+        report = self.controller.check_allocation_data(data, self.available_units, group_names)
+        issues = report.next_page()
+        if issues:
+            ValidationReportDialog(report, issues, self).exec_()
+            return
         
-        # 调用控制器的保存方法，包含验证逻辑和父表信息
-        success, message = self.controller.save_allocation_data(
+        # 调用控制器的保存方法，传递父表信息和已完成的验证结果，在后台保存，完成后显示结果
+        self.controller.save_allocation_data(
             allocation_name, 
             data, 
             self.available_units,
-            self.current_parent_table  # 传递父表名称
+            self.current_parent_table,  # 传递父表名称
+            group_names,
+            on_done=self.show_save_result,
+            report=report
         )
-        
+
+    def show_save_result(self, result):
+        """显示分摊所属的保存结果"""
+        success, message = result
         if success:
             QMessageBox.information(self, "保存成功", message)
         else:
             QMessageBox.warning(self, "数据验证失败", message + "\n请修改数据后再次尝试保存。")
 
     def add_participating_unit(self, list_widget):
-        # 弹出选择单元对话框
-        # 使用相同的显示格式
-        dialog = SelectUnitsDialog([f"{unit[0]}-{unit[1]}({unit[2]})" for unit in self.available_units])
+        # 弹出选择单元对话框，可按房号、楼层、用途筛选和按范围勾选
+        dialog = SelectUnitsDialog(self.available_units, self.controller.get_unit_details(), self)
         if dialog.exec_():
             selected_units = dialog.get_selected_units()  # 获取选中的单元
-            for unit in selected_units:
-                # 检查单元是否已存在于列表中
-                if list_widget.findItems(unit, Qt.MatchExactly) == []:
-                    # 修改匹配逻辑以适应新的显示格式
-                    index = next(i for i, u in enumerate(self.available_units) 
-                               if f"{u[0]}-{u[1]}({u[2]})" == unit)
-                    item = QListWidgetItem(unit)
-                    item.setData(Qt.UserRole, self.available_units[index])
-                    list_widget.addItem(item)  # 添加新单元到列表
+            # 列表中已有的单元ID，每个单元只检查一次，批量添加的耗时与单元数成线性关系
+            existing_ids = {list_widget.item(i).data(Qt.UserRole)[0] for i in range(list_widget.count())}
+            list_widget.setUpdatesEnabled(False)
+            try:
+                for unit in selected_units:
+                    if unit[0] not in existing_ids:
+                        existing_ids.add(unit[0])
+                        item = QListWidgetItem(unit_label(unit))
+                        item.setData(Qt.UserRole, unit)
+                        list_widget.addItem(item)  # 添加新单元到列表
+            finally:
+                list_widget.setUpdatesEnabled(True)
 
     def delete_participating_unit(self, list_widget):
         current_item = list_widget.currentItem()  # 取当前选中的单元
@@ -376,15 +551,25 @@ if __name__ == '__main__':
         
         def fetch_data_from_table(self, table_name):
             return [("1", "单元A", "类型1"), ("2", "单元B", "类型2")]
+
+        def get_unit_details(self):
+            return {"1": ("1", "住宅"), "2": ("2", "商业")}
         
-        def save_allocation_data(self, allocation_name, data, available_units):
+        def check_allocation_data(self, data, available_units, group_names=None):
+            from allocation_validator import AllocationReport
+            return AllocationReport(data, available_units, group_names)
+
+        def save_allocation_data(self, allocation_name, data, available_units, parent_table=None, group_names=None,
+                                 on_done=None, report=None):
             print(f"保存数据：{allocation_name}")
             print(f"数据：{data}")
+            if on_done:
+                on_done((True, "数据保存成功"))
             return True, "数据保存成功"
         
         def delete_allocation_area(self, allocation_name):
             print(f"删除分摊所属：{allocation_name}")
-            return ["表1", "表2"]
+            return True, ["表1", "表2"]
     app = QApplication(sys.argv)
     mock_controller = MockController()  # 创建模拟的 controller
     view = CPHouseBelongseting(mock_controller)  # 传入 controller
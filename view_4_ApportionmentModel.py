@@ -157,6 +157,18 @@ class ApportionmentModelView(QWidget):
         bottom_layout = QHBoxLayout()
         bottom_layout.setAlignment(Qt.AlignRight)  # 设置右对齐
 
+        # 创建全部重新计算按钮
+        recalculate_button = QPushButton("全部重新计算")
+        recalculate_button.setFixedSize(100, 40)
+        recalculate_button.clicked.connect(self.recalculate_all_models)
+        bottom_layout.addWidget(recalculate_button)
+
+        # 创建面积审核按钮
+        audit_button = QPushButton("面积审核")
+        audit_button.setFixedSize(100, 40)
+        audit_button.clicked.connect(self.audit_areas)
+        bottom_layout.addWidget(audit_button)
+
         # 创建预览按钮
         preview_button = QPushButton("预览")
         preview_button.setFixedSize(100, 40)
@@ -258,10 +270,11 @@ class ApportionmentModelView(QWidget):
         reply = QMessageBox.question(self, '确认删除', confirm_message,
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
-        if reply == QMessageBox.Yes:
-            # 调用控制器方法删除模型数据和关系记录
-            success, message = self.controller.delete_apportionment_model(model_name)
-            
+        if reply != QMessageBox.Yes:
+            return
+
+        def done(result):
+            success, message = result
             if success:
                 # 从界面移除模型控件
                 self.scroll_layout.removeWidget(model_widget)
@@ -281,6 +294,9 @@ class ApportionmentModelView(QWidget):
             else:
                 QMessageBox.warning(self, "删除失败", message)
 
+        # 调用控制器方法在后台删除模型数据和关系记录
+        self.controller.delete_apportionment_model(model_name, on_done=done)
+
     def update_combobox_data(self, combobox, tables):
         combobox.clear()
         for table in tables:
@@ -294,6 +310,35 @@ class ApportionmentModelView(QWidget):
         # 实现保存功能
         QMessageBox.information(self, "保存", "保存功能待实现")
 
+    def recalculate_all_models(self):
+        """按模型层级重新计算全部已计算过的分摊模型，并更新各模型的分摊系数显示"""
+        self.controller.recalculate_all(on_done=self.show_recalculated)
+
+    def show_recalculated(self, result):
+        """显示重新计算全部模型的结果"""
+        coefficients, errors = result
+
+        for model_widget in self.models:
+            name_label = model_widget.findChildren(QLabel)[0]
+            model_name = name_label.text().split(' - ')[0]
+            result_display = model_widget.findChild(QLineEdit, "result_display")
+            if result_display and model_name in coefficients:
+                result_display.setText(f"{coefficients[model_name]:.6f}")
+
+        if errors:
+            QMessageBox.warning(self, "错误", "\n".join(
+                f"{name}：{error}" if name else error for name, error in errors.items()))
+        else:
+            QMessageBox.information(self, "重新计算", f"已重新计算 {len(coefficients)} 个分摊模型")
+
+    def audit_areas(self):
+        """审核分摊结果的面积一致性，显示不一致项"""
+        consistent, findings = self.controller.audit_areas()
+        if consistent:
+            QMessageBox.information(self, "面积审核", "面积数据一致")
+        else:
+            QMessageBox.warning(self, "面积审核", "以下面积数据不一致:\n" + "\n".join(findings))
+
     def calculate_apportionment_coefficient(self, model_widget):
         """计算分摊系数并保存应分摊公共面积"""
         # 获取所需的控件
@@ -325,50 +370,41 @@ class ApportionmentModelView(QWidget):
             QMessageBox.warning(self, "警告", "请选择应分摊共有建筑部位和参与分摊单元")
             return
 
-        # 首先计算并保存应分摊公共面积
-        success, error = self.controller.calculate_and_save_apportionable_area(
-            c_tables, upper_coefficient, model_type
-        )
-        
-        if not success:
-            QMessageBox.warning(self, "错误", error)
-            return
-
-        # 然后计算分摊系数
-        coefficient, error = self.controller.calculate_apportionment_coefficient(
-            c_tables, h_tables, upper_coefficient, model_type
-        )
-
-        if error:
-            QMessageBox.warning(self, "错误", error)
-        else:
-            # 显示计算结果
-            result_display.setText(f"{coefficient:.6f}")
-
-            # 更新分摊说明
-            explanation = model_widget.findChild(QLabel, "explanation")
-            if explanation:
-                # 获取所选表中的房号信息（仅用于共有建筑部位）
-                c_rooms = []
-                for table in c_tables:
-                    data = self.controller.fetch_data_from_table(table)
-                    if data:
-                        # 获取每条记录的房号（第二个元素）
-                        rooms = [record[1] for record in data]
-                        c_rooms.extend(rooms)
+        def done(result):
+            coefficient, error = result
+            if error:
+                QMessageBox.warning(self, "错误", error)
+            else:
+                # 显示计算结果
+                result_display.setText(f"{coefficient:.6f}")
+
+                # 更新分摊说明
+                explanation = model_widget.findChild(QLabel, "explanation")
+                if explanation:
+                    # 获取所选表中的房号信息（仅用于共有建筑部位）
+                    c_rooms = []
+                    for table in c_tables:
+                        data = self.controller.fetch_data_from_table(table)
+                        if data:
+                            # 获取每条记录的房号（第二个元素）
+                            rooms = [record[1] for record in data]
+                            c_rooms.extend(rooms)
                 
-                # 使用"、"连接房号（用于共有建筑部位）
-                c_rooms_text = "、".join(c_rooms) if c_rooms else "未选择"
+                    # 使用"、"连接房号（用于共有建筑部位）
+                    c_rooms_text = "、".join(c_rooms) if c_rooms else "未选择"
                 
-                # 参加分摊的户名称使用原来的显示方式（表名的最后一部分）
-                h_tables_display = [table.split('_')[-1] for table in h_tables] if h_tables else ["未选择"]
-                h_tables_text = "、".join(h_tables_display)
+                    # 参加分摊的户名称使用原来的显示方式（表名的最后一部分）
+                    h_tables_display = [table.split('_')[-1] for table in h_tables] if h_tables else ["未选择"]
+                    h_tables_text = "、".join(h_tables_display)
                 
-                # 更新分摊说明文本，将分摊系数放在第一行
-                explanation.setText(f"分摊说明:\n"
-                                  f"分摊系数：{coefficient:.6f}\n"
-                                  f"应分摊的共有建筑部位：{c_rooms_text}\n"
-                                  f"参加分摊的户名称：{h_tables_text}")
+                    # 更新分摊说明文本，将分摊系数放在第一行
+                    explanation.setText(f"分摊说明:\n"
+                                      f"分摊系数：{coefficient:.6f}\n"
+                                      f"应分摊的共有建筑部位：{c_rooms_text}\n"
+                                      f"参加分摊的户名称：{h_tables_text}")
+
+        # 在后台计算并保存应分摊公共面积和分摊系数
+        self.controller.calculate_model(c_tables, h_tables, upper_coefficient, model_type, on_done=done)
 
     def create_model_widget(self, selected_type, parent_model):
         """
@@ -449,7 +485,7 @@ class ApportionmentModelView(QWidget):
             parent_coefficients = self.controller.get_calculated_coefficients()
             for coeff in parent_coefficients:
                 if coeff[0] == parent_model:
-                    upper_coefficient_combo.addItem(f"{parent_model}: {coeff[1]}", float(coeff[1]))
+                    upper_coefficient_combo.addItem(f"{parent_model}: {float(coeff[1]):.6f}", float(coeff[1]))
                     upper_coefficient_combo.setCurrentIndex(1)  # 默认选择父模型的系
         model_layout.addWidget(upper_coefficient_combo)
 
@@ -516,13 +552,21 @@ if __name__ == '__main__':
             ]
         
         # 添加其他可能需要的方法
-        def calculate_apportionment_coefficient(self, c_tables, h_tables, upper_coefficient, model_type):
+        def calculate_model(self, c_tables, h_tables, upper_coefficient, model_type, on_done=None):
             # 返回模拟的计算结果和错误信息
-            return 0.123456, None
+            on_done((0.123456, None))
+
+        def recalculate_all(self, on_done=None):
+            # 返回模拟的各模型分摊系数和错误信息
+            on_done(({"选项1": 0.123456}, {}))
+
+        def audit_areas(self):
+            # 返回模拟的审核结果
+            return True, []
 
-        def delete_apportionment_model(self, model_name):
+        def delete_apportionment_model(self, model_name, on_done=None):
             # 返回模拟的删除结果
-            return True, f"模型 {model_name} 删除成功"
+            on_done((True, f"模型 {model_name} 删除成功"))
     
     mock_controller = MockController()
     view = ApportionmentModelView(mock_controller)